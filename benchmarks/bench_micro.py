@@ -0,0 +1,216 @@
+"""
+Microbenchmarks of the helpers called many times per page: template filters, Solr
+encoding, JSONPath, descendant lookups, and XML queries.
+
+    python benchmarks/bench_micro.py
+    python benchmarks/bench_micro.py --bench solr_encode --bench jsonpath_find
+    python benchmarks/bench_micro.py --save main
+    python benchmarks/bench_micro.py --compare main --threshold 0.1
+
+Reports the time per call of each benchmark (the median and best of `--repeat` runs).
+Baselines are saved to `benchmarks/baselines/micro-<name>.json`; comparing against one
+exits non-zero if a benchmark is slower by more than the `--threshold`.
+"""
+import os
+import sys
+import json
+import timeit
+import shutil
+import argparse
+import tempfile
+import statistics
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, BENCH_DIR)
+os.environ.setdefault("INSTANCE_DIR", os.path.join(ROOT_DIR, "tests", "instance"))
+# pylint: disable=wrong-import-position
+import results as baselines
+from fakes import fake_record, fake_facet_values, SUBJECTS
+from sandhill.filters import filters
+from sandhill.utils import jsonpath, xml
+from sandhill.utils.generic import getdescendant, getdescendant_many, touniquelist
+from sandhill.utils.solr import Solr
+
+# Results compared against a baseline; True where higher is better
+COMPARED = {"median_us": False}
+
+# Size of the generated METS file
+METS_SIZE = 5 * 1024 * 1024
+
+def write_mets(path, size=METS_SIZE):
+    """
+    Write a METS file of about the given size, with a descriptive metadata section for \
+    each page of a digitized book. Sections have a lowercase `id` attribute, as \
+    matched by `xpath_by_id()`. \n
+    Args:
+        path (str): The file to write \n
+        size (int): The size in bytes \n
+    """
+    with open(path, "w", encoding="utf-8") as mets:
+        mets.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                   '<mets:mets xmlns:mets="http://www.loc.gov/METS/" '
+                   'xmlns:mods="http://www.loc.gov/mods/v3" '
+                   'xmlns:xlink="http://www.w3.org/1999/xlink" OBJID="bench:book">\n')
+        page = 0
+        while mets.tell() < size:
+            page += 1
+            record = fake_record(page)
+            mets.write(
+                f'<mets:dmdSec id="dmd{page}"><mets:mdWrap MDTYPE="MODS"><mets:xmlData>'
+                f'<mods:mods><mods:titleInfo><mods:title>Page {page}: {record["fgs_label_s"]}'
+                f'</mods:title></mods:titleInfo><mods:abstract>{record["description"][0]}'
+                f'</mods:abstract>'
+                + "".join(f'<mods:subject><mods:topic>{subject}</mods:topic></mods:subject>'
+                          for subject in record["subject_display"])
+                + f'</mods:mods></mets:xmlData></mets:mdWrap></mets:dmdSec>\n'
+                f'<mets:fileSec><mets:fileGrp USE="OBJ"><mets:file ID="file{page}" '
+                f'MIMETYPE="image/jp2"><mets:FLocat LOCTYPE="URL" '
+                f'xlink:href="https://example.edu/bench/{page}.jp2"/></mets:file>'
+                f'</mets:fileGrp></mets:fileSec>\n'
+            )
+        mets.write('</mets:mets>\n')
+
+def cases(workdir):
+    """
+    Build the benchmarks, with representative inputs. \n
+    Args:
+        workdir (str): A directory for generated input files \n
+    Returns:
+        (dict): Benchmark names mapped to the function to time \n
+    """
+    search = {
+        "responseHeader": {"status": 0, "params": {"q": "maps", "rows": "100"}},
+        "response": {"numFound": 12345, "docs": [fake_record(num) for num in range(100)]},
+        "facet_counts": {"facet_fields": {"subject_display": fake_facet_values(100)}},
+    }
+    fqs = [f"subject_display:{filters.solr_encode(subject + f' ({num})')}"
+           for num in range(3) for subject in SUBJECTS][:40]
+    query_args = {"q": ["maps of michigan"], "fq": fqs, "start": ["40"], "rows": ["20"],
+                  "sort": ["score desc"], "_hidden": ["x"]}
+    description = ("<p>A <b>photograph</b> of the <i>campus</i> in <a href='#'>winter</a>"
+                   "<script>alert(1)</script>, showing <em>Beaumont Tower</em>.</p>") * 10
+    facet_names = [val for val in fake_facet_values(100) if isinstance(val, str)] * 2
+    mets = os.path.join(workdir, "mets.xml")
+    write_mets(mets)
+    mets_tree = xml.load(mets)
+
+    return {
+        "solr_encode": lambda: filters.solr_encode(
+            'Michigan State University: "Spartans" (1855-1955) [photos] && more?'),
+        "solr_encode_query": lambda: Solr().encode_query(
+            'title:("campus map" OR plan*) AND -subject:"World War, 1939-1945" '
+            'AND date:[1900 TO 1950] OR (creator:smith^2 && genre:(maps || atlases))'),
+        "solr_addfq": lambda: filters.solr_addfq(
+            {"q": "maps", "fq": list(fqs), "start": 40}, "subject_display", "Railroads"),
+        "solr_removefq": lambda: filters.solr_removefq(
+            {"q": "maps", "fq": list(fqs), "start": 40}, "subject_display",
+            fqs[-1].split(":", 1)[1]),
+        "assembleurl": lambda: filters.assembleurl({"path": "/search", "query_args": query_args}),
+        "filtertags": lambda: filters.filtertags(description, "b", "i", "em"),
+        "jsonpath_find": lambda: jsonpath.find(search, "$.response.docs[*].fgs_label_s"),
+        "jsonpath_eval_within": lambda: jsonpath.eval_within(
+            "$.response.numFound > 0 and $record.subject_display[0] == 'Maps'",
+            {"search": search, "record": search["response"]["docs"][7]}),
+        "getdescendant": lambda: getdescendant(search, "response.docs.42.subject_display.2"),
+        "getdescendant_many": lambda: getdescendant_many(search["response"]["docs"],
+                                                         "subject_display.0"),
+        "touniquelist": lambda: touniquelist(facet_names, SUBJECTS),
+        "xpath_by_id_file": lambda: xml.xpath_by_id(mets, "//mets:dmdSec"),
+        "xpath_by_id_tree": lambda: xml.xpath_by_id(mets_tree, "//mets:dmdSec"),
+    }
+
+def bench(func, repeat, min_time):
+    """
+    Time a function. \n
+    Args:
+        func (function): The function to time \n
+        repeat (int): The number of timing runs \n
+        min_time (float): The minimum seconds for each run \n
+    Returns:
+        (dict): The `median_us` and `best_us` per call, and the `loops` per run \n
+    """
+    timer = timeit.Timer(func)
+    loops = 1
+    while (elapsed := timer.timeit(loops)) < min_time:
+        loops = max(loops * 2, int(loops * min_time / elapsed * 1.2) if elapsed else loops * 10)
+    runs = [elapsed / loops] + [timer.timeit(loops) / loops for _ in range(repeat - 1)]
+    return {
+        "median_us": statistics.median(runs) * 1e6,
+        "best_us": min(runs) * 1e6,
+        "loops": loops,
+    }
+
+def report(results):
+    """
+    Format the results as a table. \n
+    Args:
+        results (dict): The results per benchmark \n
+    Returns:
+        (str): The table \n
+    """
+    width = max(len(name) for name in results)
+    lines = [f"{'benchmark':<{width}} {'median us':>12} {'best us':>12} {'loops':>8}"]
+    for name, res in results.items():
+        lines.append(f"{name:<{width}} {res['median_us']:>12.2f} {res['best_us']:>12.2f} "
+                     f"{res['loops']:>8}")
+    return "\n".join(lines)
+
+def parse_args(argv=None):
+    """
+    Parse the command line options. \n
+    Args:
+        argv (list|None): The arguments; defaults to `sys.argv` \n
+    Returns:
+        (argparse.Namespace): The options \n
+    """
+    parser = argparse.ArgumentParser(description="Benchmark Sandhill helper functions.")
+    parser.add_argument("--bench", action="append",
+                        help="Benchmark to run; may be repeated (default: all)")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="Timing runs per benchmark (default: 5)")
+    parser.add_argument("--min-time", type=float, default=0.2,
+                        help="Minimum seconds per timing run (default: 0.2)")
+    parser.add_argument("--save", metavar="NAME", help="Save the results as a baseline")
+    parser.add_argument("--compare", metavar="NAME", help="Compare the results to a baseline")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Relative slowdown counted as a regression (default: 0.2)")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """
+    Run the benchmarks. \n
+    Args:
+        argv (list|None): The command line arguments \n
+    Returns:
+        (int): The exit status; 1 if a benchmark regressed \n
+    """
+    options = parse_args(argv)
+    workdir = tempfile.mkdtemp(prefix="sandhill-bench-")
+    try:
+        funcs = cases(workdir)
+        unknown = set(options.bench or []) - set(funcs)
+        if unknown:
+            print(f"Unknown benchmarks: {', '.join(sorted(unknown))}; "
+                  f"choose from: {', '.join(funcs)}", file=sys.stderr)
+            return 2
+        results = {
+            name: bench(funcs[name], options.repeat, options.min_time)
+            for name in options.bench or funcs
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(json.dumps(results, indent=1) if options.json else report(results))
+    status = 0
+    if options.compare and baselines.compare("micro", options.compare, results, COMPARED,
+                                             options.threshold):
+        status = 1
+    if options.save:
+        baselines.save("micro", options.save, results, options)
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main())
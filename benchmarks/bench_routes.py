@@ -0,0 +1,220 @@
+"""
+End-to-end benchmarks of the Sandhill request path: route lookup, data processors,
+and template rendering, against the `tests/instance` configs plus the benchmark
+routes in `benchmarks/instance/`, with local stand-ins for Solr and IIIF.
+
+    python benchmarks/bench_routes.py
+    python benchmarks/bench_routes.py --route search --requests 500 --concurrency 4
+    python benchmarks/bench_routes.py --solr-latency 0.02 --iiif-latency 0.05
+    python benchmarks/bench_routes.py --save main
+    python benchmarks/bench_routes.py --compare main
+
+Reports requests per second, latency percentiles, and memory allocated per request
+for each route. Baselines are saved to `benchmarks/baselines/routes-<name>.json`; comparing
+against one exits non-zero if a route regressed beyond the `--threshold`.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+import statistics
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, BENCH_DIR)
+# pylint: disable=wrong-import-position
+import results as baselines
+from fakes import fake_solr, fake_iiif
+
+# Routes benchmarked, with the path requested and the expected status code
+SCENARIOS = {
+    "home": ("/", 200),
+    "about": ("/about", 200),
+    "cached": ("/cached/1", 200),
+    "search": ("/bench/search?q=maps&rows=100&facet=true&facet.field=genre_aat"
+               "&facet.field=subject_display", 200),
+    "search_json": ("/bench/search.json?q=maps&rows=100", 200),
+    "record": ("/bench/record/bench:42", 200),
+    "image": ("/bench/image/bench:42/0,0,512,512/512,/0/default.jpg", 200),
+}
+
+# Results compared against a baseline; True where higher is better
+COMPARED = {"req_s": True, "p50_ms": False, "p95_ms": False, "p99_ms": False,
+            "alloc_kib": False}
+
+def build_instance(solr_url, iiif_url):
+    """
+    Copy `tests/instance` and the benchmark routes into a temporary instance directory, \
+    configured to use the fake servers. The directory is within `benchmarks/`, as \
+    instance modules are imported relative to the install directory. \n
+    Args:
+        solr_url (str): The fake Solr URL \n
+        iiif_url (str): The fake IIIF URL \n
+    Returns:
+        (str): The instance directory \n
+    """
+    instance = os.path.join(tempfile.mkdtemp(prefix="run_", dir=BENCH_DIR), "instance")
+    shutil.copytree(os.path.join(ROOT_DIR, "tests", "instance"), instance)
+    shutil.copytree(os.path.join(BENCH_DIR, "instance"), instance, dirs_exist_ok=True)
+    with open(os.path.join(instance, "sandhill.cfg"), "a", encoding="utf-8") as cfg:
+        cfg.write(
+            f'\nSOLR_URL = "{solr_url}"\nIIIF_BASE = "{iiif_url}"\n'
+            'LOG_LEVEL = "WARNING"\nLOG_FILE = ""\nTEMPLATES_AUTO_RELOAD = 0\n'
+        )
+    return instance
+
+def percentile(values, pct):
+    """
+    Get a percentile of the values. \n
+    Args:
+        values (list): The values, at least two \n
+        pct (int): The percentile, 1 to 99 \n
+    Returns:
+        (float): The value at the percentile \n
+    """
+    return statistics.quantiles(values, n=100, method="inclusive")[pct - 1]
+
+def bench_route(app, path, status, options):
+    """
+    Benchmark requests to a single route. \n
+    Args:
+        app (flask.Flask): The Sandhill app \n
+        path (str): The path to request \n
+        status (int): The expected status code \n
+        options (argparse.Namespace): The benchmark options \n
+    Returns:
+        (dict): The results \n
+    """
+    local = threading.local()
+    errors = []
+
+    def request():
+        if not hasattr(local, "client"):
+            local.client = app.test_client()
+        start = time.perf_counter()
+        response = local.client.get(path)
+        response.get_data()
+        response.close()
+        elapsed = time.perf_counter() - start
+        if response.status_code != status:
+            errors.append(response.status_code)
+        return elapsed
+
+    for _ in range(options.warmup):
+        request()
+
+    with ThreadPoolExecutor(max_workers=options.concurrency) as pool:
+        start = time.perf_counter()
+        latencies = list(pool.map(lambda _: request(), range(options.requests)))
+        wall = time.perf_counter() - start
+
+    # Allocations are measured separately, as tracing slows down the requests
+    allocs = []
+    tracemalloc.start()
+    for _ in range(min(options.requests, options.alloc_requests)):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        request()
+        allocs.append(tracemalloc.get_traced_memory()[1] - before)
+    tracemalloc.stop()
+
+    return {
+        "requests": options.requests,
+        "errors": len(errors),
+        "req_s": options.requests / wall,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "alloc_kib": statistics.mean(allocs) / 1024 if allocs else 0.0,
+    }
+
+def report(results):
+    """
+    Format the results as a table. \n
+    Args:
+        results (dict): The results per route \n
+    Returns:
+        (str): The table \n
+    """
+    lines = [f"{'route':<12} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+             f"{'alloc KiB':>10} {'errors':>7}"]
+    for name, res in results.items():
+        lines.append(f"{name:<12} {res['req_s']:>9.1f} {res['p50_ms']:>8.2f} "
+                     f"{res['p95_ms']:>8.2f} {res['p99_ms']:>8.2f} {res['alloc_kib']:>10.1f} "
+                     f"{res['errors']:>7}")
+    return "\n".join(lines)
+
+def parse_args(argv=None):
+    """
+    Parse the command line options. \n
+    Args:
+        argv (list|None): The arguments; defaults to `sys.argv` \n
+    Returns:
+        (argparse.Namespace): The options \n
+    """
+    parser = argparse.ArgumentParser(description="Benchmark Sandhill routes end-to-end.")
+    parser.add_argument("--route", action="append", choices=sorted(SCENARIOS),
+                        help="Route to benchmark; may be repeated (default: all)")
+    parser.add_argument("--requests", type=int, default=200,
+                        help="Timed requests per route (default: 200)")
+    parser.add_argument("--warmup", type=int, default=20,
+                        help="Untimed requests per route first (default: 20)")
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="Requests made at once (default: 1)")
+    parser.add_argument("--alloc-requests", type=int, default=20,
+                        help="Requests traced to measure allocations (default: 20)")
+    parser.add_argument("--solr-latency", type=float, default=0.0,
+                        help="Seconds the fake Solr waits before responding")
+    parser.add_argument("--iiif-latency", type=float, default=0.0,
+                        help="Seconds the fake IIIF server waits before responding")
+    parser.add_argument("--save", metavar="NAME", help="Save the results as a baseline")
+    parser.add_argument("--compare", metavar="NAME", help="Compare the results to a baseline")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Relative change counted as a regression (default: 0.2)")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    options = parser.parse_args(argv)
+    if options.requests < 2:
+        parser.error("--requests must be at least 2")
+    return options
+
+def main(argv=None):
+    """
+    Run the benchmarks. \n
+    Args:
+        argv (list|None): The command line arguments \n
+    Returns:
+        (int): The exit status; 1 if a route regressed or had errors \n
+    """
+    options = parse_args(argv)
+    solr, iiif = fake_solr(options.solr_latency), fake_iiif(options.iiif_latency)
+    instance = build_instance(solr.url, iiif.url)
+    os.environ["INSTANCE_DIR"] = instance
+    try:
+        from sandhill import app # pylint: disable=import-outside-toplevel
+        results = {
+            name: bench_route(app, *SCENARIOS[name], options)
+            for name in options.route or SCENARIOS
+        }
+    finally:
+        solr.stop()
+        iiif.stop()
+        shutil.rmtree(os.path.dirname(instance), ignore_errors=True)
+
+    print(json.dumps(results, indent=1) if options.json else report(results))
+    status = 1 if any(res["errors"] for res in results.values()) else 0
+    if options.compare and baselines.compare("routes", options.compare, results, COMPARED,
+                                             options.threshold):
+        status = 1
+    if options.save:
+        baselines.save("routes", options.save, results, options)
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main())
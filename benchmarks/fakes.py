@@ -0,0 +1,213 @@
+"""
+Local stand-ins for Solr and an IIIF image server, so benchmarks measure Sandhill
+rather than the network or a shared service.
+"""
+import json
+import time
+import random
+import hashlib
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+# Number of records the fake Solr index holds
+NUM_FOUND = 12345
+
+# Values used to generate the fake records and facets
+GENRES = ["Photographs", "Maps", "Letters", "Posters", "Yearbooks", "Oral histories",
+          "Newspapers", "Scrapbooks", "Sheet music", "Postcards", "Diaries", "Drawings"]
+SUBJECTS = ["Agriculture", "Michigan", "Students", "Athletics", "Campus buildings",
+            "World War, 1939-1945", "Women", "Railroads", "Lumbering", "Great Lakes",
+            "Automobiles", "Music", "Extension work", "Veterinary medicine", "Horticulture"]
+WORDS = ("the of and view campus farm students building east lansing river street "
+         "collection photograph early annual report hall class field college").split()
+
+class FakeServer(ThreadingHTTPServer):
+    """
+    A threaded HTTP server on a free local port, run in a daemon thread. \n
+    Args:
+        handler (class): The request handler class \n
+        latency (float): Seconds to wait before sending each response \n
+    """
+    daemon_threads = True
+
+    def __init__(self, handler, latency=0.0):
+        super().__init__(("127.0.0.1", 0), handler)
+        self.latency = latency
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        """The base URL of the server."""
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        """Start serving in the background; returns the server."""
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and close the socket."""
+        self.shutdown()
+        self.server_close()
+
+class FakeHandler(BaseHTTPRequestHandler):
+    """
+    Base handler; keeps connections alive and does not log requests.
+    """
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; avoid waiting on delayed ACKs between them
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args): # pylint: disable=arguments-differ
+        pass
+
+    def send_body(self, status, body, content_type, headers=None):
+        """
+        Send a complete response after the server's latency. \n
+        Args:
+            status (int): The status code \n
+            body (bytes): The response body \n
+            content_type (str): The content type \n
+            headers (dict|None): Additional headers \n
+        """
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def do_GET(self): # pylint: disable=invalid-name
+        """Handle a GET request; implemented by each fake."""
+        raise NotImplementedError
+
+    def do_HEAD(self): # pylint: disable=invalid-name
+        """Handle HEAD requests as GET."""
+        self.do_GET()
+
+def fake_record(num):
+    """
+    Generate a repeatable fake Solr record. \n
+    Args:
+        num (int): The record number \n
+    Returns:
+        (dict): The record \n
+    """
+    rand = random.Random(num)
+    return {
+        "id": f"bench:{num}",
+        "PID": f"bench:{num}",
+        "fgs_label_s": " ".join(rand.choices(WORDS, k=6)).capitalize(),
+        "name_primary": [f"{rand.choice(WORDS).capitalize()}, {rand.choice(WORDS).capitalize()}"],
+        "date_key": [str(1855 + num % 160)],
+        "collection": [f"bench:collection-{num % 12}"],
+        "genre_aat": rand.sample(GENRES, 2),
+        "subject_display": rand.sample(SUBJECTS, 4),
+        "description": [" ".join(rand.choices(WORDS, k=60))],
+        "_version_": 1700000000000000000 + num,
+    }
+
+def fake_facet_values(count=20):
+    """
+    Generate the values of a Solr facet field, as returned by Solr. \n
+    Args:
+        count (int): The number of facet values \n
+    Returns:
+        (list): Alternating facet values and their counts \n
+    """
+    names = (GENRES + SUBJECTS) * (count // len(GENRES + SUBJECTS) + 1)
+    return [val for idx, name in enumerate(names[:count]) for val in (name, 5000 // (idx + 1))]
+
+class FakeSolrHandler(FakeHandler):
+    """
+    Answers Solr `select` calls with JSON: records are generated from the `rows` and \
+    `start` params, `id:`/`PID:` queries and `{!terms}` queries return the matching \
+    records, and each `facet.field` gets 20 facet values.
+    """
+    def do_GET(self): # pylint: disable=invalid-name
+        """Handle a select call."""
+        parsed = urlparse(self.path)
+        if not parsed.path.endswith("/select"):
+            self.send_body(404, b'{"error": {"msg": "Not found", "code": 404}}',
+                           "application/json")
+            return
+        params = parse_qs(parsed.query)
+        query = params.get("q", ["*:*"])[0]
+        if query.startswith("{!terms"):
+            nums = [int(val.rsplit(":", 1)[-1]) for val in query.split("}", 1)[1].split(",")
+                    if val.rsplit(":", 1)[-1].isdigit()]
+        elif query.startswith(("id:", "PID:")):
+            num = query.rsplit(":", 1)[-1].strip('"\\')
+            nums = [int(num)] if num.isdigit() else []
+        else:
+            start = int(params.get("start", [0])[0] or 0)
+            rows = min(int(params.get("rows", [10])[0] or 10), 1000)
+            nums = range(start, min(start + rows, NUM_FOUND))
+        body = {
+            "responseHeader": {"status": 0, "QTime": 3, "params": {
+                key: vals[0] if len(vals) == 1 else vals for key, vals in params.items()
+            }},
+            "response": {
+                "numFound": len(nums) if query.startswith(("{!terms", "id:", "PID:"))
+                            else NUM_FOUND,
+                "start": 0,
+                "docs": [fake_record(num) for num in nums],
+            },
+        }
+        if params.get("facet.field"):
+            body["facet_counts"] = {"facet_queries": {}, "facet_fields": {
+                field: fake_facet_values() for field in params["facet.field"]
+            }}
+        self.send_body(200, json.dumps(body).encode("utf-8"), "application/json")
+
+class FakeIIIFHandler(FakeHandler):
+    """
+    Answers IIIF image API calls: `info.json` for any identifier, and a fixed \
+    64 KiB payload for any image request.
+    """
+    image = bytes(random.Random(0).getrandbits(8) for _ in range(64 * 1024))
+
+    def do_GET(self): # pylint: disable=invalid-name
+        """Handle an image or info.json request."""
+        path = urlparse(self.path).path
+        identifier = path.strip("/").split("/")[0]
+        if path.endswith("/info.json"):
+            body = json.dumps({
+                "@context": "http://iiif.io/api/image/2/context.json",
+                "@id": f"{self.server.url}/{identifier}", "protocol": "http://iiif.io/api/image",
+                "width": 6000, "height": 4000,
+                "tiles": [{"width": 512, "scaleFactors": [1, 2, 4, 8, 16]}],
+            }).encode("utf-8")
+            self.send_body(200, body, "application/json")
+            return
+        etag = '"' + hashlib.md5(path.encode("utf-8")).hexdigest() + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_body(304, b"", "image/jpeg", {"ETag": etag})
+            return
+        self.send_body(200, self.image, "image/jpeg",
+                       {"ETag": etag, "Cache-Control": "public, max-age=86400"})
+
+def fake_solr(latency=0.0):
+    """
+    Start a fake Solr server. \n
+    Args:
+        latency (float): Seconds to wait before each response \n
+    Returns:
+        (FakeServer): The running server; its `url` is the Solr core URL \n
+    """
+    return FakeServer(FakeSolrHandler, latency).start()
+
+def fake_iiif(latency=0.0):
+    """
+    Start a fake IIIF image server. \n
+    Args:
+        latency (float): Seconds to wait before each response \n
+    Returns:
+        (FakeServer): The running server; its `url` is the IIIF base URL \n
+    """
+    return FakeServer(FakeIIIFHandler, latency).start()
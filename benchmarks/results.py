@@ -0,0 +1,108 @@
+"""
+Saving benchmark results as baselines and comparing later runs against them.
+"""
+import os
+import json
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_DIR = os.path.join(BENCH_DIR, "baselines")
+
+def metadata(options):
+    """
+    Describe the environment and options of the run, saved with baselines. \n
+    Args:
+        options (argparse.Namespace): The benchmark options \n
+    Returns:
+        (dict): The metadata \n
+    """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                                cwd=os.path.dirname(BENCH_DIR), capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "machine": platform.node(),
+        "options": {key: val for key, val in vars(options).items()
+                    if key not in ("save", "compare", "json")},
+    }
+
+def baseline_path(suite, name):
+    """
+    Get the path of a saved baseline. \n
+    Args:
+        suite (str): The benchmark suite, e.g. `routes` \n
+        name (str): The baseline name \n
+    Returns:
+        (str): The path \n
+    """
+    return os.path.join(BASELINE_DIR, f"{suite}-{name}.json")
+
+def save(suite, name, results, options):
+    """
+    Save results as a baseline. \n
+    Args:
+        suite (str): The benchmark suite \n
+        name (str): The baseline name \n
+        results (dict): The results per benchmark \n
+        options (argparse.Namespace): The benchmark options \n
+    """
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    with open(baseline_path(suite, name), "w", encoding="utf-8") as bfile:
+        json.dump({"meta": metadata(options), "results": results}, bfile, indent=1)
+    print(f"\nSaved baseline '{name}'")
+
+def changes(result, before, measures, threshold):
+    """
+    Get the relative change of each measure of a benchmark from its baseline. \n
+    Args:
+        result (dict): The result of the benchmark \n
+        before (dict): The baseline result of the benchmark \n
+        measures (dict): The measures to compare, mapped to True where higher is better \n
+        threshold (float): The relative change counted as a regression, e.g. 0.2 \n
+    Returns:
+        (dict): Each measure mapped to its change and whether it regressed \n
+    """
+    changed = {}
+    for key, higher_is_better in measures.items():
+        if before.get(key):
+            change = result[key] / before[key] - 1
+            changed[key] = (change, (-change if higher_is_better else change) > threshold)
+    return changed
+
+def compare(suite, name, results, measures, threshold):
+    """
+    Compare results to a saved baseline and print the changes. \n
+    Args:
+        suite (str): The benchmark suite \n
+        name (str): The baseline name \n
+        results (dict): The results per benchmark \n
+        measures (dict): The measures to compare, mapped to True where higher is better \n
+        threshold (float): The relative change counted as a regression, e.g. 0.2 \n
+    Returns:
+        (list): The regressions found \n
+    """
+    with open(baseline_path(suite, name), encoding="utf-8") as bfile:
+        baseline = json.load(bfile)
+    print(f"\nCompared to baseline '{name}' ({baseline['meta']['date']}, "
+          f"commit {baseline['meta']['commit']}):")
+    regressions = []
+    width = max(len(bench) for bench in results)
+    for bench, result in results.items():
+        if bench not in baseline["results"]:
+            continue
+        changed = changes(result, baseline["results"][bench], measures, threshold)
+        regressions += [f"{bench} {key}" for key, (_, regressed) in changed.items() if regressed]
+        print(f"{bench:<{width}}  " + ", ".join(
+            f"{key} {change:+.1%}" + (" REGRESSED" if regressed else "")
+            for key, (change, regressed) in changed.items()
+        ))
+    if regressions:
+        print(f"\nRegressed: {', '.join(regressions)}")
+    return regressions
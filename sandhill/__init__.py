@@ -15,4 +15,4 @@ app.environ = {}
 # Local imports requiring the Flask app
 from sandhill.utils.error_handling import catch # pylint: disable=wrong-import-position
 import sandhill.bootstrap # pylint: disable=wrong-import-position
-from sandhill.routes import main, static, error # pylint: disable=wrong-import-position
+from sandhill.routes import main, static, error, metrics # pylint: disable=wrong-import-position
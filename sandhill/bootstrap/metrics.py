@@ -0,0 +1,26 @@
+"""
+Record the metrics for each request.
+"""
+import time
+from flask import g
+from sandhill import app
+from sandhill.utils import metrics
+from sandhill.utils.timing import request_timings
+
+@app.after_request
+def record_request_metrics(response):
+    """
+    When `METRICS` is enabled, record the duration of the request and of the data \
+    processors it ran, then write the request's metrics to the shared store. \n
+    """
+    if not metrics.enabled():
+        return response
+    if (start := g.get("request_start")) is not None:
+        metrics.observe("sandhill_request_duration_seconds", time.perf_counter() - start,
+                        route=metrics.route_label())
+    for timing in request_timings():
+        if timing["phase"] == "execute":
+            metrics.observe("sandhill_processor_duration_seconds", timing["ms"] / 1000,
+                            processor=timing["processor"])
+    metrics.flush()
+    return response
@@ -0,0 +1,38 @@
+"""
+Report the time taken by data processors for each request.
+"""
+import json
+import time
+from flask import g, request
+from sandhill import app
+from sandhill.utils.generic import getconfig
+from sandhill.utils.timing import request_timings, summarize, server_timing
+
+@app.before_request
+def start_request_timer():
+    """Note the start time of the request."""
+    g.setdefault("request_start", time.perf_counter())
+
+@app.after_request
+def add_request_timings(response):
+    """
+    For requests which ran data processors, log their timings as a single JSON line \
+    at the INFO level, and add them as a `Server-Timing` header when `SERVER_TIMING` \
+    is enabled. \n
+    """
+    if not (timings := request_timings()):
+        return response
+    total_ms = None
+    if (start := g.get("request_start")) is not None:
+        total_ms = (time.perf_counter() - start) * 1000
+    app.logger.info("Request timings: " + json.dumps({
+        "method": request.method,
+        "path": request.path,
+        "route": request.url_rule.rule if request.url_rule else None,
+        "status": response.status_code,
+        "ms": None if total_ms is None else round(total_ms, 3),
+        "timings": [{**timing, "ms": round(timing["ms"], 3)} for timing in summarize(timings)],
+    }))
+    if int(getconfig("SERVER_TIMING", 0)):
+        response.headers["Server-Timing"] = server_timing(timings, total_ms)
+    return response
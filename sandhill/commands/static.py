@@ -0,0 +1,28 @@
+'''
+Commands for managing static files
+'''
+import click
+from sandhill import app
+from sandhill.utils import static as static_files
+
+@app.cli.command("static")
+@click.option("--build", is_flag=True,
+              help="Write precompressed variants of static files and the static manifest.")
+@click.option("--no-compress", is_flag=True,
+              help="Only write the static manifest when building.")
+def static(build, no_compress):
+    '''
+    Manage the static files. With `--build`, writes `.gz` (and `.br`, if the `brotli` \
+    package is installed) variants of compressible static files and the static \
+    manifest of content hashes. Otherwise, lists the static files and their hashes. \n
+    Args:
+        build (bool): Build the variants and manifest \n
+        no_compress (bool): Skip writing compressed variants \n
+    '''
+    if build:
+        files = static_files.build(compress_files=not no_compress)
+        click.echo(f"Wrote manifest for {len(files)} files to {static_files.manifest_path()}")
+        return
+    for name, entry in sorted(static_files.manifest().items()):
+        encodings = ",".join(entry["encodings"])
+        click.echo(f"{static_files.file_hash(entry)} {name} {encodings}".rstrip())
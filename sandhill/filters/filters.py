@@ -13,10 +13,11 @@ from dateutil import parser
 from jinja2 import pass_context, TemplateError
 from markupsafe import Markup
 from sandhill import app, catch
-from sandhill.utils.generic import getconfig, getdescendant
-from sandhill.utils.solr import Solr
+from sandhill.utils.generic import getconfig, getdescendant, getdescendant_many
+from sandhill.utils import solr
 from sandhill.utils.html import HTMLTagFilter
 from sandhill.utils import xml
+from sandhill.utils.template import compile_template
 
 @app.template_filter('formatbinary')
 def formatbinary(value):
@@ -126,7 +127,7 @@ def solr_encodequery(query, escape_wildcards=False):
     Returns:
         (str): The Solr query with appropriate characters encoded. \n
     """
-    return Solr().encode_query(query, escape_wildcards=escape_wildcards)
+    return solr.encode_query(query, escape_wildcards=escape_wildcards)
 
 @app.template_filter('solr_encode')
 def solr_encode(value, escape_wildcards=False, preserve_quotes=False):
@@ -148,7 +149,7 @@ def solr_encode(value, escape_wildcards=False, preserve_quotes=False):
         quotes_exist = True
 
     if isinstance(value, str):
-        value = Solr().encode_value(value, escape_wildcards)
+        value = solr.encode_value(value, escape_wildcards)
 
     if quotes_exist:
         value = f"\"{value}\""
@@ -167,7 +168,7 @@ def solr_decode(value, escape_wildcards=False):
         (str): same string after being decoded \n
     """
     if isinstance(value, str):
-        value = Solr().decode_value(value, escape_wildcards)
+        value = solr.decode_value(value, escape_wildcards)
     return value
 
 @app.template_filter('setchildkey')
@@ -269,7 +270,7 @@ def render(context, value, **kwargs):
     else:
         ctx = context
 
-    data_template = context.environment.from_string(value)
+    data_template = compile_template(value, context.environment)
     return data_template.render(**ctx)
 
 @app.template_filter('renderliteral')
@@ -692,6 +693,21 @@ def filter_getdescendant(obj, list_keys, default=None):
     found = getdescendant(obj, list_keys)
     return default if found is None else found
 
+@app.template_filter('getdescendant_many')
+def filter_getdescendant_many(objs, list_keys, default=None):
+    '''
+    Gets the key values from each of a list of dictionaries/lists, such as a field \
+    from every doc in a search result. \n
+    Args:
+        objs (list): The dicts/lists to check \n
+        list_keys (list|str): List of descendants to follow (or . delimited string) \n
+        default (Any): Default value for each object with no match. Default of None. \n
+    Returns:
+        (list): The matching value from each object, or the default value if not found. \n
+    '''
+    return [default if found is None else found
+            for found in getdescendant_many(objs or [], list_keys)]
+
 @app.template_filter('indexvaluegreaterthan')
 def filter_indexvaluegreaterthan(tuples: list, index, value: int = None):
     '''
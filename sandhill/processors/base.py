@@ -3,79 +3,443 @@ Base processor which handles loading of all other processors dynamically
 so that additional processors can simply be added to this directory without
 requiring code changes to load it.
 '''
+import os
 import json
+import inspect
+import threading
+import contextvars
+from concurrent.futures import Future, ThreadPoolExecutor
 from functools import cache
 from importlib import import_module
-from ast import literal_eval
 from flask import request, abort, Response as FlaskResponse
-from jinja2 import TemplateError
+from jinja2 import TemplateError, meta
 from werkzeug.wrappers.response import Response as WerkzeugReponse
 from werkzeug.exceptions import HTTPException
 from sandhill import app, catch
-from sandhill.utils.template import render_template_json, render_template_string
+from sandhill.utils.aio import run_coroutine
+from sandhill.utils.generic import getconfig
+from sandhill.utils.template import render_template_json, render_template_skeleton, \
+    compile_template_json, evaluate_when
+from sandhill.utils.timing import timed
 
+# Core processors that only read their own arguments (plus loaded data they reference
+# by name), never return a response, and do I/O bound work; entries using these may
+# run concurrently with other entries they do not depend on.
+CONCURRENT_PROCESSORS = frozenset([
+    "file.load_json",
+    "iiif.load_image",
+    "request.api_json",
+    "request.api_json_async",
+    "solr.select",
+    "solr.select_async",
+    "solr.select_record",
+    "solr.select_records",
+    "xml.load",
+    "xml.load_async",
+    "xml.xpath",
+    "xml.xpath_by_id",
+])
 
-def load_route_data(route_data):
+# Per-process thread pool for running processors; see get_processor_pool()
+_processor_pool = {"pid": None, "pool": None}
+_processor_pool_lock = threading.Lock()
+
+# Marks a processor which did not set a value in loaded data
+_UNSET = object()
+
+# Marks a route data entry whose templates are compiled when it is rendered
+_UNCOMPILED = object()
+
+def load_route_data(route_data, parallel=True, loaded_data=None, prepared=None):
     """
     Loop through route data, applying Jinja replacements \n
     and calling route data processors specified \n
+    Entries which do not reference the results of one another may be run \
+    concurrently (see `processor_dependencies()`), though results are always \
+    applied in order, so `on_fail` and returned responses behave as if run sequentially. \
+    Processors which are coroutine functions (`async def`) run on the process event \
+    loop, so independent calls overlap without using a thread each. \n
     Args:
         route_data (list): Data loaded from the route config file \n
+        parallel (bool): Allow independent entries to run concurrently \n
+        loaded_data (dict|None): Data already loaded by earlier entries of the route \n
+        prepared (dict|None): The route data as prepared by `prepare_route_data()`; \
+            prepared when needed if not provided \n
     Returns:
         (dict): The loaded data \n
     """
-    loaded_data = {}
+    loaded_data = dict(loaded_data) if loaded_data else {}
     # add view_args into loaded_data
     loaded_data['view_args'] = request.view_args
-    for i, _ in enumerate(route_data):
-        # Check when clause (if set) prior to attempting to render route processor
-        if not eval_when(route_data[i], loaded_data):
-            continue
 
-        # Apply Jinja2 templating to data config
-        try:
-            route_data[i] = render_template_json(route_data[i], loaded_data)
-        except json.JSONDecodeError:
-            app.logger.warning("Unable to JSON decode route data. Possible bad request for: " \
-                               f"{request.base_url}")
-            abort(400)
-        # Merging loaded data into route data, but route data takes precedence on a key conflict
-        route_data[i] = {**loaded_data, **route_data[i]}
-
-        # Dynamically load processor
-        name, processor, action = identify_processor_components(route_data[i])
-
-        # Identify action from within processor, if valid
-        action_function = identify_processor_function(name, processor, action)
-
-        # Call action from processor
-        if action_function:
-            try:
-                loaded_data[name] = action_function(route_data[i])
-            except HTTPException as exc:
-                # Make abort calls abide by on_fail route setting
-                if 'on_fail' in route_data[i]:
-                    on_fail = int(route_data[i]['on_fail'])
-                    exc_fail = exc.code if hasattr(exc, "code") else 503
-                    on_fail = on_fail if on_fail != 0 else exc_fail
-                    abort(on_fail)
-        # Trigger abort with 'on_fail', if set; otherwise allow failure and continue
-        if (name not in loaded_data or loaded_data[name] is None) and 'on_fail' in route_data[i]:
-            app.logger.warning(
-                f"Processor '{processor}' used for variable '{name}' returned "
-                f"None and had on_fail value of '{route_data[i]['on_fail']}'")
-            try:
-                abort(int(route_data[i]['on_fail']))
-            except ValueError:
-                app.logger.error(f"Invalid on_fail set, must be int: {route_data[i]['on_fail']}")
-                abort(500)
+    skeletons = prepared["skeletons"] if prepared else (_UNCOMPILED,) * len(route_data)
+    pool = get_processor_pool() if parallel else None
+    if parallel:
+        needs = prepared["needs"] if prepared else processor_dependencies(route_data)
+    else:
+        needs = tuple(range(-1, len(route_data) - 1))
 
-        # If the result from the processor is a Response, stop processing and return it
-        if name in loaded_data and isinstance(loaded_data[name], (FlaskResponse, WerkzeugReponse)):
-            return loaded_data[name]
+    futures = []
+    done = 0
+    try:
+        for i, entry in enumerate(route_data):
+            # Apply results of all entries this one depends on before starting it
+            while done <= needs[i]:
+                if (response := apply_processed_entry(
+                        route_data, done, futures[done].result(), loaded_data)) is not None:
+                    return response
+                done += 1
+            # Only hand off if the next entry can start before this one finishes
+            if i + 1 < len(route_data) and needs[i + 1] < i:
+                futures.append(submit_entry(entry, loaded_data, pool, skeletons[i]))
+            else:
+                futures.append(_run_inline(process_entry, entry, loaded_data, skeletons[i]))
+        for idx in range(done, len(futures)):
+            done = idx + 1
+            if (response := apply_processed_entry(
+                    route_data, idx, futures[idx].result(), loaded_data)) is not None:
+                return response
+    finally:
+        # Entries after an abort or a response are no longer needed
+        for future in futures[done:]:
+            future.cancel()
 
     return loaded_data
 
+def _run_inline(func, *args):
+    """
+    Call the function and wrap the outcome in a completed Future, so any exception \
+    is raised only when its result is applied, in order with the other entries. \n
+    Args:
+        func (function): The function to call \n
+        *args: Arguments to pass to the function \n
+    Returns:
+        (concurrent.futures.Future): The completed future \n
+    """
+    future = Future()
+    try:
+        future.set_result(func(*args))
+    except Exception as exc: # pylint: disable=broad-exception-caught
+        future.set_exception(exc)
+    return future
+
+def submit_entry(entry, loaded_data, pool, skeleton=_UNCOMPILED):
+    """
+    Start processing a route data entry without waiting for it to finish. An entry using \
+    a coroutine function processor is rendered immediately and the processor run on the \
+    process event loop; other entries are run in the thread pool, if available. \n
+    Args:
+        entry (dict): A route data entry \n
+        loaded_data (dict): The data loaded by previous entries \n
+        pool (concurrent.futures.ThreadPoolExecutor|None): The processor thread pool \n
+        skeleton (Any): The template skeleton of the entry, from `prepare_route_data()` \n
+    Returns:
+        (concurrent.futures.Future): The future for the result of `process_entry()` \n
+    """
+    if is_async_entry(entry):
+        prepared = _run_inline(prepare_entry, entry, loaded_data, skeleton)
+        if prepared.exception() is not None or prepared.result() is None:
+            return prepared
+        return run_coroutine(process_entry_async(*prepared.result()),
+                             contextvars.copy_context())
+    if pool is None:
+        return _run_inline(process_entry, entry, loaded_data, skeleton)
+    ctx = contextvars.copy_context()
+    return pool.submit(ctx.run, process_entry, entry, dict(loaded_data), skeleton)
+
+def is_async_entry(entry):
+    """
+    Check if a route data entry uses a processor which is a coroutine function. \n
+    Args:
+        entry (dict): A route data entry \n
+    Returns:
+        (bool): True if the processor is a coroutine function \n
+    """
+    if '.' not in str(entry.get('processor', '')):
+        return False
+    processor, action = entry['processor'].rsplit('.', 1)
+    action_function = processor_load_action(f"instance.processors.{processor}", action)[0] \
+        or processor_load_action(f"sandhill.processors.{processor}", action)[0]
+    return inspect.iscoroutinefunction(action_function)
+
+def prepare_entry(entry, loaded_data, skeleton=_UNCOMPILED):
+    """
+    Evaluate the `when`, render, and load the processor for a single route data entry. \
+    The time taken to evaluate and render is recorded (see `sandhill.utils.timing`). \n
+    Args:
+        entry (dict): A route data entry \n
+        loaded_data (dict): The data loaded by previous entries \n
+        skeleton (Any): The template skeleton of the entry without its `when`, from \
+            `prepare_route_data()`; compiled when rendering if not provided \n
+    Returns:
+        (tuple|None): The rendered entry, the processor name, and the processor \
+            function (None if it could not be loaded); or None if the `when` was not truthy. \n
+    """
+    name, processor = entry.get('name'), entry.get('processor')
+    # Check when clause (if set) prior to attempting to render route processor
+    extra = {}
+    if 'when' in entry:
+        with timed(name, processor, "when"):
+            extra['when'] = eval_when(entry, loaded_data)
+        if not extra['when']:
+            return None
+        # The clause is already evaluated; keep its value rather than rendering it again
+        entry = {key: val for key, val in entry.items() if key != 'when'}
+
+    # Apply Jinja2 templating to data config
+    try:
+        with timed(name, processor, "render"):
+            rendered = render_template_json(entry, loaded_data) if skeleton is _UNCOMPILED \
+                else render_template_skeleton(skeleton, entry, loaded_data)
+            entry = {**rendered, **extra}
+    except json.JSONDecodeError:
+        app.logger.warning("Unable to JSON decode route data. Possible bad request for: " \
+                           f"{request.base_url}")
+        abort(400)
+    # Merging loaded data into route data, but route data takes precedence on a key conflict
+    entry = {**loaded_data, **entry}
+
+    # Dynamically load processor
+    name, processor, action = identify_processor_components(entry)
+
+    # Identify action from within processor, if valid
+    action_function = identify_processor_function(name, processor, action)
+    return entry, processor, action_function
+
+def process_entry(entry, loaded_data, skeleton=_UNCOMPILED):
+    """
+    Evaluate the `when`, render, and call the processor for a single route data entry. \
+    A processor which is a coroutine function is run on the process event loop. \
+    The time taken by the processor is recorded (see `sandhill.utils.timing`). \n
+    Args:
+        entry (dict): A route data entry \n
+        loaded_data (dict): The data loaded by previous entries \n
+        skeleton (Any): The template skeleton of the entry, from `prepare_route_data()` \n
+    Returns:
+        (tuple|None): The rendered entry, the processor name, the result (or `_UNSET` \
+            if none), and any HTTPException raised by the processor; or None if the \
+            `when` was not truthy. \n
+    """
+    if (prepared := prepare_entry(entry, loaded_data, skeleton)) is None:
+        return None
+    entry, processor, action_function = prepared
+    if inspect.iscoroutinefunction(action_function):
+        return run_coroutine(process_entry_async(*prepared),
+                             contextvars.copy_context()).result()
+
+    # Call action from processor
+    result, exc = _UNSET, None
+    if action_function:
+        try:
+            with timed(entry['name'], entry['processor'], "execute"):
+                result = action_function(entry)
+        except HTTPException as http_exc:
+            exc = http_exc
+    return entry, processor, result, exc
+
+async def process_entry_async(entry, processor, action_function):
+    """
+    Call a processor which is a coroutine function for a prepared route data entry. \n
+    Args:
+        entry (dict): The rendered route data entry \n
+        processor (str): The processor name \n
+        action_function (function): The processor coroutine function \n
+    Returns:
+        (tuple): The rendered entry, the processor name, the result, and any \
+            HTTPException raised by the processor \n
+    """
+    result, exc = _UNSET, None
+    try:
+        with timed(entry['name'], entry['processor'], "execute"):
+            result = await action_function(entry)
+    except HTTPException as http_exc:
+        exc = http_exc
+    return entry, processor, result, exc
+
+def apply_processed_entry(route_data, idx, processed, loaded_data):
+    """
+    Add the result of a processed entry into the loaded data, applying `on_fail` \
+    when the processor failed. \n
+    Args:
+        route_data (list): Data loaded from the route config file \n
+        idx (int): The index of the processed entry within route_data \n
+        processed (tuple|None): The return value of `process_entry()` \n
+        loaded_data (dict): The loaded data to update \n
+    Returns:
+        (flask.Response|None): The response if the processor returned one, otherwise None \n
+    Raises:
+        HTTPException: If the processor failed and `on_fail` is set \n
+    """
+    if processed is None:
+        return None
+    route_data[idx], processor, result, exc = processed
+    name = route_data[idx]['name']
+    if exc is not None and 'on_fail' in route_data[idx]:
+        # Make abort calls abide by on_fail route setting
+        on_fail = int(route_data[idx]['on_fail'])
+        exc_fail = exc.code if hasattr(exc, "code") else 503
+        on_fail = on_fail if on_fail != 0 else exc_fail
+        abort(on_fail)
+    if result is not _UNSET:
+        loaded_data[name] = result
+
+    # Trigger abort with 'on_fail', if set; otherwise allow failure and continue
+    if (name not in loaded_data or loaded_data[name] is None) and 'on_fail' in route_data[idx]:
+        app.logger.warning(
+            f"Processor '{processor}' used for variable '{name}' returned "
+            f"None and had on_fail value of '{route_data[idx]['on_fail']}'")
+        try:
+            abort(int(route_data[idx]['on_fail']))
+        except ValueError:
+            app.logger.error(f"Invalid on_fail set, must be int: {route_data[idx]['on_fail']}")
+            abort(500)
+
+    # If the result from the processor is a Response, stop processing and return it
+    if name in loaded_data and isinstance(loaded_data[name], (FlaskResponse, WerkzeugReponse)):
+        return loaded_data[name]
+    return None
+
+def get_processor_pool():
+    """
+    Get the thread pool used to run processors concurrently, sized by the \
+    `PROCESSOR_THREADS` config. The pool is recreated after a fork. \n
+    Returns:
+        (concurrent.futures.ThreadPoolExecutor|None): The pool, or None if \
+            `PROCESSOR_THREADS` is 0 \n
+    """
+    threads = int(getconfig('PROCESSOR_THREADS', 4))
+    if threads < 1:
+        return None
+    with _processor_pool_lock:
+        if _processor_pool["pid"] != os.getpid():
+            _processor_pool["pid"] = os.getpid()
+            _processor_pool["pool"] = ThreadPoolExecutor(
+                max_workers=threads, thread_name_prefix="sandhill-processor"
+            )
+        return _processor_pool["pool"]
+
+def prepare_route_data(route_data):
+    """
+    Compile the templates of each route data entry and determine their dependencies \
+    ahead of requests, so neither is repeated while processing each request. The route \
+    registry prepares the route data of each route once \
+    (see `sandhill.utils.config_loader.load_route()`). \n
+    Args:
+        route_data (list): The route data entries \n
+    Returns:
+        (dict): The prepared route data, with `skeletons`, the template skeleton of each \
+            entry (see `compile_template_json()`), and `needs`, the result of \
+            `processor_dependencies()` \n
+    """
+    return {
+        "skeletons": tuple(_entry_skeleton(entry) for entry in route_data),
+        "needs": processor_dependencies(route_data),
+    }
+
+def _entry_skeleton(entry):
+    """
+    Compile the template skeleton of a route data entry, as rendered by `prepare_entry()`. \n
+    Args:
+        entry (dict): A route data entry \n
+    Returns:
+        (Any): The skeleton, or `_UNCOMPILED` if it has invalid templates, leaving \
+            the error to be raised when rendered \n
+    """
+    try:
+        return compile_template_json({key: val for key, val in entry.items() if key != 'when'})
+    except TemplateError:
+        return _UNCOMPILED
+
+def slice_prepared(prepared, start, stop=None):
+    """
+    Get the prepared route data for a slice of route data, as `route_data[start:stop]`. \n
+    Args:
+        prepared (dict|None): The route data as prepared by `prepare_route_data()` \n
+        start (int): The index of the first entry \n
+        stop (int|None): The index after the last entry; default to the end \n
+    Returns:
+        (dict|None): The prepared slice, or None if prepared is None \n
+    """
+    if prepared is None:
+        return None
+    # Entries before the slice are loaded before it starts
+    return {
+        "skeletons": prepared["skeletons"][start:stop],
+        "needs": tuple(max(need - start, -1) for need in prepared["needs"][start:stop]),
+    }
+
+def processor_dependencies(route_data):
+    """
+    Determine, for each route data entry, the index of the last earlier entry whose \
+    result must be loaded before the entry can be processed. An entry depends on \
+    each earlier entry whose `name` it references, either as a variable within \
+    Jinja (including its `when`) or as a plain string value (e.g. `"response": "image"`), \
+    as well as earlier entries with the same `name`. Entries not using one of the \
+    `CONCURRENT_PROCESSORS` (or using one overridden by the instance) depend on all \
+    entries before them, and all entries after them depend on them. \n
+    Args:
+        route_data (list): Data loaded from the route config file \n
+    Returns:
+        (tuple[int]): For each entry, the index of the entry it must wait for, or -1 \n
+    """
+    needs = []
+    barrier = -1
+    for idx, entry in enumerate(route_data):
+        refs = _entry_references(entry) if _is_concurrent(entry) else None
+        if refs is None:
+            needs.append(idx - 1)
+            barrier = idx
+            continue
+        names = set(refs) | {entry.get('name')}
+        deps = [jdx for jdx in range(idx) if route_data[jdx].get('name') in names]
+        needs.append(max(deps + [barrier]))
+    return tuple(needs)
+
+def _is_concurrent(entry):
+    """
+    Check if the entry uses a processor which may be run concurrently. \n
+    Args:
+        entry (dict): A route data entry \n
+    Returns:
+        (bool): True if the entry may run concurrently with other entries \n
+    """
+    processor = entry.get('processor')
+    if processor not in CONCURRENT_PROCESSORS:
+        return False
+    if processor in ("request.api_json", "request.api_json_async") and \
+            str(entry.get('method', 'GET')).upper() not in ('GET', 'HEAD'):
+        return False
+    module, action = processor.rsplit('.', 1)
+    return processor_load_action(f"instance.processors.{module}", action)[0] is None
+
+def _entry_references(node, refs=None):
+    """
+    Collect all names a route data entry may reference. \n
+    Args:
+        node (Any): The entry, or a value within it \n
+        refs (set|None): The names found so far \n
+    Returns:
+        (set|None): The referenced names, or None if a template could not be parsed \n
+    """
+    refs = set() if refs is None else refs
+    if isinstance(node, dict):
+        for key, val in node.items():
+            if _entry_references(key, refs) is None or _entry_references(val, refs) is None:
+                return None
+    elif isinstance(node, list):
+        for val in node:
+            if _entry_references(val, refs) is None:
+                return None
+    elif isinstance(node, str):
+        if any(tag in node for tag in ("{{", "{%", "{#")):
+            try:
+                refs.update(meta.find_undeclared_variables(app.jinja_env.parse(node)))
+            except TemplateError:
+                return None
+        else:
+            refs.update([node, node.split('.', 1)[0]])
+    return refs
+
 def identify_processor_components(route_data):
     '''
     Get the processor name, function name, and variable name components \n
@@ -140,7 +504,8 @@ def processor_load_action(absolute_module, action):
 def eval_when(route_data, loaded_data):
     '''
     Evaluate the 'when' key of a data processor to determine if that data processor \
-    should be processed. \n
+    should be processed. The clause is compiled once (see `compile_when()`) and the \
+    route data is not modified. \n
     Args:
         route_data (dict): a data processor entry \n
     Returns:
@@ -150,10 +515,9 @@ def eval_when(route_data, loaded_data):
     when = True
     if 'when' in route_data:
         try:
-            route_data['when'] = render_template_string(route_data['when'], loaded_data)
+            when = evaluate_when(route_data['when'], loaded_data)
         except TemplateError:
             app.logger.warning(f"Unable to render 'when' clause for '{route_data['name']}' " \
                                f"(check syntax and values): {route_data['when']}")
             abort(500)
-        when = literal_eval(route_data['when'])
     return when
@@ -6,12 +6,20 @@ from requests.exceptions import RequestException
 from sandhill import app, catch
 from sandhill.utils.api import api_get, establish_url
 from sandhill.utils.generic import getconfig
+from sandhill.utils.request import forward_headers
+from sandhill.utils.iiif import load_cached_image
 from sandhill.utils.error_handling import dp_abort
 
+# Client request headers passed on to the IIIF server
+PROXY_REQUEST_HEADERS = ['Range', 'If-Range', 'If-None-Match', 'If-Modified-Since']
+
 @catch(RequestException, "Call to IIIF Server failed: {exc}", abort=503)
 def load_image(data, url=None, api_get_function=api_get):
     '''
-    Load and return a IIIF image. \n
+    Load and return a IIIF image. The client's range and conditional request headers \
+    are passed to the IIIF server, so the returned response may be a partial (206) \
+    or not modified (304) response. If `IIIF_TILE_CACHE` is enabled, images are loaded \
+    through the local tile cache instead (see `sandhill.utils.iiif`). \n
     Args:
         data (dict): route data where `data[view_ags][iiif_path]` and `data[identifier]` exist \n
         url (str): Override the IIIF server URL from the default IIIF_BASE in the configs \n
@@ -23,10 +31,15 @@ def load_image(data, url=None, api_get_function=api_get):
     '''
     image = None
     url = establish_url(url, getconfig('IIIF_BASE', None))
-    if 'iiif_path' in data['view_args'] and 'identifier' in data:
+    if 'iiif_path' in data['view_args'] and 'identifier' in data \
+            and int(getconfig('IIIF_TILE_CACHE', 0)):
+        image = load_cached_image(
+            url, data['identifier'], data['view_args']['iiif_path'], api_get_function)
+    elif 'iiif_path' in data['view_args'] and 'identifier' in data:
         image = api_get_function(
             url=os.path.join(url, data['identifier'], data['view_args']['iiif_path']),
-            stream=True)
+            stream=True,
+            headers=forward_headers(PROXY_REQUEST_HEADERS))
     else:
         app.logger.warning("Could not call IIIF Server; missing identifier or iiif_path")
         dp_abort(500)
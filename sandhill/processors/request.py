@@ -2,10 +2,10 @@
 Processor for requests
 '''
 from json.decoder import JSONDecodeError
-import requests
 from requests.exceptions import RequestException
 from flask import abort, redirect as FlaskRedirect
 from sandhill import app, catch
+from sandhill.utils.api import get_session, get_timeout, api_request_async
 from sandhill.utils.error_handling import dp_abort
 
 @catch(RequestException, "Call to {data[url]} returned {exc}.", abort=503)
@@ -18,7 +18,7 @@ def api_json(data):
             * `method` _str, optional_: The HTTP method to use.\n
                 Default: `"GET"` \n
             * `timeout` _int, optional_: The request timeout in seconds.\n
-                Default: `10` \n
+                Default: The `HTTP_TIMEOUT` config (or `HTTP_HOST_TIMEOUTS` for the host) \n
     Returns:
         (dict): The JSON response from the API call. \n
     Raises:
@@ -26,12 +26,46 @@ def api_json(data):
     '''
     method = data['method'] if 'method' in data else 'GET'
     app.logger.debug(f"Connecting to {data['url']}")
-    response = requests.request(
+    response = get_session(data["url"]).request(
         method=method,
         url=data["url"],
-        timeout=data.get('timeout', 10)
+        timeout=data.get('timeout', get_timeout(data["url"]))
     )
 
+    return json_response(data, response)
+
+@catch(RequestException, "Call to {data[url]} returned {exc}.", abort=503)
+async def api_json_async(data):
+    '''
+    Make a call to an API without blocking and return the response content as JSON; \
+    the asynchronous version of `api_json()`, allowing calls from multiple data \
+    processors to be made at once. \n
+    Args:
+        data (dict): Processor arguments, as for `api_json()`.\n
+    Returns:
+        (dict): The JSON response from the API call. \n
+    Raises:
+        (HTTPException): On failure if `on_fail` is set. \n
+    '''
+    app.logger.debug(f"Connecting to {data['url']}")
+    response = await api_request_async(
+        data.get('method', 'GET'),
+        data["url"],
+        timeout=data.get('timeout')
+    )
+    return json_response(data, response)
+
+def json_response(data, response):
+    '''
+    Handle the response of an API call made by `api_json()`. \n
+    Args:
+        data (dict): The `api_json` processor arguments \n
+        response (requests.Response): The API response \n
+    Returns:
+        (dict): The JSON response, or an empty dict if the response was not JSON. \n
+    Raises:
+        (HTTPException): On failure if `on_fail` is set. \n
+    '''
     if not response.ok:
         app.logger.warning(f"Call to {data['url']} returned a non-ok status code: " \
                            f"{response.status_code}. {response.__dict__}")
@@ -1,19 +1,42 @@
 """
 Wrappers for making API calls to a Solr node.
 """
+import io
+import csv
+import asyncio
+import json
+import time
+import hashlib
+import threading
+import contextvars
+from ast import literal_eval
 from collections.abc import Sequence
-from urllib.parse import urlencode
+from urllib.parse import urlencode, quote_plus
+from xml.sax.saxutils import escape, quoteattr
 from json.decoder import JSONDecodeError
 from urllib3.exceptions import HTTPError
 from requests.exceptions import RequestException
-from flask import jsonify, abort
-from sandhill.utils.api import api_get, establish_url
+from requests.models import Response as RequestsResponse
+from flask import jsonify, abort, stream_with_context, Response as FlaskResponse
+from sandhill.utils.api import api_get, api_get_async, establish_url
 from sandhill import app, catch
 from sandhill.utils.generic import getdescendant, ifnone, getconfig, recursive_merge
 from sandhill.utils.request import overlay_with_query_args
 from sandhill.utils.response import to_response
 from sandhill.processors.file import load_json
 from sandhill.utils.error_handling import dp_abort
+from sandhill.utils import metrics
+from sandhill.utils.lrucache import LRUCache
+from sandhill.utils.sandcache import sandcache
+
+# Cache of Solr select responses; see cached_select()
+_select_cache = {"memory": None}
+_select_cache_lock = threading.Lock()
+_select_cache_stats = {"hits": 0, "misses": 0, "stale": 0, "refreshes": 0}
+
+# The cache statistics which are lookups, mapped to the result label for the cache metrics
+CACHE_RESULTS = {"hits": "hit", "misses": "miss", "stale": "stale"}
+_select_refreshing = set()
 
 @catch((RequestException, HTTPError), "Call to Solr failed: {exc}", abort=503)
 @catch(JSONDecodeError, "Call returned from Solr that was not JSON.", abort=503)
@@ -31,6 +54,11 @@ def select(data, url=None, api_get_function=api_get):
             * `params` _dict_: Query arguments to pass to Solr.\n
             * `record_keys` _string, optional_: Return this [descendant path](#TODO) from \
               the response JSON.\n
+            * `cache_ttl` _int, optional_: Cache the Solr response for this many seconds \
+              (see `cached_select()`). Default: no caching\n
+            * `cache_stale` _int, optional_: After the `cache_ttl`, continue to serve the \
+              cached response for this many seconds while it is refreshed in the background. \
+              Default: The `SOLR_CACHE_STALE` config\n
         url (str): Overrides the default SOLR_URL normally retrieved from \
                    the [Sandhill config](#TODO) file.\n
         api_get_function (function): Function used to call Solr with. Used in unit tests.\n
@@ -45,7 +73,57 @@ def select(data, url=None, api_get_function=api_get):
 
     # query solr with the parameters
     app.logger.debug(f"Connecting to {url}?{urlencode(data['params'])}")
-    response = api_get_function(url=url, params=data['params'])
+    if int(data.get('cache_ttl', 0)) > 0:
+        response = cached_select(data, url, api_get_function)
+    else:
+        response = api_get_function(url=url, params=data['params'])
+    return select_response(data, response)
+
+@catch((RequestException, HTTPError), "Call to Solr failed: {exc}", abort=503)
+@catch(JSONDecodeError, "Call returned from Solr that was not JSON.", abort=503)
+@catch(KeyError, "Missing url component: {exc}", abort=400) # Missing 'params' key
+async def select_async(data, url=None, api_get_function=api_get_async):
+    """
+    Perform a Solr select call without blocking; the asynchronous version of `select()`, \
+    allowing calls from multiple data processors to be made at once. \n
+    ```json
+    "name": "mysearch",
+    "processor": "solr.select_async",
+    "params": { "q": "*", "rows":"20" }
+    ``` \n
+    Args:
+        data (dict): Processor arguments, as for `select()`. With `cache_ttl` set, the \
+            cached call is made by `select()` in a separate thread.\n
+        url (str): Overrides the default SOLR_URL normally retrieved from \
+                   the [Sandhill config](#TODO) file.\n
+        api_get_function (function): Coroutine function used to call Solr with. \
+            Used in unit tests.\n
+    Returns:
+        (dict|None): The loaded JSON data or None if nothing matched. \n
+    Raises:
+        wergzeug.exceptions.HTTPException: If `on_fail` is set. \n
+    """
+    if int(data.get('cache_ttl', 0)) > 0:
+        return await asyncio.to_thread(select, data, url)
+
+    url = establish_url(url, getconfig('SOLR_URL', None))
+    url = url + "/select"
+    app.logger.debug(f"Connecting to {url}?{urlencode(data['params'])}")
+    response = await api_get_function(url=url, params=data['params'])
+    return select_response(data, response)
+
+def select_response(data, response):
+    """
+    Handle the response from a Solr select call. \n
+    Args:
+        data (dict): The `select` processor arguments \n
+        response (requests.Response): The Solr response \n
+    Returns:
+        (dict|str|None): The loaded JSON data, the response text if a `wt` other than \
+            `json` was requested, or None if the call failed or nothing matched. \n
+    Raises:
+        wergzeug.exceptions.HTTPException: If the call failed and `on_fail` is set. \n
+    """
     response_json = None
     if not response.ok:
         app.logger.warning(f"Call to Solr returned {response.status_code}. {response}")
@@ -66,6 +144,171 @@ def select(data, url=None, api_get_function=api_get):
 
     return response_json
 
+def cached_select(data, url, api_get_function=api_get):
+    """
+    Perform the Solr select call, using a cached response when available. Responses are \
+    cached in memory or on disk (shared by all processes), per the `SOLR_CACHE_BACKEND` \
+    config. Only successful responses are cached. \n
+    Args:
+        data (dict): The `select` processor arguments with `params` and `cache_ttl`, \
+            and optionally `cache_stale`.\n
+        url (str): The Solr select URL \n
+        api_get_function (function): Function used to call Solr with. Used in unit tests.\n
+    Returns:
+        (requests.Response): The Solr response \n
+    """
+    ttl = int(data['cache_ttl'])
+    stale = int(data.get('cache_stale', getconfig('SOLR_CACHE_STALE', 0)))
+    key = select_cache_key(url, data['params'])
+    cached = _select_cache_get(key)
+    now = time.time()
+    if cached and now < cached['expires']:
+        _select_cache_count('hits')
+        return _select_cached_response(url, cached['text'])
+    if cached and now < cached['stale_until']:
+        _select_cache_count('stale')
+        _select_cache_refresh(key, url, data['params'], (ttl, stale), api_get_function)
+        return _select_cached_response(url, cached['text'])
+    _select_cache_count('misses')
+    response = api_get_function(url=url, params=data['params'])
+    _select_cache_store(key, response, ttl, stale)
+    return response
+
+def select_cache_key(url, params):
+    """
+    Create the cache key for a Solr select call. Parameters are sorted by name \
+    and `fq` values are sorted and deduplicated, as their order does not affect \
+    the response. \n
+    Args:
+        url (str): The Solr select URL \n
+        params (dict): The query parameters for the call \n
+    Returns:
+        (str): The cache key \n
+    """
+    canonical = []
+    for name in sorted(params):
+        value = params[name]
+        if isinstance(value, (list, tuple)):
+            value = sorted({str(val) for val in value}) if name == 'fq' else \
+                [str(val) for val in value]
+        else:
+            value = str(value)
+        canonical.append([name, value])
+    serialized = json.dumps([url, canonical])
+    return "solr:" + hashlib.sha1(serialized.encode('utf-8')).hexdigest()
+
+def select_cache_info():
+    """
+    Get the statistics for the Solr response cache. \n
+    Returns:
+        (dict): Counts of `hits`, `misses`, `stale` hits, and background `refreshes`, \
+            along with the `backend` in use. \n
+    """
+    with _select_cache_lock:
+        info = dict(_select_cache_stats)
+    info['backend'] = getconfig('SOLR_CACHE_BACKEND', 'memory')
+    if _select_cache["memory"] is not None:
+        info['memory'] = _select_cache["memory"].info()
+    return info
+
+def _select_cache_count(stat):
+    """
+    Increment a Solr response cache statistic, and the cache metrics (see \
+    `sandhill.utils.metrics`). \n
+    Args:
+        stat (str): The name of the statistic \n
+    """
+    with _select_cache_lock:
+        _select_cache_stats[stat] += 1
+    if stat in CACHE_RESULTS:
+        metrics.count("sandhill_cache_requests_total", cache="solr", result=CACHE_RESULTS[stat])
+
+def _select_memory_cache():
+    """
+    Get the in-memory Solr response cache, creating it on first use. \n
+    Returns:
+        (LRUCache): The cache \n
+    """
+    with _select_cache_lock:
+        if _select_cache["memory"] is None:
+            _select_cache["memory"] = LRUCache(maxsize=int(getconfig('SOLR_CACHE_SIZE', 256)))
+        return _select_cache["memory"]
+
+def _select_cache_get(key):
+    """
+    Get a cached Solr response from the configured backend. \n
+    Args:
+        key (str): The cache key \n
+    Returns:
+        (dict|None): The cached `text`, `expires`, and `stale_until`; or None if not cached \n
+    """
+    if getconfig('SOLR_CACHE_BACKEND', 'memory') == 'disk':
+        return sandcache('solr').get(key)
+    return _select_memory_cache().get(key)
+
+def _select_cache_store(key, response, ttl, stale):
+    """
+    Store a successful Solr response in the configured backend. \n
+    Args:
+        key (str): The cache key \n
+        response (requests.Response): The Solr response \n
+        ttl (int): Seconds the response is fresh for \n
+        stale (int): Additional seconds the response may be served while being refreshed \n
+    """
+    if not response.ok:
+        return
+    now = time.time()
+    cached = {"text": response.text, "expires": now + ttl, "stale_until": now + ttl + stale}
+    if getconfig('SOLR_CACHE_BACKEND', 'memory') == 'disk':
+        sandcache('solr').set(key, cached, expire=ttl + stale)
+    else:
+        _select_memory_cache().set(key, cached, expire=ttl + stale)
+
+def _select_cache_refresh(key, url, params, lifetime, api_get_function):
+    """
+    Refresh a cached Solr response in a background thread, unless a refresh for \
+    the same key is already running. \n
+    Args:
+        key (str): The cache key \n
+        url (str): The Solr select URL \n
+        params (dict): The query parameters for the call \n
+        lifetime (tuple[int, int]): The ttl and stale seconds for the refreshed response \n
+        api_get_function (function): Function used to call Solr with \n
+    """
+    with _select_cache_lock:
+        if key in _select_refreshing:
+            return
+        _select_refreshing.add(key)
+
+    def refresh():
+        try:
+            _select_cache_store(key, api_get_function(url=url, params=params), *lifetime)
+            _select_cache_count('refreshes')
+        except (RequestException, HTTPError) as exc:
+            app.logger.warning(f"Unable to refresh cached Solr response for {url}: {exc}")
+        finally:
+            with _select_cache_lock:
+                _select_refreshing.discard(key)
+
+    # Run outside of the request, which may finish first, so the refresh is recorded
+    # in the metrics store directly rather than in the request's pending metrics
+    threading.Thread(target=contextvars.Context().run, args=(refresh,), daemon=True).start()
+
+def _select_cached_response(url, text):
+    """
+    Create a response object for a cached Solr response. \n
+    Args:
+        url (str): The Solr select URL \n
+        text (str): The cached response body \n
+    Returns:
+        (requests.Response): The response \n
+    """
+    response = RequestsResponse()
+    response.status_code = 200
+    response.url = url
+    response.encoding = 'utf-8'
+    response._content = text.encode('utf-8') # pylint: disable=protected-access
+    return response
 
 def select_record(data, url=None, api_get_function=api_get):
     """
@@ -75,6 +318,7 @@ def select_record(data, url=None, api_get_function=api_get):
             * `params` _dict_: Query arguments to pass to Solr.\n
             * `record_keys` _string, optional_: Return this [descendant path](#TODO) from \
               the response JSON. Default: `response.docs`\n
+            * `cache_ttl` _int, optional_: Cache the Solr response; see `select()`.\n
         url (str): Overrides the default SOLR_URL normally retrieved from the \
                    [Sandhill config](#TODO) file.\n
         api_get_function (function): Function used to call Solr with. Used in unit tests.\n
@@ -91,6 +335,337 @@ def select_record(data, url=None, api_get_function=api_get):
     return None
 
 
+# Separators tried in turn for the terms query, avoiding one used within an identifier
+TERMS_SEPARATORS = [',', '|', ';', ' ']
+
+def select_records(data, url=None, api_get_function=api_get):
+    """
+    Load the Solr records for a list of identifiers with a single [terms query]\
+(https://solr.apache.org/guide/solr/latest/query-guide/other-parsers.html#terms-query-parser) \
+    instead of a `select_record` call per identifier. The identifiers are split \
+    over multiple calls only if needed to keep the URL within the `SOLR_MAX_URL_LENGTH` config. \n
+    ```json
+    "name": "children",
+    "processor": "solr.select_records",
+    "ids": "{{ parent.children }}",
+    "params": { "fl": "id,title" }
+    ``` \n
+    Args:
+        data (dict): Processor arguments and all other data loaded from previous data processors.\n
+            * `ids` _list|str_: The identifiers to load; see `record_ids()`.\n
+            * `field` _str, optional_: The field to match the identifiers against. \
+              Default: the `SOLR_UNIQUE_KEY` config\n
+            * `params` _dict, optional_: Additional query arguments to pass to Solr, \
+              such as `fl` or `fq`.\n
+            * `cache_ttl` _int, optional_: Cache the Solr responses; see `select()`.\n
+        url (str): Overrides the default SOLR_URL normally retrieved from \
+                   the [Sandhill config](#TODO) file.\n
+        api_get_function (function): Function used to call Solr with. Used in unit tests.\n
+    Returns:
+        (dict|None): The records keyed by identifier, in the order of `ids`; identifiers \
+            without a matching record have a value of None. None if a call to Solr failed. \n
+    Raises:
+        wergzeug.exceptions.HTTPException: If `on_fail` is set. \n
+    """
+    ids = record_ids(data.get('ids') or [])
+    records = dict.fromkeys(str(ident).strip() for ident in ids if str(ident).strip())
+    if not records:
+        return records
+    field = data.get('field', getconfig('SOLR_UNIQUE_KEY', 'id'))
+    if (terms := terms_prefix(field, records)) is None:
+        app.logger.error("solr.select_records unable to find a separator for the ids.")
+        dp_abort(400)
+        return None
+    local_params, separator = terms
+
+    params = {name: val for name, val in data.get('params', {}).items()
+              if name not in ('q', 'rows', 'start')}
+    query_url = f"{establish_url(url, getconfig('SOLR_URL', None))}/select?" \
+        f"{urlencode(params, doseq=True)}&q={quote_plus(local_params)}&rows=000"
+    for chunk in _terms_chunks(list(records), separator, len(query_url)):
+        query = {**data, 'record_keys': 'response.docs',
+                 'params': {**params, 'q': local_params + separator.join(chunk),
+                            'rows': len(chunk)}}
+        docs = select(query, url, api_get_function)
+        if docs is None:
+            return None
+        records.update({str(doc.get(field)): doc for doc in docs
+                        if str(doc.get(field)) in records})
+    return records
+
+def record_ids(ids):
+    """
+    Get the identifiers for `select_records()`. A string is split on commas, unless \
+    it is a rendered list, as from `"ids": "{{ parent.children }}"` (which renders \
+    as `['a:1', 'b:2']`), in which case the list is parsed. \n
+    Args:
+        ids (list|str): The identifiers \n
+    Returns:
+        (list): The identifiers \n
+    """
+    if not isinstance(ids, str):
+        return ids
+    if ids.strip().startswith('['):
+        try:
+            if isinstance(parsed := literal_eval(ids.strip()), (list, tuple)):
+                return list(parsed)
+        except (ValueError, SyntaxError):
+            app.logger.warning(f"solr.select_records unable to parse ids as a list: {ids}")
+    return ids.split(',')
+
+def terms_prefix(field, ids):
+    """
+    Get the local params for a terms query, choosing a separator not found in the identifiers. \n
+    Args:
+        field (str): The field to match the identifiers against \n
+        ids (Iterable): The identifiers \n
+    Returns:
+        (tuple|None): The local params and the separator, or None if every separator \
+            is used within an identifier \n
+    """
+    separator = next((sep for sep in TERMS_SEPARATORS
+                      if not any(sep in ident for ident in ids)), None)
+    if separator is None:
+        return None
+    if separator == ',':
+        return f"{{!terms f={field}}}", separator
+    return f"{{!terms f={field} separator='{separator}'}}", separator
+
+def _terms_chunks(ids, separator, url_length):
+    """
+    Split identifiers into groups which each fit within the `SOLR_MAX_URL_LENGTH` config. \n
+    Args:
+        ids (list): The identifiers \n
+        separator (str): The separator between identifiers \n
+        url_length (int): The length of the URL without any identifiers \n
+    Returns:
+        (list): Lists of identifiers; each contains at least one identifier \n
+    """
+    budget = int(getconfig('SOLR_MAX_URL_LENGTH', 4000)) - url_length
+    chunks, chunk, length = [], [], 0
+    for ident in ids:
+        size = len(quote_plus(ident)) + len(quote_plus(separator))
+        if chunk and length + size > budget:
+            chunks.append(chunk)
+            chunk, length = [], 0
+        chunk.append(ident)
+        length += size
+    chunks.append(chunk)
+    return chunks
+
+# Export formats mapped to their mimetype
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+    'xml': 'application/xml',
+}
+
+@catch((RequestException, HTTPError), "Call to Solr failed: {exc}", abort=503)
+@catch(JSONDecodeError, "Call returned from Solr that was not JSON.", abort=503)
+@catch(KeyError, "Missing url component: {exc}", abort=400) # Missing 'params' key
+def export(data, url=None, api_get_function=api_get):
+    """
+    Stream all results of a Solr query, paging through them with a \
+    [cursor](https://solr.apache.org/guide/solr/latest/query-guide/pagination-of-results.html). \
+    Only one page of results is held in memory at a time. The first page is loaded \
+    before the response starts, so a failed query results in an error status. \n
+    ```json
+    "name": "export",
+    "processor": "solr.export",
+    "params": { "q": "*:*", "fl": "id,title" },
+    "format": "{{ view_args.format }}",
+    "max_records": 100000
+    ``` \n
+    Args:
+        data (dict): Processor arguments and all other data loaded from previous data processors.\n
+            * `params` _dict_: Query arguments to pass to Solr. A `sort` must include \
+              the unique key field, which is added if missing.\n
+            * `format` _str, optional_: One of `csv`, `jsonl` (JSON Lines), or `xml`. \
+              Default: `csv`\n
+            * `page_size` _int, optional_: Records to request per call to Solr. \
+              Default: the `SOLR_EXPORT_PAGE_SIZE` config\n
+            * `max_records` _int, optional_: Stop after this many records; 0 for no limit. \
+              Default: the `SOLR_EXPORT_MAX_RECORDS` config\n
+            * `unique_key` _str, optional_: The unique key field of the Solr schema. \
+              Default: the `SOLR_UNIQUE_KEY` config\n
+            * `filename` _str, optional_: Send the export as an attachment with this filename.\n
+        url (str): Overrides the default SOLR_URL normally retrieved from \
+                   the [Sandhill config](#TODO) file.\n
+        api_get_function (function): Function used to call Solr with. Used in unit tests.\n
+    Returns:
+        (flask.Response|None): The streaming response, or None on failure \n
+    Raises:
+        wergzeug.exceptions.HTTPException: If `on_fail` is set. \n
+    """
+    export_format = data.get('format') or 'csv'
+    if export_format not in EXPORT_FORMATS:
+        app.logger.warning(f"Invalid solr.export format: {export_format}")
+        dp_abort(501)
+        return None
+
+    url = establish_url(url, getconfig('SOLR_URL', None)) + "/select"
+    unique_key = data.get('unique_key', getconfig('SOLR_UNIQUE_KEY', 'id'))
+    params = export_params(data['params'], unique_key)
+    page_size = int(data.get('page_size', getconfig('SOLR_EXPORT_PAGE_SIZE', 1000)))
+    max_records = int(data.get('max_records', getconfig('SOLR_EXPORT_MAX_RECORDS', 0)))
+
+    app.logger.debug(f"Exporting from {url}?{urlencode(params)}")
+    first = _export_page(url, params, page_size, '*', api_get_function)
+    if first is None:
+        dp_abort(503)
+        return None
+
+    pages = _export_pages(url, params, (page_size, max_records), first, api_get_function)
+    writer = {'csv': _export_csv, 'jsonl': _export_jsonl, 'xml': _export_xml}[export_format]
+    response = FlaskResponse(
+        stream_with_context(writer(pages, params.get('fl'))),
+        mimetype=EXPORT_FORMATS[export_format]
+    )
+    if data.get('filename'):
+        response.headers.set('Content-Disposition', 'attachment', filename=data['filename'])
+    return response
+
+def export_params(params, unique_key):
+    """
+    Prepare query parameters for paging with a cursor, which requires a sort \
+    on the unique key field and does not allow a `start` offset. \n
+    Args:
+        params (dict): The query parameters \n
+        unique_key (str): The unique key field of the Solr schema \n
+    Returns:
+        (dict): A copy of the parameters with the `sort` set \n
+    """
+    params = {name: val for name, val in params.items() if name not in ('start', 'rows')}
+    params['wt'] = 'json'
+    sort = params.get('sort', '').strip()
+    sort_fields = [clause.split()[0] for clause in sort.split(',') if clause.strip()]
+    if unique_key not in sort_fields:
+        params['sort'] = f"{sort},{unique_key} asc" if sort else f"{unique_key} asc"
+    return params
+
+def _export_page(url, params, rows, cursor, api_get_function):
+    """
+    Load one page of results for an export. \n
+    Args:
+        url (str): The Solr select URL \n
+        params (dict): The query parameters \n
+        rows (int): The number of records to request \n
+        cursor (str): The cursor mark of the page \n
+        api_get_function (function): Function used to call Solr with \n
+    Returns:
+        (dict|None): The response JSON, or None if the call was not successful \n
+    """
+    response = api_get_function(url=url, params={**params, 'rows': rows, 'cursorMark': cursor})
+    if not response.ok:
+        app.logger.warning(f"Call to Solr returned {response.status_code}. {response}")
+        return None
+    return response.json()
+
+def _export_pages(url, params, limits, first, api_get_function):
+    """
+    Generate the lists of records for an export, one page at a time. \n
+    Args:
+        url (str): The Solr select URL \n
+        params (dict): The query parameters \n
+        limits (tuple[int, int]): The page size and maximum records (0 for no limit) \n
+        first (dict): The response JSON of the first page \n
+        api_get_function (function): Function used to call Solr with \n
+    Returns:
+        (Generator): Lists of records \n
+    """
+    page_size, max_records = limits
+    page, cursor, sent = first, '*', 0
+    while page is not None:
+        docs = getdescendant(page, 'response.docs') or []
+        if max_records:
+            docs = docs[:max_records - sent]
+        if docs:
+            yield docs
+        sent += len(docs)
+        next_cursor = page.get('nextCursorMark')
+        if not docs or next_cursor in (None, cursor) or (max_records and sent >= max_records):
+            return
+        cursor = next_cursor
+        rows = min(page_size, max_records - sent) if max_records else page_size
+        try:
+            page = _export_page(url, params, rows, cursor, api_get_function)
+        except (RequestException, HTTPError, JSONDecodeError) as exc:
+            app.logger.error(f"Solr export failed after {sent} records: {exc}")
+            return
+        if page is None:
+            app.logger.error(f"Solr export failed after {sent} records")
+
+def _export_value(value, separator='|'):
+    """
+    Format a field value for CSV output; multi-valued fields are joined by the separator. \n
+    Args:
+        value (Any): The field value \n
+        separator (str): The separator for multiple values \n
+    Returns:
+        (str): The formatted value \n
+    """
+    if isinstance(value, list):
+        return separator.join(str(val) for val in value)
+    return value
+
+def _export_csv(pages, field_list=None):
+    """
+    Generate CSV output from pages of records. Columns are taken from the `fl` \
+    parameter, or otherwise the fields of the first page of records. \n
+    Args:
+        pages (Generator): Lists of records \n
+        field_list (str|None): The `fl` query parameter \n
+    Returns:
+        (Generator): The CSV output \n
+    """
+    fields = [field for field in (field_list or '').replace(',', ' ').split()
+              if field != '*' and ':' not in field]
+    buffer = io.StringIO()
+    writer = None
+    for docs in pages:
+        if writer is None:
+            if not fields:
+                fields = list(dict.fromkeys(field for doc in docs for field in doc))
+            writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction='ignore')
+            writer.writeheader()
+        for doc in docs:
+            writer.writerow({name: _export_value(value) for name, value in doc.items()})
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+def _export_jsonl(pages, _field_list=None):
+    """
+    Generate JSON Lines output from pages of records. \n
+    Args:
+        pages (Generator): Lists of records \n
+    Returns:
+        (Generator): The JSON Lines output \n
+    """
+    for docs in pages:
+        yield ''.join(json.dumps(doc) + "\n" for doc in docs)
+
+def _export_xml(pages, _field_list=None):
+    """
+    Generate XML output from pages of records, as `<doc>` elements containing \
+    a `<field>` element per value. \n
+    Args:
+        pages (Generator): Lists of records \n
+    Returns:
+        (Generator): The XML output \n
+    """
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n<docs>\n'
+    for docs in pages:
+        output = []
+        for doc in docs:
+            output.append('<doc>')
+            for name, values in doc.items():
+                for value in values if isinstance(values, list) else [values]:
+                    output.append(f'<field name={quoteattr(name)}>{escape(str(value))}</field>')
+            output.append('</doc>\n')
+        yield ''.join(output)
+    yield '</docs>\n'
+
 def search(data, url=None, api_get_function=api_get):
     """
     Perform a [configured Solr search](#TODO) and return the result. \n
@@ -103,6 +678,7 @@ def search(data, url=None, api_get_function=api_get):
               the response JSON. Default: `response.docs`\n
             * `use_query_args` _bool, optional_: Overlay the request query args onto the \
               `params` dict. Default: `True`\n
+            * `cache_ttl` _int, optional_: Cache the Solr response; see `select()`.\n
         url (str): Overrides the default SOLR_URL normally retrieved from \
                    the [Sandhill config](#TODO) file.\n
         api_get_function (function): Function used to call Solr with. Used in unit tests.\n
@@ -1,15 +1,24 @@
 '''
 Processor for streaming data
 '''
+import io
+import os
 from pathlib import Path
 from flask import abort, make_response, Response as FlaskResponse, send_file
 from requests.models import Response as RequestsResponse
 from sandhill import app
+from sandhill.utils.generic import getconfig
 from sandhill.utils.error_handling import dp_abort
 
+# Response header used for each SENDFILE_MODE which offloads to the web server
+SENDFILE_HEADERS = {'x-sendfile': 'X-Sendfile', 'x-accel': 'X-Accel-Redirect'}
+
 def response(data):
     '''
-    Stream a Requests library response that was previously loaded. \n
+    Stream a Requests library response that was previously loaded. A not modified (304) \
+    response is returned without a body. Either way, the upstream connection is \
+    released once the response is complete. A response read from a local file (such \
+    as from the IIIF tile cache) is sent using `send_file`. \n
     Args:
         data (dict): Processor arguments and all other data loaded from previous data processors.\n
             * `response` _str_: The key where the response is located.\n
@@ -21,7 +30,8 @@ def response(data):
     '''
     allowed_headers = [
         'Content-Type', 'Content-Disposition', 'Content-Length',
-        'Range', 'accept-ranges', 'Content-Range'
+        'Range', 'accept-ranges', 'Content-Range',
+        'ETag', 'Last-Modified', 'Cache-Control', 'Expires'
     ]
     if 'response' not in data:
         app.logger.error("stream.response requires a 'response' variable to be set.")
@@ -37,19 +47,52 @@ def response(data):
         dp_abort(resp.status_code)
         return None
 
-    stream_response = FlaskResponse(
-        resp.iter_content(chunk_size=app.config['STREAM_CHUNK_SIZE']),
-        status=resp.status_code
-    )
+    if resp.status_code == 304:
+        resp.close()
+        stream_response = FlaskResponse(status=304)
+    elif (path := _local_file(resp)) is not None:
+        resp.close()
+        stream_response = send_file(
+            path,
+            mimetype=resp.headers.get('Content-Type'),
+            conditional=True
+        )
+    else:
+        stream_response = FlaskResponse(
+            resp.iter_content(chunk_size=app.config['STREAM_CHUNK_SIZE']),
+            status=resp.status_code
+        )
+        stream_response.call_on_close(resp.close)
     for header in resp.headers.keys():
         # Case insensitive header matching
         if header.lower() in [allowed_key.lower() for allowed_key in allowed_headers]:
             stream_response.headers.set(header, resp.headers.get(header))
     return stream_response
 
+def _local_file(resp):
+    '''
+    Get the path of the local file a response is read from, if any. \n
+    Args:
+        resp (requests.Response): The response \n
+    Returns:
+        (str|None): The path to the file, or None \n
+    '''
+    if resp.status_code == 200 and isinstance(resp.raw, io.BufferedReader) and \
+            isinstance(resp.raw.name, str) and os.path.isfile(resp.raw.name):
+        return resp.raw.name
+    return None
+
 def serve_file(data):
     '''
     Stream a file as a response. \n
+    How the file is sent depends on the `SENDFILE_MODE` config: \n
+        * `wsgi`: Sent by Sandhill, supporting range and conditional requests; the \
+          WSGI server may use `sendfile` (e.g. via the uWSGI `wsgi.file_wrapper`).\n
+        * `x-sendfile`: Offloaded to the web server via an `X-Sendfile` header.\n
+        * `x-accel`: Offloaded to Nginx via an `X-Accel-Redirect` header.\n
+    For offloading, the file path is translated using the longest matching prefix in \
+    the `SENDFILE_PATH_MAP` config; files not matching a prefix are sent via `wsgi`, \
+    except for `x-sendfile` where paths are used as is if no mapping exists. \n
     Args:
         data (dict): Processor arguments and all other data loaded from previous data processors.\n
             * `file_to_serve` _str_: Filepath of the file to serve.\n
@@ -70,16 +113,48 @@ def serve_file(data):
         dp_abort(500)
 
     mimetype = data['mimetype'] if 'mimetype' in data else 'application/octet-stream'
-    stream_response = send_file(
-        file,
-        mimetype=mimetype,
-        as_attachment=True
-    )
+    mode = getconfig('SENDFILE_MODE', 'wsgi')
+    offload_path = sendfile_path(str(file.resolve()), mode)
+    if offload_path is not None:
+        stream_response = FlaskResponse(mimetype=mimetype)
+        stream_response.headers.set('Content-Disposition', 'attachment', filename=file.name)
+        stream_response.headers[SENDFILE_HEADERS[mode]] = offload_path
+        # The web server sets the length of the file it sends
+        del stream_response.headers['Content-Length']
+    else:
+        stream_response = send_file(
+            file,
+            mimetype=mimetype,
+            as_attachment=True,
+            conditional=True,
+            etag=True
+        )
     # 'Content-Encoding': 'Identity' => Allow Content-Length to be kept;
     # Tell the browser not to do additional compression
     stream_response.headers['Content-Encoding'] = 'Identity'
     return stream_response
 
+def sendfile_path(path, mode):
+    '''
+    Translate a file path for offloading to the web server, using the longest \
+    matching prefix from the `SENDFILE_PATH_MAP` config. \n
+    Args:
+        path (str): The absolute file path \n
+        mode (str): The `SENDFILE_MODE` \n
+    Returns:
+        (str|None): The path or URI for the web server, or None if the file \
+            should not be offloaded \n
+    '''
+    if mode not in SENDFILE_HEADERS:
+        return None
+    path_map = getconfig('SENDFILE_PATH_MAP', {})
+    prefixes = [prefix for prefix in path_map
+                if path == prefix or path.startswith(prefix.rstrip('/') + '/')]
+    if prefixes:
+        prefix = max(prefixes, key=len)
+        return path_map[prefix].rstrip('/') + path[len(prefix.rstrip('/')):]
+    return path if mode == 'x-sendfile' else None
+
 def string(data):
     '''
     Stream a data variable as string data to the output \n
@@ -1,9 +1,12 @@
 '''
 Processor for rendering templates
 '''
-from flask import render_template, abort, make_response
+import itertools
+from flask import render_template, abort, make_response, stream_with_context, \
+    Response as FlaskResponse
 from jinja2.exceptions import TemplateNotFound, TemplateError
 from sandhill import app, catch
+from sandhill.utils.generic import getconfig
 from sandhill.utils.template import render_template_string
 
 @catch(TemplateError, "An error has occured when rendering {data[file]}: {exc}", abort=500)
@@ -15,6 +18,11 @@ def render(data):
     Args:
         data (dict): Processor arguments and all other data loaded from previous data processors.\n
             * `file` _str_: Path to the template file.\n
+            * `stream` _bool, optional_: Send the page as it is rendered, rather than \
+              rendering it in full first. Default: `false`\n
+            * `stream_buffer` _int, optional_: When streaming, the number of template \
+              output chunks to combine before each is sent. \
+              Default: the `TEMPLATE_STREAM_BUFFER` config\n
     Returns:
         (flask.Response): The rendered template in a Flask response. \n
     Raises:
@@ -25,8 +33,53 @@ def render(data):
         abort(500)
     template = data["file"]
 
+    if data.get("stream"):
+        return FlaskResponse(
+            stream_with_context(stream(template, data)),
+            status=data.get("status_code", 200)
+        )
     return make_response(render_template(template, **data), data.get("status_code", 200))
 
+def stream(template, data):
+    '''
+    Render a template as a stream of strings. The template is loaded and its first \
+    string rendered before returning, so errors before any output is sent raise as \
+    they would without streaming. Errors raised once output has begun are logged and \
+    end the stream with the `TEMPLATE_STREAM_ERROR` config marker, as the response \
+    status has already been sent. \n
+    Args:
+        template (str): Path to the template file \n
+        data (dict): The template context \n
+    Returns:
+        (Generator): The rendered output \n
+    Raises:
+        jinja2.exceptions.TemplateError: If the template cannot be loaded, or fails \
+            before its first string is rendered \n
+    '''
+    jinja_template = app.jinja_env.get_or_select_template(template)
+    context = dict(data)
+    app.update_template_context(context)
+    output = jinja_template.generate(**context)
+    buffer_size = int(data.get("stream_buffer", getconfig('TEMPLATE_STREAM_BUFFER', 8)))
+    first = ''.join(itertools.islice(output, buffer_size))
+
+    def generate():
+        if first:
+            yield first
+        buffer = []
+        try:
+            for chunk in output:
+                buffer.append(chunk)
+                if len(buffer) >= buffer_size:
+                    yield ''.join(buffer)
+                    buffer = []
+        except Exception as exc: # pylint: disable=broad-exception-caught
+            app.logger.error(f"Error while streaming template {template}: {exc}")
+            buffer.append(getconfig('TEMPLATE_STREAM_ERROR', ''))
+        if buffer:
+            yield ''.join(buffer)
+    return generate()
+
 @catch(TemplateError, "Invalid template provided for: {data[value]}. Error: {exc}",
        return_val=None)
 def render_string(data):
@@ -20,6 +20,21 @@ def load(data: dict) -> etree._Element: # pylint: disable=protected-access
         return None
     return xml.load(data['source'])
 
+async def load_async(data: dict) -> etree._Element: # pylint: disable=protected-access
+    '''
+    Load an XML document, retrieving a URL without blocking; the asynchronous \
+    version of `load()`, allowing calls from multiple data processors to be made at once. \n
+    Args:
+        data (dict): Processor arguments and all other data loaded from previous data processors.\n
+            * `source` _str_: Either path, url, or string to load.\n
+    Returns:
+        (lxml.etree._Element|None): The loaded XML object tree, or None if `source` not in data. \n
+    '''
+    if 'source' not in data:
+        app.logger.warning("No source XML provided. Missing key: 'source'")
+        return None
+    return await xml.load_async(data['source'])
+
 def xpath(data: dict) -> list:
     '''
     Retrieve the matching xpath content from an XML source. \n
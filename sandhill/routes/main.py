@@ -1,12 +1,18 @@
 '''
 The main route provides the entry point for Sandhill, loading and adding routes.
 '''
+import os
 from flask import request, abort, json, jsonify, Response as FlaskResponse
+from jinja2 import TemplateError
 from werkzeug.wrappers.response import Response as WerkzeugReponse
-from sandhill.utils.config_loader import load_route_config, get_all_routes
-from sandhill.processors.base import load_route_data
+from sandhill.utils.config_loader import load_route, get_route_data, get_all_routes, \
+    build_route_registry
+from sandhill.processors.base import load_route_data, slice_prepared
 from sandhill import app
 from sandhill.utils.generic import tolistfromkeys
+from sandhill.utils.response import validator_etag, set_cache_headers
+from sandhill.utils import metrics
+from sandhill.utils.sandcache import sandcache
 
 def add_routes():
     """
@@ -16,6 +22,8 @@ def add_routes():
     app.logger.debug("Processing routes.")
     def decorator(func, **options):
         all_routes = get_all_routes()
+        # Load the route configs once at startup, rather than per request
+        build_route_registry()
         app.logger.debug(f"Loading routes: {', '.join([repr(route) for route in all_routes])}")
         for route in all_routes:
             endpoint = options.pop('endpoint', None)
@@ -42,33 +50,25 @@ def main(*args, **kwargs): # pylint: disable=unused-argument
         A valid response for Flask to render out, or raises HTTP 500 \n
     """
     route_used = request.url_rule.rule
-    ## loop over all the configs in the instance dir looking at the "route"
-    ## field to determine which configs to use
-    route_config = load_route_config(route_used)
+    ## get the config matching the "route" field from the route registry
+    route_config, prepared = load_route(route_used)
     ## process and load data routes
-    route_data = []
     data = {}
-    ## if 'template' is in the route_config, append the template processor
-    ## to handle legacy configs
-    if 'template' in route_config:
-        if 'data' not in route_config:
-            route_config['data'] = []
-        route_config['data'].append(
-            {
-                'processor': 'template.render',
-                'file': route_config['template'],
-                'name': '_template_render',
-                'status_code': route_config.get('status_code', 200)
-            })
     route_rules = tolistfromkeys(route_config, 'route', 'routes')
-    if 'data' in route_config:
-        for idx, entry in enumerate(route_config['data']):
-            if 'name' in entry and 'processor' in entry:
-                route_data.append(entry)
-            else:
-                app.logger.warning(f"Unable to parse route data entry number {idx} " \
-                                   f"for: {1} {','.join(route_rules)}")
-        data = load_route_data(route_data)
+    ## if 'template' is in the route_config, a template processor entry is appended
+    ## to handle legacy configs
+    if 'data' in route_config or 'template' in route_config:
+        route_data, invalid = get_route_data(route_config)
+        for idx in invalid:
+            app.logger.warning(f"Unable to parse route data entry number {idx} " \
+                               f"for: {1} {','.join(route_rules)}")
+        parallel = route_config.get('parallel', True)
+        cache_options = route_config.get('response_cache')
+        if cache_options and request.method in ('GET', 'HEAD'):
+            cache_options = cache_options if isinstance(cache_options, dict) else {}
+            data = cached_route_response(route_data, cache_options, parallel, prepared)
+        else:
+            data = load_route_data(route_data, parallel=parallel, prepared=prepared)
     # check if none of the route processors returned a FlaskResponse
     if not isinstance(data, (FlaskResponse, WerkzeugReponse)):
         app.logger.warning(
@@ -80,3 +80,83 @@ def main(*args, **kwargs): # pylint: disable=unused-argument
         else:
             abort(500)
     return data
+
+def cached_route_response(route_data, options, parallel=True, prepared=None):
+    """
+    Load route data for a route with `response_cache` enabled. The data processors \
+    prior to the first `template.render` are run, then an ETag is computed from their \
+    results. If the client already has the response for the ETag, a 304 is returned \
+    without rendering the template. \n
+    Args:
+        route_data (list): The route data entries \n
+        options (dict): The `response_cache` route settings:\n
+            * `validators` _list, optional_: [Descendant paths](#TODO) to the loaded data \
+              which identify the version of the page (e.g. `record._version_`). \
+              Default: all loaded data\n
+            * `max_age` _int, optional_: Seconds clients may cache the page without \
+              revalidating. Default: `0`\n
+            * `store` _bool, optional_: Store rendered pages in the sandcache, keyed by ETag. \
+              Default: `false`\n
+            * `store_ttl` _int, optional_: Seconds to keep stored pages. Default: no expiry\n
+        parallel (bool): Allow independent entries to run concurrently \n
+        prepared (dict|None): The route data as prepared by `prepare_route_data()` \n
+    Returns:
+        (dict|flask.Response): The loaded data or response, per `load_route_data()` \n
+    """
+    split = next((idx for idx, entry in enumerate(route_data)
+                  if entry['processor'] == 'template.render'), len(route_data))
+    loaded = load_route_data(route_data[:split], parallel=parallel,
+                             prepared=slice_prepared(prepared, 0, split))
+    prepared = slice_prepared(prepared, split)
+    if isinstance(loaded, (FlaskResponse, WerkzeugReponse)):
+        return loaded
+
+    extra = [request.full_path, route_data[split:], _template_mtimes(route_data[split:])]
+    if not (etag := validator_etag(loaded, options.get('validators'), extra)):
+        app.logger.warning(f"Unable to compute ETag for {request.url_rule.rule}; "
+                           "response will not be cached.")
+        return load_route_data(route_data[split:], parallel=parallel, loaded_data=loaded,
+                               prepared=prepared)
+
+    max_age = int(options.get('max_age', 0))
+    if request.if_none_match.contains_weak(etag):
+        metrics.count("sandhill_cache_requests_total", cache="response", result="not_modified")
+        return set_cache_headers(FlaskResponse(status=304), etag, max_age)
+    store = sandcache('responses') if options.get('store') else None
+    if store is not None and (stored := store.get(etag)):
+        metrics.count("sandhill_cache_requests_total", cache="response", result="hit")
+        return set_cache_headers(FlaskResponse(**stored), etag, max_age)
+    metrics.count("sandhill_cache_requests_total", cache="response", result="miss")
+
+    response = load_route_data(route_data[split:], parallel=parallel, loaded_data=loaded,
+                               prepared=prepared)
+    if isinstance(response, (FlaskResponse, WerkzeugReponse)) and response.status_code == 200 \
+            and not response.is_streamed and not response.direct_passthrough:
+        set_cache_headers(response, etag, max_age)
+        if store is not None:
+            stored = {
+                "response": response.get_data(),
+                "status": response.status_code,
+                "content_type": response.content_type,
+            }
+            store.set(etag, stored, expire=options.get('store_ttl'))
+    return response
+
+def _template_mtimes(route_data):
+    """
+    Get the modification times for the templates rendered by `template.render` entries, \
+    so changes to a template also change the page's ETag. \n
+    Args:
+        route_data (list): The route data entries \n
+    Returns:
+        (list): The modification times of the templates found \n
+    """
+    mtimes = []
+    for entry in route_data:
+        if entry['processor'] == 'template.render' and 'file' in entry:
+            try:
+                filename = app.jinja_env.get_template(entry['file']).filename
+                mtimes.append(os.stat(filename).st_mtime_ns)
+            except (TemplateError, OSError, TypeError):
+                continue
+    return mtimes
@@ -0,0 +1,20 @@
+'''
+The `/metrics` route, exposing application metrics to Prometheus.
+'''
+from flask import abort, Response as FlaskResponse
+from sandhill import app
+from sandhill.utils import metrics
+
+@app.route('/metrics', endpoint='metrics')
+def handle_metrics():
+    '''
+    Get the metrics of all worker processes in the Prometheus text format. \
+    Only available when the `METRICS` config is enabled. \n
+    Returns:
+        (flask.Response): The metrics \n
+    Raises:
+        HTTPException: 404 if metrics are not enabled \n
+    '''
+    if not metrics.enabled():
+        abort(404)
+    return FlaskResponse(metrics.export(), content_type="text/plain; version=0.0.4; charset=utf-8")
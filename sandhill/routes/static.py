@@ -2,8 +2,13 @@
 Sandhill overrides/additions to the  default Flask `/static` route.
 '''
 import os
-from flask import send_from_directory
+import mimetypes
+from flask import send_file, send_from_directory, request
 from sandhill import app
+from sandhill.utils import static
+
+# Cache-Control max-age for fingerprinted URLs; one year
+IMMUTABLE_MAX_AGE = 31536000
 
 @app.route('/static/<path:filename>', endpoint='static')
 def handle_static(filename):
@@ -12,7 +17,10 @@ def handle_static(filename):
     Retrieves the requested static file by first looking for it inside \
     the `instance/static/` directory. If the file is not found, this \
     method will then look for the file in the core `sandhill/static/` \
-    directory. \n
+    directory. Files are located using the static manifest built at startup. \n
+    When a precompressed `.br` or `.gz` variant of the file exists and is accepted \
+    by the client, the variant is sent instead. Requests for a fingerprinted URL \
+    (see `sandhill.utils.static.url`) are marked as immutable. \n
     Args:
         filename (str): The requested file path within `/static` \n
     Returns:
@@ -20,15 +28,38 @@ def handle_static(filename):
     Raises:
         HTTPException: On HTTP error \n
     '''
-    # Return from instance/static/ if available
-    static_path = os.path.join(app.instance_path, "static")
+    if (entry := static.manifest().get(filename)) is None:
+        # Return from instance/static/ if available
+        static_path = os.path.join(app.instance_path, "static")
+
+        # Fall back to sandhill/static/
+        if not os.path.isfile(os.path.join(static_path, filename)):
+            static_path = os.path.join(app.root_path, "static")
 
-    # Fall back to sandhill/static/
-    if not os.path.isfile(os.path.join(static_path, filename)):
-        static_path = os.path.join(app.root_path, "static")
+        cache_timeout = app.get_send_file_max_age(filename)
+        return send_from_directory(static_path, filename, max_age=cache_timeout)
 
     cache_timeout = app.get_send_file_max_age(filename)
-    return send_from_directory(static_path, filename, max_age=cache_timeout)
+    immutable = 'v' in request.args and request.args['v'] == static.file_hash(entry)
+    if immutable:
+        cache_timeout = IMMUTABLE_MAX_AGE
+
+    encoding = request.accept_encodings.best_match(list(entry["encodings"]))
+    response = send_file(
+        entry["encodings"][encoding] if encoding else entry["path"],
+        mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+        max_age=cache_timeout,
+        conditional=True,
+        etag=True
+    )
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if entry["encodings"]:
+        response.vary.add('Accept-Encoding')
+    if immutable:
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+    return response
 
 @app.route('/favicon.ico')
 def favicon():
@@ -40,3 +71,6 @@ def favicon():
         HTTPException: On HTTP error \n
     '''
     return handle_static('favicon.ico')
+
+# Build the static manifest at startup
+static.manifest()
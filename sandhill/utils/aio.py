@@ -0,0 +1,66 @@
+'''
+The asyncio event loop used to run asynchronous data processors and API calls.
+'''
+import os
+import asyncio
+import threading
+from concurrent.futures import Future, InvalidStateError
+
+# Per-process event loop, run in a background thread; see event_loop()
+_event_loop = {"pid": None, "loop": None}
+_event_loop_lock = threading.Lock()
+
+def event_loop():
+    """
+    Get the event loop for the process, starting it in a daemon thread on first use. \
+    A new loop is started after a fork, as the thread running the loop does not survive it. \n
+    Returns:
+        (asyncio.AbstractEventLoop): The running event loop \n
+    """
+    with _event_loop_lock:
+        if _event_loop["pid"] != os.getpid():
+            loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=loop.run_forever, name="sandhill-event-loop", daemon=True
+            ).start()
+            _event_loop["pid"] = os.getpid()
+            _event_loop["loop"] = loop
+        return _event_loop["loop"]
+
+def run_coroutine(coro, context=None):
+    """
+    Schedule a coroutine on the process event loop from any other thread. \n
+    ```
+    result = run_coroutine(api_get_async(url=url)).result()
+    ```
+    Args:
+        coro (Coroutine): The coroutine to run \n
+        context (contextvars.Context|None): The context to run the coroutine in, \
+            such as a copy of the current context to keep access to the Flask request \n
+    Returns:
+        (concurrent.futures.Future): The future for the result; cancelling the \
+            future before it completes cancels the coroutine \n
+    """
+    loop = event_loop()
+    future = Future()
+
+    def copy_outcome(task):
+        try:
+            if task.cancelled():
+                future.cancel()
+            elif task.exception() is not None:
+                future.set_exception(task.exception())
+            else:
+                future.set_result(task.result())
+        except InvalidStateError:
+            pass # The future was cancelled
+
+    def start():
+        task = loop.create_task(coro, context=context)
+        task.add_done_callback(copy_outcome)
+        future.add_done_callback(
+            lambda fut: fut.cancelled() and loop.call_soon_threadsafe(task.cancel)
+        )
+
+    loop.call_soon_threadsafe(start)
+    return future
@@ -1,25 +1,113 @@
 '''
 Functionality to support API calls.
 '''
+import os
+import time
+import threading
+from http.cookiejar import CookieJar, DefaultCookiePolicy
 from urllib.parse import urlparse
 import requests
+import httpx
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.util.retry import Retry
 from requests_futures.sessions import FuturesSession
 from flask import abort
 from sandhill import app
+from sandhill.utils.generic import getconfig
+from sandhill.utils.timing import record_upstream
+
+# Per-process registry of HTTP sessions; see get_session()
+_session_registry = {"pid": None, "sessions": {}}
+_session_lock = threading.Lock()
+
+# Per-process asynchronous HTTP client; see get_async_client()
+_async_client = {"pid": None, "client": None}
+_async_client_lock = threading.Lock()
+
+def _create_session():
+    """
+    Create a `requests.Session` with connection pooling and retries set per the \
+    `HTTP_POOL_CONNECTIONS`, `HTTP_POOL_MAXSIZE`, `HTTP_RETRIES`, and \
+    `HTTP_BACKOFF_FACTOR` configs. The session does not store cookies, as it is \
+    shared by the requests of all users. \n
+    Returns:
+        (requests.Session): The new session \n
+    """
+    retries = Retry(
+        total=int(getconfig('HTTP_RETRIES', 2)),
+        backoff_factor=float(getconfig('HTTP_BACKOFF_FACTOR', 0.1)),
+        status_forcelist=(502, 503, 504),
+        raise_on_status=False,
+        respect_retry_after_header=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=int(getconfig('HTTP_POOL_CONNECTIONS', 10)),
+        pool_maxsize=int(getconfig('HTTP_POOL_MAXSIZE', 10)),
+        max_retries=retries,
+    )
+    session = requests.Session()
+    # Never keep cookies set by upstream services, so they are not sent on other users' calls
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def get_session(url):
+    """
+    Get the shared HTTP session for the scheme and host of the given URL. Sessions keep \
+    connections alive between calls, avoiding a new TCP and TLS handshake on each request. \
+    Sessions are shared by all threads of the process and are recreated after a fork, \
+    so connections are never shared between processes. \n
+    Args:
+        url (str): The URL which will be requested \n
+    Returns:
+        (requests.Session): The session for the URL's host \n
+    """
+    parsed = urlparse(url if isinstance(url, str) else "")
+    key = (parsed.scheme, parsed.netloc)
+    with _session_lock:
+        if _session_registry["pid"] != os.getpid():
+            _session_registry["pid"] = os.getpid()
+            _session_registry["sessions"] = {}
+        if key not in _session_registry["sessions"]:
+            _session_registry["sessions"][key] = _create_session()
+        return _session_registry["sessions"][key]
+
+def get_timeout(url):
+    """
+    Get the request timeout for the host of the given URL. Per host timeouts are set \
+    in the `HTTP_HOST_TIMEOUTS` config (a dict of hostname to seconds), otherwise \
+    `HTTP_TIMEOUT` is used. \n
+    Args:
+        url (str): The URL which will be requested \n
+    Returns:
+        (float): The timeout in seconds \n
+    """
+    host = urlparse(url if isinstance(url, str) else "").hostname
+    timeouts = getconfig('HTTP_HOST_TIMEOUTS', {})
+    return float(timeouts.get(host, getconfig('HTTP_TIMEOUT', 10)))
 
 def api_get(**kwargs):
     """
     Perform an API call using `requests.get()` and return the response object. This function adds \
-    logging surrounding the call. \n
+    logging surrounding the call. The call is made using the shared session for the \
+    host (see `get_session()`). The time taken is recorded against the data processor \
+    making the call (see `sandhill.utils.timing`). \n
     Args:
         **kwargs (dict): Arguments to [`requests.get()`](#TODO) \n
     Raises:
         requests.RequestException: If the call cannot return a response. \n
     """
     if "timeout" not in kwargs:
-        kwargs["timeout"] = 10
+        kwargs["timeout"] = get_timeout(kwargs.get("url"))
     app.logger.debug(f"API GET arguments: {kwargs}")
-    response = requests.get(**kwargs)   # pylint: disable=missing-timeout
+    start, status = time.perf_counter(), "error"
+    try:
+        response = get_session(kwargs.get("url")).get(**kwargs) # pylint: disable=missing-timeout
+        status = response.status_code
+    finally:
+        record_upstream(kwargs.get("url"), time.perf_counter() - start, status)
     app.logger.debug(f"API GET called: {response.url}")
     if not response.ok:
         app.logger.warning(
@@ -27,6 +115,93 @@ def api_get(**kwargs):
         )
     return response
 
+def get_async_client():
+    """
+    Get the shared asynchronous HTTP client for the process, which pools connections \
+    for all hosts; limited to `HTTP_ASYNC_MAX_CONNECTIONS` connections, of which \
+    `HTTP_POOL_MAXSIZE` are kept alive. Connection failures are retried up to \
+    `HTTP_RETRIES` times. As for `get_session()`, cookies set by upstream services \
+    are not stored. Must only be used within the process event loop \
+    (see `sandhill.utils.aio.event_loop()`). \n
+    Returns:
+        (httpx.AsyncClient): The client \n
+    """
+    with _async_client_lock:
+        if _async_client["pid"] != os.getpid():
+            _async_client["pid"] = os.getpid()
+            _async_client["client"] = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=int(getconfig('HTTP_ASYNC_MAX_CONNECTIONS', 100)),
+                    max_keepalive_connections=int(getconfig('HTTP_POOL_MAXSIZE', 10)),
+                ),
+                transport=httpx.AsyncHTTPTransport(retries=int(getconfig('HTTP_RETRIES', 2))),
+                cookies=CookieJar(policy=DefaultCookiePolicy(allowed_domains=[])),
+            )
+        return _async_client["client"]
+
+async def api_request_async(method, url, params=None, headers=None, timeout=None):
+    """
+    Perform an API call without blocking the event loop. The response is returned as a \
+    `requests.Response`, with the content already loaded, so it may be handled the \
+    same as the response from `api_get()`. The time taken is recorded as for `api_get()`. \n
+    Args:
+        method (str): The HTTP method \n
+        url (str): The URL to call \n
+        params (dict|None): Query arguments \n
+        headers (dict|None): Request headers \n
+        timeout (float|None): The timeout in seconds; defaults to `get_timeout()` for the URL \n
+    Returns:
+        (requests.Response): The response \n
+    Raises:
+        requests.RequestException: If the call cannot return a response. \n
+    """
+    timeout = get_timeout(url) if timeout is None else timeout
+    app.logger.debug(f"API {method} arguments: {url} {params}")
+    start, status = time.perf_counter(), "error"
+    try:
+        response = await get_async_client().request(
+            method, url, params=params, headers=headers, timeout=timeout
+        )
+        status = response.status_code
+    except httpx.TimeoutException as exc:
+        raise requests.exceptions.Timeout(f"{exc} ({url})") from exc
+    except (httpx.HTTPError, httpx.InvalidURL) as exc:
+        raise requests.exceptions.ConnectionError(f"{exc} ({url})") from exc
+    finally:
+        record_upstream(url, time.perf_counter() - start, status)
+    app.logger.debug(f"API {method} called: {response.url}")
+
+    converted = requests.models.Response()
+    converted.status_code = response.status_code
+    converted.reason = response.reason_phrase
+    converted.url = str(response.url)
+    converted.headers = CaseInsensitiveDict(response.headers)
+    converted.encoding = response.encoding
+    converted._content = response.content # pylint: disable=protected-access
+    return converted
+
+async def api_get_async(**kwargs):
+    """
+    Perform an API GET call without blocking the event loop; the asynchronous \
+    version of `api_get()`. \n
+    Args:
+        **kwargs (dict): The `url` and optionally `params`, `headers`, and `timeout`; \
+            other [`requests.get()`](#TODO) arguments are ignored \n
+    Returns:
+        (requests.Response): The response \n
+    Raises:
+        requests.RequestException: If the call cannot return a response. \n
+    """
+    response = await api_request_async(
+        "GET", kwargs.get("url"), params=kwargs.get("params"),
+        headers=kwargs.get("headers"), timeout=kwargs.get("timeout")
+    )
+    if not response.ok:
+        app.logger.warning(
+            f"API GET call returned {response.status_code}: {response.text}"
+        )
+    return response
+
 def api_get_multi(requests_kwargs):
     """
     Perform multiple API calls in parellel using futures, returning a list \
@@ -3,14 +3,20 @@ Utilities for loading of loading `config/` files.
 '''
 import os
 import re
+import copy
 import collections
 import operator
 import json
+import threading
 from json.decoder import JSONDecodeError
 from sandhill import app, catch
-from sandhill.utils.generic import tolist, tolistfromkeys
+from sandhill.utils.generic import tolist, tolistfromkeys, getconfig
 from sandhill.modules.routing import Route
 
+# Route registries, keyed by routes_dir; see build_route_registry()
+_route_registries = {}
+_route_registry_lock = threading.Lock()
+
 @catch(OSError, "Unable to read json file at path: {file_path} Error: {exc}",
        return_val=collections.OrderedDict())
 @catch(JSONDecodeError, "Malformed json at path: {file_path} Error: {exc}",
@@ -79,12 +85,99 @@ def get_all_routes(routes_dir="config/routes/"):
 
     return [r[0] for r in sort_routes]
 
-@catch(FileNotFoundError, "Route dir not found at path {routes_dir} - " \
-       "creating welcome home page route. Error: {exc}",
-       return_val=collections.OrderedDict({
-           "route": ["/"],
-           "template": "home.html.j2"
-       }))
+def _scan_route_configs(route_path):
+    """
+    Get the modification time of every JSON route config within a directory. \n
+    Args:
+        route_path (str): Full path to the route configs directory \n
+    Returns:
+        (dict): Mapping of each config file path to its mtime in nanoseconds \n
+    Raises:
+        FileNotFoundError: If the route_path does not exist \n
+    """
+    return {
+        entry.path: entry.stat().st_mtime_ns
+        for entry in os.scandir(route_path)
+        if entry.is_file() and entry.name.endswith(".json")
+    }
+
+@catch(FileNotFoundError, "Route dir not found at path {routes_dir} Error: {exc}", return_val=None)
+def build_route_registry(routes_dir="config/routes/"):
+    '''
+    Load every route config within the given directory and register each parsed \
+    config under all of its route rules. The registry is kept in memory so that \
+    requests do not need to rescan and re-parse the route configs. \n
+    Args:
+        routes_dir (str): The relative path to the JSON files \n
+    Returns:
+        (dict|None): The registry, with keys `mtimes` (config file path => mtime), \
+                     `rules` (route rule => loaded config), and `prepared` (route rule => \
+                     prepared route data; see `load_route()`), or None if the \
+                     directory does not exist \n
+    '''
+    route_path = os.path.join(app.instance_path, routes_dir)
+    mtimes = _scan_route_configs(route_path)
+    rules = {}
+    for conf_file in sorted(mtimes):
+        data = load_json_config(conf_file)
+        _check_when_clauses(data, conf_file)
+        for rule in tolistfromkeys(data, "route", "routes"):
+            rules.setdefault(rule, data)
+    registry = {"mtimes": mtimes, "rules": rules, "prepared": {}}
+    with _route_registry_lock:
+        _route_registries[routes_dir] = registry
+    return registry
+
+def _check_when_clauses(route_config, conf_file):
+    """
+    Log a warning for each `when` clause in a route config which cannot be compiled; \
+    requests which reach such a clause will fail. \n
+    Args:
+        route_config (dict): The loaded route config \n
+        conf_file (str): The path of the route config \n
+    """
+    # Imported here as the template utilities depend on modules which import this one
+    from sandhill.utils.template import when_errors # pylint: disable=import-outside-toplevel
+    for name, when, exc in when_errors(route_config):
+        app.logger.warning(f"Invalid 'when' clause for '{name}' in {conf_file}: {when} "
+                           f"Error: {exc}")
+
+def _route_registry_stale(registry, routes_dir):
+    """
+    Check if any route configs have been added, removed, or modified since \
+    the registry was built. \n
+    Args:
+        registry (dict): A registry as returned by `build_route_registry()` \n
+        routes_dir (str): The relative path to the JSON files \n
+    Returns:
+        (bool): True if the registry no longer matches the route configs on disk \n
+    """
+    try:
+        return _scan_route_configs(os.path.join(app.instance_path, routes_dir)) \
+            != registry["mtimes"]
+    except FileNotFoundError:
+        return True
+
+def get_route_registry(routes_dir="config/routes/"):
+    '''
+    Get the route registry for the given directory, building it if not yet loaded. \
+    When `ROUTES_AUTO_RELOAD` is enabled, the registry is rebuilt whenever a \
+    route config file has changed on disk. \n
+    Args:
+        routes_dir (str): The relative path to the JSON files \n
+    Returns:
+        (dict|None): The registry (see `build_route_registry()`), or None if \
+                     the directory does not exist \n
+    '''
+    registry = _route_registries.get(routes_dir)
+    if registry is not None and bool(int(getconfig("ROUTES_AUTO_RELOAD", 0))) \
+      and _route_registry_stale(registry, routes_dir):
+        app.logger.debug(f"Route configs changed in {routes_dir}; reloading route registry.")
+        registry = None
+    if registry is None:
+        registry = build_route_registry(routes_dir)
+    return registry
+
 def load_route_config(route_rule, routes_dir="config/routes/"):
     '''
     Return the json data for the provided directory. \n
@@ -92,19 +185,67 @@ def load_route_config(route_rule, routes_dir="config/routes/"):
         route_rule (str): the route rule to match to in the json configs (the `route` key) \n
         routes_dir (str): the path to look for route configs. Default = config/routes/ \n
     Returns:
-        (OrderedDict): The loaded json of the matched route config, or empty dict if not found \n
+        (OrderedDict): A copy of the loaded json of the matched route config, or empty \
+                       dict if not found \n
     '''
-    route_path = os.path.join(app.instance_path, routes_dir)
-    data = collections.OrderedDict()
-    conf_files = [
-        os.path.join(route_path, j) for j in os.listdir(route_path) if j.endswith(".json")
-    ]
-    for conf_file in conf_files:
-        check_data = load_json_config(conf_file)
-        if route_rule in tolistfromkeys(check_data, "route", "routes"):
-            data = check_data
-            break
-    return data
+    return load_route(route_rule, routes_dir)[0]
+
+def load_route(route_rule, routes_dir="config/routes/"):
+    '''
+    Return the json data for the provided directory, along with its route data as \
+    prepared by `sandhill.processors.base.prepare_route_data()`. Route data is \
+    prepared on first use of each route rule and kept in the route registry. \n
+    Args:
+        route_rule (str): the route rule to match to in the json configs (the `route` key) \n
+        routes_dir (str): the path to look for route configs. Default = config/routes/ \n
+    Returns:
+        (tuple): A copy of the loaded json of the matched route config (or empty dict if \
+                 not found), and the prepared route data for `get_route_data()` of the \
+                 config (or None if not found) \n
+    '''
+    registry = get_route_registry(routes_dir)
+    if registry is None:
+        app.logger.warning(f"Route dir not found at path {routes_dir} - "
+                           "creating welcome home page route.")
+        return collections.OrderedDict({
+            "route": ["/"],
+            "template": "home.html.j2"
+        }), None
+    if (route_config := registry["rules"].get(route_rule)) is None:
+        return collections.OrderedDict(), None
+    if (prepared := registry["prepared"].get(route_rule)) is None:
+        # Prepared on first use rather than when the registry is built, as preparing
+        # imports instance processors, which may not be imported during app startup
+        from sandhill.processors.base import prepare_route_data # pylint: disable=import-outside-toplevel
+        prepared = prepare_route_data(get_route_data(route_config)[0])
+        registry["prepared"][route_rule] = prepared
+    # Hand out a copy, as the config is modified while processing the request
+    return copy.deepcopy(route_config), prepared
+
+def get_route_data(route_config):
+    '''
+    Get the data entries of a route config to process for a request: each entry with \
+    a `name` and `processor`, followed by a `template.render` entry if the config has \
+    a `template` (to handle legacy configs). The route config is not modified. \n
+    Args:
+        route_config (dict): A loaded route config \n
+    Returns:
+        (tuple[list, list]): The entries, and the index of each invalid entry in `data` \n
+    '''
+    route_data, invalid = [], []
+    for idx, entry in enumerate(route_config.get('data', [])):
+        if 'name' in entry and 'processor' in entry:
+            route_data.append(entry)
+        else:
+            invalid.append(idx)
+    if 'template' in route_config:
+        route_data.append({
+            'processor': 'template.render',
+            'file': route_config['template'],
+            'name': '_template_render',
+            'status_code': route_config.get('status_code', 200)
+        })
+    return route_data, invalid
 
 def load_json_configs(path, recurse=False):
     """
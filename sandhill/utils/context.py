@@ -6,6 +6,7 @@ from deepdiff import DeepDiff
 from flask import request, has_app_context, abort
 from jinja2 import pass_context
 from sandhill import app
+from sandhill.utils import static
 import json
 
 def app_context():
@@ -122,5 +123,6 @@ def context_processors():
         'sandbug': context_sandbug,
         'urlcomponents': urlcomponents,
         'find_mismatches': find_mismatches,
-        'get_var': get_var
+        'get_var': get_var,
+        'static_url': static.url
     }
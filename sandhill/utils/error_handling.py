@@ -67,37 +67,52 @@ def catch(exc_class, exc_msg=None, **kwargs):
     def myfunc(myval):
         ...
     ``` \n
+    Coroutine functions (`async def`) may also be decorated. \n
     """
+    def handle(func, exc, args, func_kwargs):
+        # Re-map the function arguments to their variable name
+        # for use in formatted error message string
+        args_dict = {**_get_func_params(func, args), **func_kwargs}
+        args_dict['exc'] = exc
+
+        # Handling of the exception
+        if exc_msg:
+            sandhill.app.logger.warning(f"{request.url if request else ''} raised: " + \
+                exc_msg.format(**args_dict))
+
+        # Get the return_arg value if required and present in the function's arguments
+        return_arg = None
+        if 'return_arg' in kwargs:
+            if kwargs.get('return_arg') and kwargs.get('return_arg') in args_dict:
+                return_arg = args_dict[kwargs.get('return_arg')]
+
+        # Abort if specified
+        if 'abort' in kwargs:
+            abort(kwargs.get('abort'))
+
+        # If no return_val specified, we'll re-raise the error
+        if 'return_val' not in kwargs and 'return_arg' not in kwargs:
+            raise exc
+        return return_arg if return_arg else kwargs.get('return_val')
+
     def inner(func):
+        # Coroutine functions are wrapped by a coroutine function, catching exceptions when awaited
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **func_kwargs):
+                try:
+                    rval = await func(*args, **func_kwargs)
+                except exc_class as exc:
+                    rval = handle(func, exc, args, func_kwargs)
+                return rval
+            return async_wrapper
+
         @wraps(func)
         def wrapper(*args, **func_kwargs):
             try:
                 rval = func(*args, **func_kwargs)
             except exc_class as exc:
-                # Re-map the function arguments to their variable name
-                # for use in formatted error message string
-                args_dict = {**_get_func_params(func, args), **func_kwargs}
-                args_dict['exc'] = exc
-
-                # Handling of the exception
-                if exc_msg:
-                    sandhill.app.logger.warning(f"{request.url if request else ''} raised: " + \
-                        exc_msg.format(**args_dict))
-
-                # Get the return_arg value if required and present in the function's arguments
-                return_arg = None
-                if 'return_arg' in kwargs:
-                    if kwargs.get('return_arg') and kwargs.get('return_arg') in args_dict:
-                        return_arg = args_dict[kwargs.get('return_arg')]
-
-                # Abort if specified
-                if 'abort' in kwargs:
-                    abort(kwargs.get('abort'))
-
-                # If no return_val specified, we'll re-raise the error
-                if 'return_val' not in kwargs and 'return_arg' not in kwargs:
-                    raise exc
-                rval = return_arg if return_arg else kwargs.get('return_val')
+                rval = handle(func, exc, args, func_kwargs)
             return rval
         return wrapper
     return inner
@@ -3,6 +3,7 @@ Generic functions that could be used in most any context.
 """
 import os
 from typing import Any  # pylint: disable=unused-import
+from functools import lru_cache
 from collections.abc import Mapping, Hashable
 from sandhill import app, catch
 
@@ -107,6 +108,126 @@ def getindex(fromlist: list, idx: str|int, default_idx: int=0, default_val=None)
     except IndexError:
         return default_val
 
+class DescendantPath:
+    '''
+    A compiled path of descendant keys, as followed by `getdescendant()`. Each key \
+    is classified once, as a key which may also be a list index, or the `"[]"` \
+    append marker, so following the path does not need to re-split or re-check it. \n
+    Args:
+        list_keys (tuple): The keys of the path \n
+    '''
+    def __init__(self, list_keys):
+        self.list_keys = list_keys
+        self.segments = tuple((key, DescendantPath._index(key)) for key in list_keys)
+        self.parent = self.segments[:-1]
+
+    @staticmethod
+    def _index(key):
+        '''
+        Get the list index for a key, or None if it is not one. \n
+        '''
+        try:
+            return int(key) if str(key).isdigit() else None
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _follow(obj, segments):
+        '''
+        Follow the given segments down from an object. \n
+        Args:
+            obj (Any): The object to start from \n
+            segments (tuple): The (key, index) pairs to follow \n
+        Returns:
+            (Any): The found value, or None if no match \n
+        '''
+        for key, index in segments:
+            if isinstance(obj, list):
+                if index is None or index >= len(obj):
+                    return None
+                obj = obj[index]
+            # Checking dict first avoids the slower abstract Mapping check for most objects
+            elif isinstance(obj, (dict, Mapping)) and key in obj:
+                obj = obj[key]
+            else:
+                return None
+        return obj
+
+    def get(self, obj):
+        '''
+        Get the value at the path within an object. \n
+        Args:
+            obj (dict|list): A dict/list to check, possibly containing nested dicts/lists. \n
+        Returns:
+            (Any): The value, or None if no match \n
+        '''
+        return self._follow(obj, self.segments) if self.segments else None
+
+    def resolve(self, obj, extract=False, put=None):
+        '''
+        Get the value at the path within an object, optionally removing or replacing it; \
+        see `getdescendant()`. \n
+        Args:
+            obj (dict|list): A dict/list to check, possibly containing nested dicts/lists. \n
+            extract (bool): If set to true, will remove the matching value from the `obj`. \n
+            put (Any): Replace the found value with this new value in the `obj`, \
+                       or append if the found value at a list key of `"[]"` \n
+        Returns:
+            (Any): The value, or None if no match \n
+        Raises:
+            IndexError: When attempting to put a list index that is invalid. \n
+        '''
+        if not extract and put is None:
+            return self.get(obj)
+        if not self.segments:
+            return None
+        pobj = self._follow(obj, self.parent)
+        key, index = self.segments[-1]
+        obj = None
+        if isinstance(pobj, Mapping) and key in pobj:
+            obj = pobj[key]
+        elif index is not None and isinstance(pobj, list) and index < len(pobj):
+            key = index
+            obj = pobj[key]
+        if extract and obj is not None:
+            del pobj[key]
+        if put is not None and pobj is not None:
+            if isinstance(pobj, Mapping):
+                pobj[key] = put
+            if isinstance(pobj, list):
+                if key == "[]":
+                    pobj.append(put)
+                elif isinstance(key, int) and key < len(pobj):
+                    pobj[key] = put
+                else:
+                    raise IndexError(f"Index of {key} is invalid for list: {pobj}")
+        return obj
+
+@lru_cache(maxsize=1024)
+def _compile_descendant(list_keys):
+    '''
+    Compile a path of descendant keys; cached by the . delimited string or tuple of keys. \
+    See `compile_descendant()`.
+    '''
+    return DescendantPath(tuple(list_keys.split('.')) if isinstance(list_keys, str) else list_keys)
+
+def compile_descendant(list_keys):
+    '''
+    Get the compiled path for a list of descendant keys. Compiled paths are kept in a \
+    bounded LRU cache, so each path is only split and classified once. \n
+    Args:
+        list_keys (list|str): List of descendants to follow (or . delimited string) \n
+    Returns:
+        (DescendantPath): The compiled path \n
+    '''
+    if isinstance(list_keys, str):
+        return _compile_descendant(list_keys)
+    list_keys = tuple(list_keys)
+    # Only str and int keys are cached, as other keys may equal them (e.g. True == 1)
+    if all(type(key) in (str, int) for key in list_keys): # pylint: disable=unidiomatic-typecheck
+        return _compile_descendant(list_keys)
+    return DescendantPath(list_keys)
+
 @catch(ValueError, "Could not find {list_keys} in: {obj}", return_val=None)
 def getdescendant(obj, list_keys, extract=False, put=None):
     '''
@@ -134,31 +255,29 @@ def getdescendant(obj, list_keys, extract=False, put=None):
     v = getdescendant(mydict, "key1.2.[]", put="Append this value.")
     ``` \n
     '''
-    list_keys = list_keys.split('.') if isinstance(list_keys, str) else list_keys
-    for idx, key in enumerate(list_keys):
-        pobj = obj
-        if isinstance(obj, Mapping) and key in obj:
-            obj = obj[key]
-        elif isinstance(obj, list) and str(key).isdigit() and int(key) < len(obj):
-            key = int(key)
-            obj = obj[key]
-        else:
-            obj = None
-        #  This is the last key in the loop
-        if (idx + 1) == len(list_keys):
-            if extract and obj is not None:
-                del pobj[key]
-            if put is not None and pobj is not None:
-                if isinstance(pobj, Mapping):
-                    pobj[key] = put
-                if isinstance(pobj, list):
-                    if key == "[]":
-                        pobj.append(put)
-                    elif isinstance(key, int) and key < len(pobj):
-                        pobj[key] = put
-                    else:
-                        raise IndexError(f"Index of {key} is invalid for list: {pobj}")
-    return obj if list_keys else None
+    return compile_descendant(list_keys).resolve(obj, extract, put)
+
+@catch(ValueError, "Could not find {list_keys} in: {objs}", return_val=None)
+def getdescendant_many(objs, list_keys, extract=False, put=None):
+    '''
+    Gets the key values from each of a list of dictionaries/lists, such as a field from \
+    every doc in a Solr result; the same as calling `getdescendant()` on each, but the \
+    path is only compiled once. \n
+    Args:
+        objs (list): The dicts/lists to check \n
+        list_keys (list|str): List of descendants to follow (or . delimited string) \n
+        extract (bool): If set to true, will remove the matching value from each object. \n
+        put (Any): Replace the found value with this new value in each object, \
+                   or append if the found value at a list key of `"[]"` \n
+    Returns:
+        (list): The matching value from each object, or None for those with no match \n
+    Raises:
+        IndexError: When attempting to put a list index that is invalid. \n
+    '''
+    path = compile_descendant(list_keys)
+    if not extract and put is None:
+        return [path.get(obj) for obj in objs]
+    return [path.resolve(obj, extract, put) for obj in objs]
 
 def getconfig(name, default=None):
     '''
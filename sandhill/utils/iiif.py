@@ -0,0 +1,195 @@
+"""
+IIIF image handling, including the local cache of IIIF images and tiles.
+"""
+import io
+import os
+import re
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from requests.models import Response as RequestsResponse
+from requests.exceptions import RequestException
+from sandhill import app
+from sandhill.utils import metrics
+from sandhill.utils.api import api_get
+from sandhill.utils.generic import getconfig
+from sandhill.utils.sandcache import sandcache
+
+# Upstream response headers kept with cached images
+CACHED_HEADERS = ['Content-Type', 'Cache-Control', 'Expires']
+
+# A tile region of an IIIF image request path, e.g. "1024,512,512,512/512,/0/default.jpg"
+TILE_PATH = re.compile(r'^/?(\d+),(\d+),(\d+),(\d+)(/.+)$')
+
+# Per-process prefetching state; see prefetch_tiles()
+_prefetch = {"pid": None, "pool": None, "pending": set()}
+_prefetch_lock = threading.Lock()
+
+class CachedImage(RequestsResponse):
+    """
+    A response for an image read from a file in the tile cache. \n
+    """
+    def close(self):
+        """
+        Close the cached file, even if its content has been read. \n
+        """
+        self.raw.close()
+
+def tile_cache():
+    """
+    Get the on disk cache of IIIF images, limited to `IIIF_TILE_CACHE_SIZE_GB` \
+    and evicting the least recently used images first. \n
+    Returns:
+        (sandhill.utils.sandcache.SandCache): The cache \n
+    """
+    return sandcache(
+        'iiif',
+        eviction_policy='least-recently-used',
+        size_limit=int(float(getconfig('IIIF_TILE_CACHE_SIZE_GB', 5)) * 1024**3)
+    )
+
+def tile_cache_key(url, identifier, iiif_path):
+    """
+    Get the cache key for an IIIF image request. \n
+    Args:
+        url (str): The IIIF server URL \n
+        identifier (str): The image identifier \n
+        iiif_path (str): The IIIF request path after the identifier \n
+    Returns:
+        (str): The cache key \n
+    """
+    return f"{url.rstrip('/')}/{identifier}/{iiif_path.lstrip('/')}"
+
+def cached_image(key):
+    """
+    Get an image from the tile cache. \n
+    Args:
+        key (str): The cache key \n
+    Returns:
+        (CachedImage|None): A response reading from the cached file, or None \
+            if the image is not cached \n
+    """
+    cached = tile_cache().get(key, read=True, tag=True, retry=True)
+    if cached is None or cached[0] is None:
+        return None
+    image = CachedImage()
+    image.status_code = 200
+    image.raw, headers = cached[0], json.loads(cached[1])
+    image.headers.update(headers)
+    return image
+
+def store_image(key, image):
+    """
+    Store a successful image response in the tile cache. The response body \
+    is read in full, but the response remains usable. \n
+    Args:
+        key (str): The cache key \n
+        image (requests.Response): The image response from the IIIF server \n
+    Returns:
+        (bool): True if the image was stored \n
+    """
+    if image.status_code != 200:
+        return False
+    headers = {name: image.headers[name] for name in CACHED_HEADERS if name in image.headers}
+    return tile_cache().set(
+        key, io.BytesIO(image.content), read=True, tag=json.dumps(headers), retry=True
+    )
+
+def load_cached_image(url, identifier, iiif_path, api_get_function=api_get):
+    """
+    Load an IIIF image through the tile cache, calling the IIIF server on a cache miss \
+    and prefetching neighbouring tiles in the background. \n
+    Args:
+        url (str): The IIIF server URL \n
+        identifier (str): The image identifier \n
+        iiif_path (str): The IIIF request path after the identifier \n
+        api_get_function (function): Function used to call the IIIF server \n
+    Returns:
+        (requests.Response): The image response \n
+    Raises:
+        requests.RequestException: If the call to the IIIF server fails \n
+    """
+    key = tile_cache_key(url, identifier, iiif_path)
+    image = cached_image(key)
+    metrics.count("sandhill_cache_requests_total", cache="iiif",
+                  result="miss" if image is None else "hit")
+    if image is None:
+        image = api_get_function(url=os.path.join(url, identifier, iiif_path), stream=True)
+        if store_image(key, image):
+            image = cached_image(key) or image
+    prefetch_tiles(url, identifier, iiif_path, api_get_function)
+    return image
+
+def neighbour_tiles(iiif_path):
+    """
+    Get the request paths for the tiles adjacent to a tile, at the same zoom level. \
+    Only tiles aligned to the tile grid have neighbours. \n
+    Args:
+        iiif_path (str): The IIIF request path of a tile \n
+    Returns:
+        (list): The IIIF request paths of the left, right, above, and below tiles \n
+    """
+    if not (match := TILE_PATH.match(iiif_path)):
+        return []
+    left, top, width, height = (int(val) for val in match.groups()[:4])
+    if not width or not height or left % width or top % height:
+        return []
+    tiles = []
+    for tile_x, tile_y in [(left - width, top), (left + width, top),
+                           (left, top - height), (left, top + height)]:
+        if tile_x >= 0 and tile_y >= 0:
+            tiles.append(f"{tile_x},{tile_y},{width},{height}{match.group(5)}")
+    return tiles
+
+def prefetch_tiles(url, identifier, iiif_path, api_get_function=api_get):
+    """
+    Load the neighbouring tiles into the tile cache in background threads, using \
+    up to `IIIF_TILE_PREFETCH` threads per process (0 disables prefetching). \n
+    Args:
+        url (str): The IIIF server URL \n
+        identifier (str): The image identifier \n
+        iiif_path (str): The IIIF request path of the requested tile \n
+        api_get_function (function): Function used to call the IIIF server \n
+    Returns:
+        (list): The futures for the tiles being prefetched \n
+    """
+    threads = int(getconfig('IIIF_TILE_PREFETCH', 2))
+    if threads < 1:
+        return []
+    futures = []
+    with _prefetch_lock:
+        if _prefetch["pid"] != os.getpid():
+            _prefetch["pid"] = os.getpid()
+            _prefetch["pool"] = ThreadPoolExecutor(
+                max_workers=threads, thread_name_prefix="sandhill-iiif-prefetch"
+            )
+            _prefetch["pending"] = set()
+        for tile in neighbour_tiles(iiif_path):
+            key = tile_cache_key(url, identifier, tile)
+            if key in _prefetch["pending"] or key in tile_cache():
+                continue
+            _prefetch["pending"].add(key)
+            futures.append(
+                _prefetch["pool"].submit(_prefetch_tile, key, url, identifier, tile,
+                                         api_get_function)
+            )
+    return futures
+
+def _prefetch_tile(key, url, identifier, iiif_path, api_get_function):
+    """
+    Load a tile into the tile cache. \n
+    Args:
+        key (str): The cache key \n
+        url (str): The IIIF server URL \n
+        identifier (str): The image identifier \n
+        iiif_path (str): The IIIF request path of the tile \n
+        api_get_function (function): Function used to call the IIIF server \n
+    """
+    try:
+        store_image(key, api_get_function(url=os.path.join(url, identifier, iiif_path),
+                                          stream=True))
+    except RequestException as exc:
+        app.logger.debug(f"Unable to prefetch IIIF tile {key}: {exc}")
+    finally:
+        with _prefetch_lock:
+            _prefetch["pending"].discard(key)
@@ -4,7 +4,7 @@ Wrapper functions for JSONPath queries.
 import copy
 import re
 import json
-import requests
+from functools import lru_cache
 from requests.exceptions import (
     RequestException,
     ConnectionError as RequestsConnectionError
@@ -13,6 +13,8 @@ from validator_collection import checkers
 from jsonpath_ng import parse
 from jsonpath_ng.jsonpath import Fields, Index
 from sandhill import app, catch
+from sandhill.utils.api import get_session, get_timeout
+from sandhill.utils.generic import getconfig
 
 @catch(RequestException, "JSON API call failed: {url} Exc: {exc}", return_val=None)
 @catch(RequestsConnectionError, "Invalid host for API call: {url} Exc: {exc}", return_val=None)
@@ -21,39 +23,130 @@ def json_from_url(url, timeout=None):
     Try to load URL and retrieve JSON data. \n
     Args:
         url (str): The URL to retrieve \n
-        timeout: An integer timeout in seconds; defaults to 10 if not set \n
+        timeout: An integer timeout in seconds; defaults to `get_timeout()` for the URL \
+            if not set \n
     Returns:
         (dict|list|None): The parsed JSON, or None on failure \n
     '''
     if timeout is None:
-        timeout = 10
+        timeout = get_timeout(url)
     if not checkers.is_url(url):
         app.logger.warning(f"Cannot load JSON from invalid URL: {url}")
     else:
-        response = requests.get(url, timeout=timeout)
+        response = get_session(url).get(url, timeout=timeout)
         if response:
             return response.json()
         app.logger.warning(f"Failed to retrieve valid response (or timed out): {url}")
     return None
 
+@lru_cache(maxsize=int(getconfig('JSONPATH_CACHE_SIZE', 512)))
+def compile_path(path):
+    '''
+    Get the parsed expression for a JSONPath. Parsed expressions are kept in a bounded \
+    LRU cache keyed by the path, so each path is only parsed once. Cache size set by \
+    `JSONPATH_CACHE_SIZE`. \n
+    Args:
+        path (str): The JSONPath \n
+    Returns:
+        (jsonpath_ng.JSONPath): The parsed expression \n
+    Raises:
+        jsonpath_ng.exceptions.JSONPathError: On an invalid path \n
+    '''
+    return parse(path)
+
+def _copy_path(data, match, copies):
+    '''
+    Shallow copy each container from the root of the data down to a match, so that the \
+    matched value can be modified without modifying the original data. Containers \
+    already copied for an earlier match are reused. \n
+    Args:
+        data (dict|list): The original JSON data \n
+        match (jsonpath_ng.DatumInContext): The match within the original data \n
+        copies (dict): The copies made so far, by id of the original container; \
+            updated with any new copies. The copied root is `copies[id(data)]`. \n
+    Returns:
+        (dict|list): The copy of the matched value, within the copied root \n
+    '''
+    steps = []
+    while match is not None:
+        steps.append(match)
+        match = match.context
+    if id(data) not in copies:
+        copies[id(data)] = (data, copy.copy(data))
+    node = copies[id(data)][1]
+    # Each step below the root is a single Field or Index within its parent
+    for datum in reversed(steps[:-1]):
+        key = datum.path.index if isinstance(datum.path, Index) else datum.path.fields[0]
+        child = datum.value
+        if id(child) not in copies:
+            copies[id(child)] = (child, copy.copy(child))
+        node[key] = node = copies[id(child)][1]
+    return node
+
+def _modify(data, pattern, modify, deepcopy=True, copy_path=False):
+    '''
+    Call a function on each match of a JSONPath, modifying the matched values in place. \n
+    Args:
+        data (dict|list): The JSON data \n
+        pattern (jsonpath_ng.JSONPath): The parsed JSONPath \n
+        modify (function): Called with each matched value and its match \n
+        deepcopy (bool): Modify a deep copy of the data \n
+        copy_path (bool): Modify a copy of the data in which only containers along the \
+            paths to the matches are copied; all other values are shared with `data` \n
+    Returns:
+        (dict|list): The modified JSON data \n
+    '''
+    if copy_path:
+        copies = {}
+        for match in pattern.find(data):
+            modify(_copy_path(data, match, copies), match)
+        return copies[id(data)][1] if copies else data
+    if deepcopy:
+        data = copy.deepcopy(data)
+    for match in pattern.find(data):
+        modify(match.value, match)
+    return data
+
 def find(data, path=None, deepcopy=True):
     '''
     Get the values for a given JSONPath. \n
     Args:
         data (dict|list): The JSON data \n
         path (str): The JSONPath to find \n
+        deepcopy (bool): Return deep copies of the matched values (only the matches \
+            are copied, not the whole of the data) \n
     Returns:
         (list): A list of matches, empty if none found \n
     '''
-    if deepcopy:
-        data = copy.deepcopy(data)
     if path is None:
-        return data
-    pattern = parse(path)
-    matches = pattern.find(data)
-    return [match.value for match in matches]
+        return copy.deepcopy(data) if deepcopy else data
+    values = [match.value for match in compile_path(path).find(data)]
+    return copy.deepcopy(values) if deepcopy else values
 
-def put(data, path, value, deepcopy=True):
+def _field_pattern(path, action):
+    '''
+    Parse a JSONPath which must end with a specific Field or Index. \n
+    Args:
+        path (str): The JSONPath \n
+        action (str): The name of the calling function, for the error \n
+    Returns:
+        (jsonpath_ng.JSONPath): The parsed expression \n
+    Raises:
+        ValueError: If the path does not end with a Field or Index \n
+    '''
+    pattern = compile_path(path)
+    if not isinstance(pattern.right, Fields) and not isinstance(pattern.right, Index):
+        raise ValueError(f"jsonpath.{action} can only set specific Fields or Indexes")
+    return pattern
+
+def _field_keys(pattern, match):
+    '''
+    Get the keys or indexes of a Field or Index pattern within a matched container. \n
+    '''
+    return [pattern.index] if isinstance(pattern, Index) \
+        else pattern.reified_fields(match.context)
+
+def put(data, path, value, deepcopy=True, copy_path=False):
     '''
     Set a value at the given JSONPath location. \n
     Args:
@@ -62,50 +155,42 @@ def put(data, path, value, deepcopy=True):
             Last element in path will be removed, which must be \
             a specific Field or Index only \n
         value (any): The value to set\n
+        deepcopy (bool): Modify a deep copy of the data \n
+        copy_path (bool): Instead of a deep copy, only copy the containers along the \
+            modified paths; all other values are shared with `data` \n
     Returns:
         (dict|list): The modified JSON data \n
     '''
-    if deepcopy:
-        data = copy.deepcopy(data)
-    pattern = parse(path)
-    if not isinstance(pattern.right, Fields) and not isinstance(pattern.right, Index):
-        raise ValueError("jsonpath.put can only set specific Fields or Indexes")
+    pattern = _field_pattern(path, "put")
 
-    matches = pattern.left.find(data)
-    for match in matches:
-        new_value = match.value
-        idxs = [pattern.right.index] if isinstance(pattern.right, Index) \
-            else pattern.right.reified_fields(match.context)
-        for idx in idxs:
-            new_value[idx] = value
-        parse(str(match.full_path)).update(data, new_value)
+    def set_value(container, match):
+        for idx in _field_keys(pattern.right, match):
+            container[idx] = value
 
-    return data
+    return _modify(data, pattern.left, set_value, deepcopy, copy_path)
 
-def append(data, path, value, deepcopy=True):
+def append(data, path, value, deepcopy=True, copy_path=False):
     '''
     Append a value to the given JSONPath location. Location must be a list. \n
     Args:
         data (dict|list): The JSON data \n
         path (str): The JSONPath to a list(s) \n
         value (any): The value to append \n
+        deepcopy (bool): Modify a deep copy of the data \n
+        copy_path (bool): Instead of a deep copy, only copy the containers along the \
+            modified paths; all other values are shared with `data` \n
     Returns:
         (dict|list): The modified JSON data \n
     '''
-    if deepcopy:
-        data = copy.deepcopy(data)
-    pattern = parse(path)
-    matches = pattern.find(data)
-    for match in matches:
-        section = match.value
+    def append_value(section, match): # pylint: disable=unused-argument
         if not isinstance(section, list):
             raise ValueError("jsonpath.append can only do so to a list. " \
                              f"Path '{path}' found type {type(section)}")
         section.append(value)
-        parse(str(match.full_path)).update(data, section)
-    return data
 
-def delete(data, path, deepcopy=True):
+    return _modify(data, compile_path(path), append_value, deepcopy, copy_path)
+
+def delete(data, path, deepcopy=True, copy_path=False):
     '''
     Delete item(s) from JSON data. \n
     Args:
@@ -113,25 +198,19 @@ def delete(data, path, deepcopy=True):
         path (str): The JSONPath to the object(s) to delete \n
             Last element in path will be removed, which must be \
             a specific Field or Index only \n
+        deepcopy (bool): Modify a deep copy of the data \n
+        copy_path (bool): Instead of a deep copy, only copy the containers along the \
+            modified paths; all other values are shared with `data` \n
     Returns:
         (dict|list): The modified JSON data \n
     '''
-    if deepcopy:
-        data = copy.deepcopy(data)
-    pattern = parse(path)
-    if not isinstance(pattern.right, Fields) and not isinstance(pattern.right, Index):
-        raise ValueError("jsonpath.put can only set specific Fields or Indexes")
+    pattern = _field_pattern(path, "put")
 
-    matches = pattern.left.find(data)
-    for match in matches:
-        new_value = match.value
-        idxs = [pattern.right.index] if isinstance(pattern.right, Index) \
-            else pattern.right.reified_fields(match.context)
-        for idx in idxs:
-            del new_value[idx]
-        parse(str(match.full_path)).update(data, new_value)
+    def delete_value(container, match):
+        for idx in _field_keys(pattern.right, match):
+            del container[idx]
 
-    return data
+    return _modify(data, pattern.left, delete_value, deepcopy, copy_path)
 
 def eval_within(string: str, context: dict):
     '''
@@ -0,0 +1,102 @@
+"""
+A thread safe, in-memory LRU cache with optional expiration of items.
+"""
+import time
+import threading
+from collections import OrderedDict
+
+class LRUCache:
+    """
+    Least recently used cache of limited size, where each item may also \
+    expire after a number of seconds. Safe for use across threads. \n
+    ```
+    cache = LRUCache(maxsize=100)
+    cache.set("key", value, expire=300)
+    value = cache.get("key")
+    ```
+    """
+    def __init__(self, maxsize=128):
+        """
+        Args:
+            maxsize (int): The maximum number of items to keep \n
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Get an item from the cache, marking it as recently used. \n
+        Args:
+            key (Hashable): The key of the item \n
+            default (Any): The value to return if the item is missing or expired \n
+        Returns:
+            (Any): The cached value, or the default \n
+        """
+        with self._lock:
+            if key in self._items:
+                value, expires = self._items[key]
+                if expires is None or expires > time.monotonic():
+                    self._items.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._items[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, expire=None):
+        """
+        Add an item to the cache, removing the least recently used item if the cache is full. \n
+        Args:
+            key (Hashable): The key of the item \n
+            value (Any): The value to cache \n
+            expire (int|float|None): Seconds until the item expires, or None to never expire \n
+        """
+        expires = time.monotonic() + expire if expire is not None else None
+        with self._lock:
+            self._items[key] = (value, expires)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def delete(self, key):
+        """
+        Remove an item from the cache, if present. \n
+        Args:
+            key (Hashable): The key of the item \n
+        """
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self):
+        """
+        Remove all items from the cache and reset the stats. \n
+        """
+        with self._lock:
+            self._items.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        """
+        Get the cache statistics. \n
+        Returns:
+            (dict): The `hits`, `misses`, `size`, and `maxsize` of the cache \n
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._items),
+                "maxsize": self.maxsize,
+            }
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._items and \
+                (self._items[key][1] is None or self._items[key][1] > time.monotonic())
@@ -0,0 +1,217 @@
+"""
+Application metrics in the Prometheus text format, aggregated across all processes.
+"""
+import os
+import bisect
+import threading
+from flask import g, request, has_request_context
+from sandhill.utils.config_loader import get_all_routes
+from sandhill.utils.generic import getconfig
+from sandhill.utils.sandcache import sandcache
+
+# Upper bounds of the histogram buckets, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# The metrics which may be recorded, with their type and description
+METRICS = {
+    "sandhill_request_duration_seconds":
+        ("histogram", "Time taken to handle requests, by route rule."),
+    "sandhill_processor_duration_seconds":
+        ("histogram", "Time taken by data processors, by processor."),
+    "sandhill_upstream_duration_seconds":
+        ("histogram", "Time taken by calls to upstream services, by host and status."),
+    "sandhill_cache_requests_total":
+        ("counter", "Cache lookups, by cache and result."),
+    "sandhill_worker_threads":
+        ("gauge", "Threads running in the worker processes which reported recently."),
+    "sandhill_workers":
+        ("gauge", "Worker processes which reported recently."),
+}
+
+# Per-process set of the route rules used as labels; see route_label()
+_route_rules = {"pid": None, "rules": frozenset()}
+_route_rules_lock = threading.Lock()
+
+# Guards the metrics pending for a request, which processor threads may add to
+_pending_lock = threading.Lock()
+
+def enabled():
+    """
+    Check if metrics are being recorded, per the `METRICS` config. \n
+    Returns:
+        (bool): True if enabled \n
+    """
+    return bool(int(getconfig('METRICS', 0)))
+
+def metrics_cache():
+    """
+    Get the on disk store of the metrics, shared by all processes so counts \
+    are kept when workers are recycled. \n
+    Returns:
+        (diskcache.Cache): The store \n
+    """
+    return sandcache('metrics').cache('metrics', eviction_policy='none')
+
+def route_label():
+    """
+    Get the label for the route of the current request. Only route rules from the \
+    route configs (see `get_all_routes()`) are used, so the number of labels is bounded. \n
+    Returns:
+        (str): The route rule, else the endpoint name or `unmatched` \n
+    """
+    with _route_rules_lock:
+        if _route_rules["pid"] != os.getpid():
+            _route_rules["pid"] = os.getpid()
+            _route_rules["rules"] = frozenset(route.rule for route in get_all_routes())
+        rules = _route_rules["rules"]
+    if request.url_rule is not None and request.url_rule.rule in rules:
+        return request.url_rule.rule
+    return request.endpoint or "unmatched"
+
+def _add(updates):
+    """
+    Add values to the metrics of the current request, or write them immediately when \
+    outside of a request. \n
+    Args:
+        updates (dict): Metric keys mapped to the amount to add \n
+    """
+    if not has_request_context():
+        _write(updates)
+        return
+    with _pending_lock:
+        pending = g.setdefault("metrics", {})
+        for key, amount in updates.items():
+            pending[key] = pending.get(key, 0) + amount
+
+def observe(metric, seconds, **labels):
+    """
+    Record a duration in a histogram metric. \n
+    ```
+    observe("sandhill_upstream_duration_seconds", 0.12, host="solr", status="200")
+    ```
+    Args:
+        metric (str): The metric name, from `METRICS` \n
+        seconds (float): The duration \n
+        **labels: The labels for the value \n
+    """
+    if not enabled():
+        return
+    labels = tuple(sorted((name, str(val)) for name, val in labels.items()))
+    bucket = BUCKETS[idx] if (idx := bisect.bisect_left(BUCKETS, seconds)) < len(BUCKETS) \
+        else "+Inf"
+    _add({
+        (metric, labels, "bucket", bucket): 1,
+        (metric, labels, "sum", None): seconds,
+        (metric, labels, "count", None): 1,
+    })
+
+def count(metric, amount=1, **labels):
+    """
+    Increment a counter metric. \n
+    Args:
+        metric (str): The metric name, from `METRICS` \n
+        amount (int): The amount to add \n
+        **labels: The labels for the counter \n
+    """
+    if not enabled():
+        return
+    labels = tuple(sorted((name, str(val)) for name, val in labels.items()))
+    _add({(metric, labels, "total", None): amount})
+
+def flush():
+    """
+    Write the metrics recorded during the current request to the shared store, in a \
+    single transaction, along with the thread count of this process. \n
+    """
+    if enabled():
+        with _pending_lock:
+            pending = g.pop("metrics", {})
+        _write(pending)
+
+def _write(updates):
+    """
+    Add values to the shared store. \n
+    Args:
+        updates (dict): Metric keys mapped to the amount to add \n
+    """
+    cache = metrics_cache()
+    with cache.transact(retry=True):
+        for key, amount in updates.items():
+            cache.incr(key, amount, default=0, retry=True)
+        cache.set(("sandhill_worker_threads", (("pid", str(os.getpid())),), "value", None),
+                  threading.active_count(), expire=int(getconfig('METRICS_WORKER_TTL', 300)),
+                  retry=True)
+
+def _escape(value):
+    """
+    Escape a label value for the Prometheus text format. \n
+    Args:
+        value (str): The label value \n
+    Returns:
+        (str): The escaped value \n
+    """
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _series(metric, labels, extra=()):
+    """
+    Format the name and labels of a series. \n
+    Args:
+        metric (str): The metric name \n
+        labels (tuple): The label name and value pairs \n
+        extra (tuple): Additional label name and value pairs \n
+    Returns:
+        (str): The series, e.g. `metric{name="value"}` \n
+    """
+    pairs = [f'{name}="{_escape(val)}"' for name, val in labels + extra]
+    return f"{metric}{{{','.join(pairs)}}}" if pairs else metric
+
+def collect():
+    """
+    Read the metrics of all processes from the shared store. \n
+    Returns:
+        (dict): Metric names mapped to a dict of labels to values; for histograms, \
+            the value is a dict of `buckets` (per upper bound), `sum`, and `count` \n
+    """
+    cache = metrics_cache()
+    cache.expire(retry=True)
+    values = {metric: {} for metric in METRICS}
+    for key in list(cache.iterkeys()):
+        if (value := cache.get(key, retry=True)) is None or key[0] not in METRICS:
+            continue
+        metric, labels, part, bucket = key
+        if metric == "sandhill_worker_threads":
+            values[metric][()] = values[metric].get((), 0) + value
+            values["sandhill_workers"][()] = values["sandhill_workers"].get((), 0) + 1
+        elif part == "bucket":
+            series = values[metric].setdefault(labels, {"buckets": {}, "sum": 0, "count": 0})
+            series["buckets"][bucket] = value
+        elif part in ("sum", "count"):
+            values[metric].setdefault(labels, {"buckets": {}, "sum": 0, "count": 0})[part] = value
+        else:
+            values[metric][labels] = value
+    return values
+
+def export():
+    """
+    Get the metrics of all processes in the Prometheus text exposition format. \n
+    Returns:
+        (str): The metrics \n
+    """
+    lines = []
+    for metric, values in collect().items():
+        kind, description = METRICS[metric]
+        lines += [f"# HELP {metric} {description}", f"# TYPE {metric} {kind}"]
+        for labels, value in sorted(values.items()):
+            if kind != "histogram":
+                lines.append(f"{_series(metric, labels)} {value}")
+                continue
+            cumulative = 0
+            for bound in BUCKETS:
+                cumulative += value["buckets"].get(bound, 0)
+                lines.append(f"{_series(metric + '_bucket', labels, (('le', str(bound)),))} "
+                             f"{cumulative}")
+            lines.append(f"{_series(metric + '_bucket', labels, (('le', '+Inf'),))} "
+                         f"{value['count']}")
+            lines.append(f"{_series(metric + '_sum', labels)} {value['sum']}")
+            lines.append(f"{_series(metric + '_count', labels)} {value['count']}")
+    return "\n".join(lines) + "\n"
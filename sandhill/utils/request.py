@@ -4,7 +4,7 @@ Client request related functions
 from typing import Any  # pylint: disable=unused-import
 import mimetypes
 from copy import deepcopy
-from flask import request, abort
+from flask import request, abort, has_request_context
 from sandhill.utils.generic import touniquelist
 
 
@@ -140,3 +140,17 @@ def overlay_with_query_args(query_config, request_args=None, *, allow_undefined=
         query_params.update(request_args)
 
     return query_params
+
+def forward_headers(names):
+    """
+    Get the headers from the current client request that should be passed along \
+    to an upstream service, e.g. the `Range` or `If-None-Match` headers. \n
+    Args:
+        names (list): The names of the headers to forward \n
+    Returns:
+        (dict): The headers present in the client request, or an empty dict if \
+            there is no request context. \n
+    """
+    if not has_request_context():
+        return {}
+    return {name: request.headers[name] for name in names if name in request.headers}
@@ -1,7 +1,12 @@
 """
 Functions for handling responses.
 """
+import json
+import hashlib
 from flask import Response
+from lxml import etree
+from requests.models import Response as RequestsResponse
+from sandhill.utils.generic import getdescendant
 
 def to_response(string: str, content_type: str="text/plain") -> Response:
     """
@@ -13,3 +18,58 @@ def to_response(string: str, content_type: str="text/plain") -> Response:
         (Response): The Flask response containing the string. \n
     """
     return Response(string, content_type=content_type)
+
+def validator_etag(data: dict, validators: list|None=None, extra=None) -> str|None:
+    """
+    Compute an ETag from the loaded data of a route. \n
+    Args:
+        data (dict): The data loaded by the route's data processors.\n
+        validators (list|None): [Descendant paths](#TODO) within data of the values which \
+            identify a version of the content (e.g. `record._version_`); if not set, \
+            all loaded data is used.\n
+        extra (Any): Additional JSON serializable values to include in the ETag.\n
+    Returns:
+        (str|None): The ETag, or None if the data could not be used as a validator. \n
+    """
+    values = [getdescendant(data, path) for path in validators] if validators else data
+    try:
+        serialized = json.dumps([values, extra], sort_keys=True, default=_validator_value)
+    except (TypeError, ValueError):
+        return None
+    return hashlib.sha1(serialized.encode('utf-8')).hexdigest()
+
+def _validator_value(obj):
+    """
+    Get a JSON serializable validator value for a loaded data object. \n
+    Args:
+        obj (Any): The object which json.dumps is unable to serialize \n
+    Returns:
+        (str): The upstream ETag or Last-Modified of a response, or the serialized XML \n
+    Raises:
+        TypeError: If no validator value can be determined for the object \n
+    """
+    if isinstance(obj, RequestsResponse):
+        if validator := obj.headers.get('ETag', obj.headers.get('Last-Modified')):
+            return validator
+    elif isinstance(obj, (etree._Element, etree._ElementTree)): # pylint: disable=protected-access
+        return etree.tostring(obj).decode('utf-8')
+    raise TypeError(f"Unable to determine a validator for: {type(obj)}")
+
+def set_cache_headers(response: Response, etag: str, max_age: int=0) -> Response:
+    """
+    Set the ETag and Cache-Control headers of a response. \n
+    Args:
+        response (Response): The response to update.\n
+        etag (str): The ETag for the response.\n
+        max_age (int): Seconds clients may use the response without revalidating it; \
+            with 0, clients must always revalidate.\n
+    Returns:
+        (Response): The updated response. \n
+    """
+    response.set_etag(etag)
+    response.cache_control.public = True
+    if max_age > 0:
+        response.cache_control.max_age = max_age
+    else:
+        response.cache_control.no_cache = True
+    return response
@@ -3,24 +3,100 @@ The Sand Cache; quick access to data stored on disk
 """
 import os
 import tempfile
-from contextlib import contextmanager
-from diskcache import Cache
+import threading
+from functools import wraps
+from diskcache import FanoutCache
+from diskcache.core import ENOVAL, args_to_key, full_name
 from sandhill import app
 
-@contextmanager
-def sandcache():
+# Per-process registry of open cache handles; see sandcache()
+_handles = {"pid": None, "caches": {}}
+_handles_lock = threading.Lock()
+
+class SandCache(FanoutCache):
+    """
+    A diskcache FanoutCache which remains open when used as a context manager, \
+    as the handle is shared for the life of the process. \n
+    """
+    def __exit__(self, *exception):
+        pass
+
+def sandcache(name=None, **settings):
     """
-    Opens the default diskcache cache for Sandhill. Operates like a dict, but
-    writes to a database within /tmp/crane-cache/
+    Get the diskcache cache for Sandhill. Operates like a dict, but \
+    writes to databases within /tmp/crane-cache/<name>/ \n
+    Each named cache is opened once per process (and reopened after a fork) and is \
+    sharded per `DISKCACHE_SHARDS` to allow concurrent writes from many processes. \n
     ```
+    cache = sandcache('solr')
+    cache['data'] = data_to_cache
+    quick_load = cache['data_cached']
+    # or as a context manager
     with sandcache() as cache:
         cache['data'] = data_to_cache
-        quick_load = cache['data_cached']
     ```
+    Args:
+        name (str|None): The name of the cache to use; defaults to the `default` cache \n
+        **settings: [diskcache settings](https://grantjenks.com/docs/diskcache/api.html#constants) \
+            for the cache, used only when it is first opened within the process \n
+    Returns:
+        (SandCache): The cache handle \n
+    """
+    name = name or "default"
+    with _handles_lock:
+        if _handles["pid"] != os.getpid():
+            # Connections inherited from the parent process must not be reused
+            _handles["pid"] = os.getpid()
+            _handles["caches"] = {}
+        if name not in _handles["caches"]:
+            settings = {
+                "size_limit": int(float(app.config.get('DISKCACHE_SIZE_GB', 1)) * 1024**3),
+                "eviction_policy": app.config.get(
+                    'DISKCACHE_EVICTION_POLICY', 'least-recently-stored'),
+                **settings
+            }
+            _handles["caches"][name] = SandCache(
+                os.path.join(tempfile.gettempdir(), 'crane-cache', name),
+                shards=int(app.config.get('DISKCACHE_SHARDS', 8)),
+                **settings
+            )
+        return _handles["caches"][name]
+
+def memoize(name=None, expire=None, tag=None, typed=False, ignore=()):
+    """
+    Decorator to cache the return value of a function in the named sandcache, \
+    keyed on the function name and arguments. \n
+    ```
+    @memoize('api', expire=300)
+    def load_collections(url):
+        ...
+    ```
+    Args:
+        name (str|None): The name of the cache to use \n
+        expire (int|float|None): Seconds until the cached value expires, or None to \
+            never expire \n
+        tag (str|None): A tag to store with cached values \n
+        typed (bool): Cache arguments of different types separately (e.g. 3 and 3.0) \n
+        ignore (set): Positional or keyword arguments to ignore when creating the key \n
+    Returns:
+        (function): The decorator \n
     """
-    cachedir = os.path.join(tempfile.gettempdir(), 'crane-cache')
-    cache = Cache(cachedir, size_limit=app.config.get('DISKCACHE_SIZE_GB', 1) * 1024**3)
-    try:
-        yield cache
-    finally:
-        cache.close()
+    def decorator(func):
+        base = (full_name(func),)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = wrapper.__cache_key__(*args, **kwargs)
+            cache = sandcache(name)
+            result = cache.get(key, default=ENOVAL, retry=True)
+            if result is ENOVAL:
+                result = func(*args, **kwargs)
+                cache.set(key, result, expire, tag=tag, retry=True)
+            return result
+
+        def __cache_key__(*args, **kwargs):
+            return args_to_key(base, args, kwargs, typed, ignore)
+
+        wrapper.__cache_key__ = __cache_key__
+        return wrapper
+    return decorator
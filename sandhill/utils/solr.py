@@ -2,56 +2,51 @@
 Solr related functionality.
 """
 import re
+from functools import lru_cache
+
+# Token rules for parsing a query, in order of precedence; see tokenize_query()
+_TOKEN_RULES = (
+    ("QUOTE", r'"'),
+    ("RANGE", r'[\[\]]'),
+    ("PAREN", r'[()]'),
+    ("LOGIC", r'AND|OR|&&|\|\||NOT'),
+    ("WILD", r'[*?]'),
+    ("PLMS", r'[-+]'),
+    ("TERM", r'[^-+\[\]?*()"\s]+'),
+    ("SPACE", r'\s+'),
+)
+_TOKEN_RE = re.compile('|'.join(f"(?P<{tid}>{rule})" for tid, rule in _TOKEN_RULES))
+
+# Characters which may be changed by encode_query(), or make it raise; wildcards aside
+_QUERY_SPECIAL_RE = re.compile(r'[&|!{}^~:;\\"()\[\]+\-]')
+_WILDCARD_RE = re.compile(r'[*?]')
+
+# Characters escaped in values, and their escaped forms
+_ESCAPES_ALL = {'*': r'\*', '?': r'\?', '-': r'\-', '&': r'\&', '|': r'\|', \
+    '!': r'\!', '(': r'\(', ')': r'\)', '{': r'\{', '}': r'\}', '[': r'\[', ']': r'\]', \
+    '^': r'\^', '~': r'\~', ' ': r'\ ', '+': r'\+', ':': r'\:', '"': r'\"', ';': r'\;'}
+_ESCAPES_ALL_RE = re.compile('|'.join(re.escape(key) for key in _ESCAPES_ALL))
+_ESCAPES_NOWILD = dict(list(_ESCAPES_ALL.items())[2:])
+_ESCAPES_NOWILD_RE = re.compile('|'.join(re.escape(key) for key in _ESCAPES_NOWILD))
+
+# Number of encoded and decoded values kept for reuse
+ENCODE_CACHE_SIZE = 4096
 
 class Solr:
     """
     Class for handling Solr related logic, such as encoding/decoding.
     """
-    _escape_chars_all = {'*': r'\*', '?': r'\?', '-': r'\-', '&': r'\&', '|': r'\|', \
-        '!': r'\!', '(': r'\(', ')': r'\)', '{': r'\{', '}': r'\}', '[': r'\[', ']': r'\]', \
-        '^': r'\^', '~': r'\~', ' ': r'\ ', '+': r'\+', ':': r'\:', '"': r'\"', ';': r'\;'}
-    _escape_chars_all_re = re.compile('|'.join(re.escape(key) for key in _escape_chars_all))
-    _escape_chars_nowild = dict(list(_escape_chars_all.items())[2:])
-    _escape_chars_nowild_re = re.compile('|'.join(re.escape(key) for key in _escape_chars_nowild))
-
     def __init__(self):
-        self._scanner = None
-
         # Variables for query parsing
         self._tokens = None
         self._pos = None
         self._stack = None
 
-    def _init_scanner(self):
-        """
-        Initialize the token scanner for parsing a query \n
-        """
-        # TODO filter()
-        self._scanner = re.Scanner([
-            (r'"', \
-                lambda scanner, token: ("QUOTE", token)),
-            (r'[\[\]]', \
-                lambda scanner, token: ("RANGE", token)),
-            (r'[()]', \
-                lambda scanner, token: ("PAREN", token)),
-            (r'(AND|OR|&&|\|\||NOT)', \
-                lambda scanner, token: ("LOGIC", token)),
-            (r'[*?]', \
-                lambda scanner, token: ("WILD", token)),
-            (r'[-+]', \
-                lambda scanner, token: ("PLMS", token)),
-            (r'[^-+\[\]?*()"\s]+', \
-                lambda scanner, token: ("TERM", token)),
-            (r'\s+', \
-                lambda scanner, token: ("SPACE", token)),
-        ])
-
     def _tokenize_query(self, query):
         """
         Tokenize a query, resetting stack and stack position \n
         """
-        self._init_scanner()
-        self._tokens, _ = self._scanner.scan(query)
+        self._tokens = list(tokenize_query(query))
         self._pos = 0
         self._stack = []
 
@@ -78,42 +73,6 @@ class Solr:
     def _next_token_is(self, token_id):
         return self._next_token()[0] == token_id
 
-    def _in_stack(self, *args):
-        """
-        Check if ANY of the given arguments are in the _stack \n
-        Args:
-            *args (string): token_id's to check the stack for \n
-        Returns:
-            (bool) Returns True if ANY of the provided args are found in the _stack \n
-        """
-        return any(arg in self._stack for arg in args)
-
-    def _stack_top_is(self, token_id):
-        """
-        Checks that the top of the stack is the given token. An empty stack never matches. \n
-        Args:
-            token_id (str): the token to match \n
-        Returns:
-            (bool) True if matched \n
-        """
-        return self._stack and self._stack[-1] == token_id
-
-    def _stack_entry(self, token_id, token):
-        """
-        Process the given stackable token_id \n
-        Args:
-            token_id (str): the token_id to process \n
-            token (str): the token string \n
-        Raises:
-            ValueError when attempting to close a token pair that hasn't been opened \n
-        """
-        if token in tuple("[("):
-            self._stack.append(token_id)
-        elif self._stack_top_is(token_id):
-            self._stack.pop()
-        else:
-            raise ValueError(f"Cannot close {token_id}; no matching pair.")
-
     def encode_query(self, query, escape_wildcards=False):
         """
         Given a solr query, parse and encode characters as appropriate \n
@@ -122,32 +81,10 @@ class Solr:
             escape_wildcards (bool): Whether to escape * and ? \n
         Returns:
             (str) the encoded solr query \n
+        Raises:
+            ValueError when the query has an unmatched quote, bracket, or parenthesis \n
         """
-        self._tokenize_query(query)
-        encoded = ""
-        for tid, tok in self._get_token():
-            if tid == "QUOTE" and not self._in_stack("QUOTE"):
-                self._stack.append(tid)
-            elif self._in_stack("QUOTE"):
-                if tid == "QUOTE":
-                    self._stack.pop()
-            elif tid == "RANGE":
-                self._stack_entry(tid, tok)
-            elif tid == "TERM" and not self._in_stack("QUOTE", "RANGE"):
-                tok = self.encode_value(tok)
-            elif tid == "PLMS" and self._prev_token_is("TERM") and not self._in_stack("RANGE"):
-                tok = self.encode_value(tok)
-            elif tid == "WILD":
-                tok = self.encode_value(tok, escape_wildcards)
-            elif tid == "PAREN":
-                self._stack_entry(tid, tok)
-
-            encoded += tok
-
-        if self._stack:
-            raise ValueError(f"Unmatched {self._stack[-1]} pair detected in: {query}")
-
-        return encoded
+        return encode_query(query, escape_wildcards)
 
     def encode_value(self, value, escape_wildcards=False):
         """
@@ -158,17 +95,7 @@ class Solr:
         Returns:
             (str) the encoded value \n
         """
-        escapes = Solr._escape_chars_all
-        escape_re = Solr._escape_chars_all_re
-        if not escape_wildcards:
-            escapes = Solr._escape_chars_nowild
-            escape_re = Solr._escape_chars_nowild_re
-
-        def replace(matches):
-            return escapes[matches.group(0)]
-
-        value = value.replace('\\', r'\\')  # must be first replacement
-        return escape_re.sub(replace, value)
+        return encode_value(value, escape_wildcards)
 
     def decode_value(self, value, escape_wildcards=False):
         """
@@ -180,10 +107,126 @@ class Solr:
         Returns:
             (str) the decoded value \n
         """
-        escapes = Solr._escape_chars_all
-        if not escape_wildcards:
-            escapes = Solr._escape_chars_nowild
+        return decode_value(value, escape_wildcards)
+
+@lru_cache(maxsize=ENCODE_CACHE_SIZE)
+def tokenize_query(query):
+    """
+    Split a solr query into tokens. Like `re.Scanner`, each token is the first rule \
+    in `_TOKEN_RULES` matching at the position, and scanning stops at any text no \
+    rule matches. \n
+    Args:
+        query (str): the solr query \n
+    Returns:
+        (tuple) pairs of token id (e.g. `TERM`) and token string \n
+    """
+    tokens = []
+    pos = 0
+    while match := _TOKEN_RE.match(query, pos):
+        tokens.append((match.lastgroup, match.group()))
+        pos = match.end()
+    return tuple(tokens)
+
+def _stack_entry(stack, token_id, token):
+    """
+    Process the given stackable token_id \n
+    Args:
+        stack (list): the token_id's of the open pairs \n
+        token_id (str): the token_id to process \n
+        token (str): the token string \n
+    Raises:
+        ValueError when attempting to close a token pair that hasn't been opened \n
+    """
+    if token in "[(":
+        stack.append(token_id)
+    elif stack and stack[-1] == token_id:
+        stack.pop()
+    else:
+        raise ValueError(f"Cannot close {token_id}; no matching pair.")
+
+@lru_cache(maxsize=ENCODE_CACHE_SIZE)
+def encode_query(query, escape_wildcards=False):
+    """
+    Given a solr query, parse and encode characters as appropriate. Results are \
+    cached, as the same values are often encoded many times for a page. \n
+    Args:
+        query (str): the solr query \n
+        escape_wildcards (bool): Whether to escape * and ? \n
+    Returns:
+        (str) the encoded solr query \n
+    Raises:
+        ValueError when the query has an unmatched quote, bracket, or parenthesis \n
+    """
+    if not _QUERY_SPECIAL_RE.search(query) and \
+      not (escape_wildcards and _WILDCARD_RE.search(query)):
+        return query
+
+    encoded = []
+    stack = []  # open RANGE and PAREN tokens
+    quoted = False
+    ranges = 0
+    prev_tid = None
+    for tid, tok in tokenize_query(query):
+        if tid == "QUOTE" and not quoted:
+            quoted = True
+        elif quoted:
+            if tid == "QUOTE":
+                quoted = False
+        elif tid in ("RANGE", "PAREN"):
+            _stack_entry(stack, tid, tok)
+            ranges = stack.count("RANGE") if tid == "RANGE" else ranges
+        elif tid == "TERM" and not ranges:
+            tok = encode_value(tok)
+        elif tid == "PLMS" and prev_tid == "TERM" and not ranges:
+            tok = encode_value(tok)
+        elif tid == "WILD":
+            tok = encode_value(tok, escape_wildcards)
+        encoded.append(tok)
+        prev_tid = tid
+
+    if quoted or stack:
+        raise ValueError(f"Unmatched {'QUOTE' if quoted else stack[-1]} pair detected in: {query}")
+
+    return "".join(encoded)
+
+@lru_cache(maxsize=ENCODE_CACHE_SIZE)
+def encode_value(value, escape_wildcards=False):
+    """
+    Given a value, encode characters as appropriate for use in a Solr query \n
+    Args:
+        query (str): the value to encode \n
+        escape_wildcards (bool): Whether to encode * and ? \n
+    Returns:
+        (str) the encoded value \n
+    """
+    escapes, escape_re = (_ESCAPES_ALL, _ESCAPES_ALL_RE) if escape_wildcards \
+        else (_ESCAPES_NOWILD, _ESCAPES_NOWILD_RE)
+
+    if '\\' not in value and not escape_re.search(value):
+        return value
+
+    def replace(matches):
+        return escapes[matches.group(0)]
+
+    value = value.replace('\\', r'\\')  # must be first replacement
+    return escape_re.sub(replace, value)
+
+@lru_cache(maxsize=ENCODE_CACHE_SIZE)
+def decode_value(value, escape_wildcards=False):
+    """
+    Given a value already encoded for use in a Solr query, decode the \
+    characters back to a normal string \n
+    Args:
+        query (str): the value to decode \n
+        escape_wildcards (bool): Whether to decode * and ? \n
+    Returns:
+        (str) the decoded value \n
+    """
+    if '\\' not in value:
+        return value
+
+    escapes = _ESCAPES_ALL if escape_wildcards else _ESCAPES_NOWILD
 
-        for key, val in escapes.items():
-            value = value.replace(val, key)
-        return value.replace(r'\\', '\\')  # must be last replacement
+    for key, val in escapes.items():
+        value = value.replace(val, key)
+    return value.replace(r'\\', '\\')  # must be last replacement
@@ -0,0 +1,184 @@
+"""
+The static file manifest; resolves the instance/core static overlay once and tracks \
+content hashes and precompressed variants of each file.
+"""
+import os
+import gzip
+import json
+import shutil
+import hashlib
+import threading
+from flask import url_for
+from sandhill import app
+from sandhill.utils.generic import getconfig
+
+# Precompressed variant file suffixes, in order of preference
+ENCODINGS = {"br": ".br", "gzip": ".gz"}
+
+# File extensions worth compressing when building variants
+COMPRESSIBLE = ('.css', '.js', '.mjs', '.json', '.map', '.svg', '.xml', '.txt',
+                '.html', '.htm', '.csv', '.ico', '.ttf', '.otf', '.eot', '.wasm')
+
+# Per-process manifest; see manifest()
+_manifest = {"files": None}
+_manifest_lock = threading.Lock()
+
+def roots():
+    """
+    Get the static directories, in order of precedence. \n
+    Returns:
+        (list): The `instance/static/` and core `sandhill/static/` paths \n
+    """
+    return [os.path.join(app.instance_path, "static"), os.path.join(app.root_path, "static")]
+
+def manifest_path():
+    """
+    Get the path of the manifest file, from the `STATIC_MANIFEST` config. \n
+    Returns:
+        (str): The manifest file path \n
+    """
+    return getconfig('STATIC_MANIFEST') or os.path.join(app.instance_path, "static-manifest.json")
+
+def scan(hashes=False):
+    """
+    Walk the static directories to build the manifest; a file in `instance/static/` \
+    overrides the same file in `sandhill/static/`. \n
+    Args:
+        hashes (bool): Calculate the content hash of each file now instead of on first use \n
+    Returns:
+        (dict): Entries keyed by the file path within `/static` with: \n
+            * `path` _str_: The full path to the file \n
+            * `hash` _str|None_: The content hash, if calculated \n
+            * `encodings` _dict_: Encoding names mapped to the path of the precompressed file \n
+    """
+    files = {}
+    for root in roots():
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                name = os.path.relpath(path, root).replace(os.sep, '/')
+                if name not in files:
+                    files[name] = {"path": path, "hash": None, "encodings": {}}
+    for name, entry in files.items():
+        for encoding, suffix in ENCODINGS.items():
+            if (variant := files.get(name + suffix)) and \
+                    os.path.getmtime(variant["path"]) >= os.path.getmtime(entry["path"]):
+                entry["encodings"][encoding] = variant["path"]
+        if hashes:
+            file_hash(entry)
+    return files
+
+def load():
+    """
+    Load the manifest file written by `flask static --build`, if present and current, \
+    else build the manifest from the static directories. \n
+    Returns:
+        (dict): The manifest entries; see `scan()` \n
+    """
+    files = scan()
+    try:
+        with open(manifest_path(), encoding='utf-8') as mfile:
+            hashes = json.load(mfile)
+    except (OSError, ValueError):
+        hashes = {}
+    for name, entry in files.items():
+        if name in hashes and hashes[name]["mtime"] == os.path.getmtime(entry["path"]):
+            entry["hash"] = hashes[name]["hash"]
+    return files
+
+def manifest():
+    """
+    Get the static manifest, built once per process. In debug mode it is rebuilt \
+    each time so file changes are seen immediately. \n
+    Returns:
+        (dict): The manifest entries; see `scan()` \n
+    """
+    if app.debug:
+        return scan()
+    with _manifest_lock:
+        if _manifest["files"] is None:
+            _manifest["files"] = load()
+        return _manifest["files"]
+
+def file_hash(entry):
+    """
+    Get the content hash of a manifest entry, calculating it if needed. \n
+    Args:
+        entry (dict): The manifest entry \n
+    Returns:
+        (str): The first 12 hex digits of the SHA-256 of the file contents \n
+    """
+    if entry["hash"] is None:
+        with open(entry["path"], 'rb') as sfile:
+            entry["hash"] = hashlib.file_digest(sfile, 'sha256').hexdigest()[:12]
+    return entry["hash"]
+
+def url(filename):
+    """
+    Get the URL for a static file, fingerprinted with the hash of its content so \
+    it can be cached by clients indefinitely. Available in templates as `static_url`. \n
+    ```
+    <link rel="stylesheet" href="{{ static_url('css/main.css') }}">
+    ```
+    Args:
+        filename (str): The file path within `/static` \n
+    Returns:
+        (str): The URL of the file \n
+    """
+    if (entry := manifest().get(filename)) is None:
+        return url_for('static', filename=filename)
+    return url_for('static', filename=filename, v=file_hash(entry))
+
+def compress(entry, min_size=512):
+    """
+    Write gzip and, if the `brotli` package is installed, brotli compressed \
+    variants next to a static file, when they are smaller than the original. \n
+    Args:
+        entry (dict): The manifest entry \n
+        min_size (int): Files smaller than this many bytes are not compressed \n
+    Returns:
+        (list): The encodings written \n
+    """
+    path = entry["path"]
+    if not path.endswith(COMPRESSIBLE) or os.path.getsize(path) < min_size:
+        return []
+    with open(path, 'rb') as sfile:
+        content = sfile.read()
+    variants = {"gzip": gzip.compress(content, compresslevel=9, mtime=0)}
+    try:
+        import brotli # pylint: disable=import-outside-toplevel
+        variants["br"] = brotli.compress(content)
+    except ImportError:
+        pass
+    written = []
+    for encoding, compressed in variants.items():
+        if len(compressed) < len(content):
+            with open(path + ENCODINGS[encoding], 'wb') as vfile:
+                vfile.write(compressed)
+            shutil.copystat(path, path + ENCODINGS[encoding])
+            entry["encodings"][encoding] = path + ENCODINGS[encoding]
+            written.append(encoding)
+    return written
+
+def build(compress_files=True):
+    """
+    Build the precompressed variants and write the manifest file. \n
+    Args:
+        compress_files (bool): Write compressed variants of the static files \n
+    Returns:
+        (dict): The manifest entries; see `scan()` \n
+    """
+    if compress_files:
+        for name, entry in scan().items():
+            if not name.endswith(tuple(ENCODINGS.values())):
+                compress(entry)
+    files = scan(hashes=True)
+    hashes = {
+        name: {"hash": entry["hash"], "mtime": os.path.getmtime(entry["path"])}
+        for name, entry in files.items()
+    }
+    with open(manifest_path(), 'w', encoding='utf-8') as mfile:
+        json.dump(hashes, mfile, indent=1, sort_keys=True)
+    with _manifest_lock:
+        _manifest["files"] = files
+    return files
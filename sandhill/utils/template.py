@@ -1,10 +1,50 @@
 '''
 Template and Jinja2 utilities
 '''
+import re
 import json
-import flask
+from ast import literal_eval
+from functools import lru_cache
+from flask import render_template
+from jinja2 import TemplateError, Undefined
+from sandhill import app
 from sandhill import filters        # pylint: disable=unused-import
 from sandhill.utils import context  # pylint: disable=unused-import
+from sandhill.utils.generic import getconfig
+
+@lru_cache(maxsize=int(getconfig('TEMPLATE_CACHE_SIZE', 512)))
+def _compile_template(template_str, environment, autoescape): # pylint: disable=unused-argument
+    """
+    Compile a template string; cached by the hash of all arguments. The `autoescape` \
+    argument is part of the cache key, as the autoescape setting is compiled into the template.
+    """
+    return environment.from_string(template_str)
+
+def compile_template(template_str, environment=None):
+    """
+    Get the compiled Jinja template for a template string. Compiled templates are kept \
+    in a bounded LRU cache keyed by the template source, so repeated renders of the same \
+    template string only compile once. Cache size set by `TEMPLATE_CACHE_SIZE`. \n
+    Args:
+        template_str (str): The template source \n
+        environment (jinja2.Environment): The environment to compile with. \
+            Default: the application Jinja environment \n
+    Returns:
+        (jinja2.Template): The compiled template. \n
+    Raises:
+        jinja2.TemplateError: On invalid template. \n
+    """
+    environment = environment if environment else app.jinja_env
+    return _compile_template(template_str, environment, environment.autoescape)
+
+def template_cache_info():
+    """
+    Get the compiled template cache statistics. \n
+    Returns:
+        (functools._CacheInfo): Named tuple of `hits`, `misses`, `maxsize`, and `currsize`. \n
+    """
+    # pylint cannot see through the lru_cache wrapper to cache_info()
+    return _compile_template.cache_info() # pylint: disable=no-value-for-parameter
 
 def render_template_string(template_str, ctx):
     """
@@ -18,7 +58,8 @@ def render_template_string(template_str, ctx):
         jinja2.TemplateError: On invalid template. \n
     """
     with context.app_context():
-        return flask.render_template_string(template_str, **ctx)
+        # Flask renders a compiled template as given, rather than looking it up by name
+        return render_template(compile_template(template_str, app.jinja_env), **ctx)
 
 def evaluate_conditions(conditions, ctx, match_all=True):
     """
@@ -52,7 +93,206 @@ def evaluate_conditions(conditions, ctx, match_all=True):
     # Only assigned matched value if ALL matches are successful
     return matched if matched == len(conditions) or not match_all else 0
 
+# A `when` clause made up of a single Jinja expression, e.g. `{{ view_args.id == 1 }}`
+_WHEN_EXPRESSION = re.compile(r"\{\{-?(.*?)-?\}\}", re.DOTALL)
+
+def _when_value(value):
+    """
+    Convert the result of a `when` expression to its value. String results (including \
+    undefined values, which render as an empty string) are evaluated as a Python \
+    literal, as they were when clauses were rendered as templates.
+    """
+    if isinstance(value, (str, Undefined)):
+        return literal_eval(str(value))
+    return value
+
+@lru_cache(maxsize=int(getconfig('TEMPLATE_CACHE_SIZE', 512)))
+def _compile_when(when, environment, autoescape): # pylint: disable=unused-argument
+    """
+    Compile a `when` clause; cached by the hash of all arguments. See `compile_when()`.
+    """
+    when = when.strip()
+    match = _WHEN_EXPRESSION.fullmatch(when)
+    if match and "{{" not in match[1] and "}}" not in match[1]:
+        expression = environment.compile_expression(match[1], undefined_to_none=False)
+        return lambda ctx: _when_value(expression(**ctx))
+    if not any(marker in when for marker in ("{{", "{%", "{#")):
+        value = literal_eval(when)
+        return lambda ctx: value
+    template = environment.from_string(when)
+    return lambda ctx: literal_eval(template.render(ctx).strip())
+
+def compile_when(when, environment=None):
+    """
+    Compile the `when` clause of a route data entry into a function which evaluates it \
+    against a template context. A clause made up of a single `{{ expression }}` is \
+    compiled as a Jinja expression, which evaluates directly to a Python value; a \
+    clause without Jinja syntax is a Python literal, evaluated only once. Any other \
+    clause is rendered as a template and the output evaluated as a Python literal. \
+    Compiled clauses are cached by their source, like templates. \n
+    Args:
+        when (str): The `when` clause \n
+        environment (jinja2.Environment): The environment to compile with. \
+            Default: the application Jinja environment \n
+    Returns:
+        (function): Takes the template context (dict) and returns the clause value \n
+    Raises:
+        jinja2.TemplateError: On invalid Jinja syntax. \n
+        ValueError|SyntaxError: If the clause is not Jinja and not a Python literal. \n
+    """
+    environment = environment if environment else app.jinja_env
+    return _compile_when(str(when), environment, environment.autoescape)
+
+def evaluate_when(when, ctx):
+    """
+    Evaluate a `when` clause with added Sandhill filters/context processors. \n
+    Args:
+        when (str): The `when` clause \n
+        ctx (dict): Context for the clause \n
+    Returns:
+        (Any): The value of the clause \n
+    Raises:
+        jinja2.TemplateError: On invalid Jinja syntax or values. \n
+        ValueError|SyntaxError: If a rendered value is not a Python literal. \n
+    """
+    with context.app_context():
+        compiled = compile_when(when)
+        ctx = dict(ctx)
+        app.update_template_context(ctx)
+        return compiled(ctx)
+
+def when_errors(route_config):
+    """
+    Check that the `when` clause of every data entry in a route config can be compiled. \n
+    Args:
+        route_config (dict): A loaded route config \n
+    Returns:
+        (list[tuple]): For each invalid clause, the entry name, the clause, and the error \n
+    """
+    errors = []
+    for entry in route_config.get('data', []):
+        if not isinstance(entry, dict) or 'when' not in entry:
+            continue
+        try:
+            compile_when(entry['when'])
+        except (TemplateError, ValueError, SyntaxError) as exc:
+            errors.append((entry.get('name'), entry['when'], exc))
+    return errors
+
+@lru_cache(maxsize=1)
+def _json_environment():
+    """
+    Jinja environment for rendering string values within JSON structures; autoescape \
+    is disabled as the rendered values are data, not HTML.
+    """
+    return app.jinja_env.overlay(autoescape=False)
+
+def _compile_json_node(node, environment):
+    """
+    Compile a JSON node into its template skeleton. \n
+    Args:
+        node (Any): A value within a JSON structure \n
+        environment (jinja2.Environment): The environment to compile strings with \n
+    Returns:
+        (None|jinja2.Template|dict|list): None if the node contains no Jinja syntax; \
+            a compiled template for a string; a dict mapping each key to a tuple of \
+            (key skeleton, value skeleton); or a list of skeletons for each item. \n
+    """
+    if isinstance(node, str):
+        markers = (environment.variable_start_string, environment.block_start_string,
+                   environment.comment_start_string)
+        if any(marker in node for marker in markers):
+            return compile_template(node, environment)
+        return None
+    if isinstance(node, dict):
+        compiled = {
+            key: (_compile_json_node(key, environment), _compile_json_node(val, environment))
+            for key, val in node.items()
+        }
+        dynamic = any(ckey is not None or cval is not None for ckey, cval in compiled.values())
+        return compiled if dynamic else None
+    if isinstance(node, list):
+        compiled = [_compile_json_node(val, environment) for val in node]
+        return compiled if any(cval is not None for cval in compiled) else None
+    return None
+
+def compile_template_json(json_obj):
+    """
+    Walk a JSON structure and compile every string (value or key) containing Jinja \
+    syntax, returning a template skeleton of the structure. Route data entries are \
+    compiled once per route (see `sandhill.processors.base.prepare_route_data()`) and \
+    the skeleton passed to `render_template_skeleton()`. \n
+    Args:
+        json_obj (dict|list): JSON represented in Python \n
+    Returns:
+        (None|jinja2.Template|dict|list): The template skeleton, or None if the \
+            structure contains no Jinja syntax. \n
+    Raises:
+        jinja2.TemplateError: On invalid template. \n
+    """
+    return _compile_json_node(json_obj, _json_environment())
+
+def _render_json_node(compiled, node, ctx):
+    """
+    Render a JSON node using its template skeleton; see `_compile_json_node()`.
+    """
+    if compiled is None:
+        return node
+    if isinstance(compiled, list):
+        return [_render_json_node(cval, val, ctx) for cval, val in zip(compiled, node)]
+    if isinstance(compiled, dict):
+        rendered = {}
+        for key, val in node.items():
+            ckey, cval = compiled.get(key, (None, None))
+            rendered[ckey.render(ctx) if ckey else key] = _render_json_node(cval, val, ctx)
+        return rendered
+    return compiled.render(ctx)
+
 def render_template_json(json_obj, ctx):
+    """
+    Render all strings within a JSON structure as templates. Only strings containing Jinja \
+    syntax are rendered; all other values are kept as is (they are not copied). \n
+    If `LEGACY_JSON_RENDERING` is enabled, the structure is instead serialized, \
+    rendered as a whole, and then converted back to JSON. \n
+    Args:
+        json_obj (dict|list): JSON represented in Python \n
+        ctx (dict): Context for the jinja template \n
+    Returns:
+        (dict|list): The updated JSON structure \n
+    Raises:
+        json.JSONDecodeError: With `LEGACY_JSON_RENDERING` enabled, if the resulting \
+            template is unable to be parsed as JSON \n
+        jinja2.TemplateError: On invalid template. \n
+    """
+    if bool(int(getconfig('LEGACY_JSON_RENDERING', 0))):
+        return render_template_json_legacy(json_obj, ctx)
+    return render_template_skeleton(compile_template_json(json_obj), json_obj, ctx)
+
+def render_template_skeleton(skeleton, json_obj, ctx):
+    """
+    Render a JSON structure as by `render_template_json()`, using a template skeleton \
+    already compiled from it by `compile_template_json()`. \n
+    Args:
+        skeleton (None|jinja2.Template|dict|list): The template skeleton of json_obj \n
+        json_obj (dict|list): JSON represented in Python \n
+        ctx (dict): Context for the jinja template \n
+    Returns:
+        (dict|list): The updated JSON structure \n
+    Raises:
+        json.JSONDecodeError: With `LEGACY_JSON_RENDERING` enabled, if the resulting \
+            template is unable to be parsed as JSON \n
+        jinja2.TemplateError: On invalid template. \n
+    """
+    if bool(int(getconfig('LEGACY_JSON_RENDERING', 0))):
+        return render_template_json_legacy(json_obj, ctx)
+    if skeleton is None:
+        return json_obj
+    with context.app_context():
+        ctx = dict(ctx)
+        app.update_template_context(ctx)
+        return _render_json_node(skeleton, json_obj, ctx)
+
+def render_template_json_legacy(json_obj, ctx):
     """
     Serialize a JSON, render it as a template, then convert back to JSON \n
     Args:
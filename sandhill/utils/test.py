@@ -1,10 +1,14 @@
 """
 Dummy functions for use in unit tests.
 """
-from requests.models import Response
-from requests.exceptions import RequestException
+import os
 import json
 import io
+from contextlib import contextmanager
+import httpx
+from requests.models import Response
+from requests.exceptions import RequestException
+from sandhill.utils import api
 
 def _test_api_get(url=None, params=None, stream=True, headers=None):
     """Test function to simulate successfull API call."""
@@ -51,3 +55,23 @@ def _test_api_get_redirect(url=None, params=None, stream=True, headers=None):
     response.raw = io.BytesIO(b'')
     response.status_code = 300
     return response
+
+async def _test_api_get_json_async(url=None, params=None, stream=True, headers=None):
+    """Test coroutine function to simulate successful API call returning JSON."""
+    return _test_api_get_json(url, params, stream, headers)
+
+async def _test_api_get_fail_async(url=None, params=None, stream=True, headers=None):
+    """Test coroutine function to simulate internal server error API call."""
+    return _test_api_get_fail(url, params, stream, headers)
+
+@contextmanager
+def _test_async_client(handler):
+    """Test context where the shared async HTTP client responds via the handler function."""
+    saved = dict(api._async_client)
+    api._async_client.update(
+        pid=os.getpid(), client=httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+    try:
+        yield api._async_client["client"]
+    finally:
+        api._async_client.update(saved)
@@ -0,0 +1,117 @@
+"""
+Timing of data processors and upstream calls made while handling a request.
+"""
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from urllib.parse import urlparse
+from flask import g, has_request_context
+from sandhill import app
+from sandhill.utils import metrics
+
+# The route data entry being processed, as a tuple of its name and processor
+current_processor = ContextVar("sandhill_current_processor", default=None)
+
+# Characters not allowed in a Server-Timing metric name
+_NON_TOKEN = re.compile(r"[^A-Za-z0-9!#$%&'*+.^_`|~-]")
+
+def record(name, processor, phase, seconds):
+    """
+    Add a timing to the current request; ignored outside of a request. \n
+    Args:
+        name (str): The name of the route data entry \n
+        processor (str|None): The processor of the route data entry \n
+        phase (str): What was timed, e.g. `render`, `when`, `execute`, or `upstream` \n
+        seconds (float): The time taken \n
+    """
+    if has_request_context():
+        g.setdefault("timings", []).append({
+            "name": name, "processor": processor, "phase": phase, "ms": seconds * 1000
+        })
+
+@contextmanager
+def timed(name, processor, phase):
+    """
+    Context manager to time a phase of processing a route data entry. While in the \
+    `execute` phase, the entry is set as the `current_processor`, so upstream calls \
+    are attributed to it. \n
+    ```
+    with timed(entry['name'], entry['processor'], 'execute'):
+        result = action_function(entry)
+    ```
+    Args:
+        name (str): The name of the route data entry \n
+        processor (str|None): The processor of the route data entry \n
+        phase (str): The phase being timed \n
+    """
+    token = current_processor.set((name, processor)) if phase == "execute" else None
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, processor, phase, time.perf_counter() - start)
+        if token is not None:
+            current_processor.reset(token)
+
+def record_upstream(url, seconds, status):
+    """
+    Add the timing of a call to an upstream service, attributed to the current processor, \
+    and record it in the upstream metrics for the host. \n
+    Args:
+        url (str): The URL called \n
+        seconds (float): The time taken \n
+        status (int|str): The response status code, or `error` if no response was returned \n
+    """
+    name, processor = current_processor.get() or (None, None)
+    app.logger.debug(f"API call for '{name}' ({processor}) returned {status} "
+                     f"in {seconds * 1000:.1f}ms: {url}")
+    if name is not None:
+        record(name, processor, "upstream", seconds)
+    host = urlparse(url if isinstance(url, str) else "").hostname
+    metrics.observe("sandhill_upstream_duration_seconds", seconds,
+                    host=host or "unknown", status=status)
+
+def request_timings():
+    """
+    Get the timings recorded for the current request. \n
+    Returns:
+        (list): Dicts with the `name`, `processor`, `phase`, and `ms` of each timing \n
+    """
+    return g.get("timings", []) if has_request_context() else []
+
+def summarize(timings):
+    """
+    Total the timings for each route data entry and phase, in the order first recorded. \n
+    Args:
+        timings (list): The timings, per `request_timings()` \n
+    Returns:
+        (list): Dicts with the `name`, `processor`, `phase`, `ms`, and `count` of each \
+            distinct entry and phase \n
+    """
+    totals = {}
+    for timing in timings:
+        key = (timing["name"], timing["phase"])
+        if key not in totals:
+            totals[key] = {**timing, "ms": 0.0, "count": 0}
+        totals[key]["ms"] += timing["ms"]
+        totals[key]["count"] += 1
+    return list(totals.values())
+
+def server_timing(timings, total_ms=None):
+    """
+    Format timings as a `Server-Timing` header value. \n
+    Args:
+        timings (list): The timings, per `request_timings()` \n
+        total_ms (float|None): The total time to handle the request, if known \n
+    Returns:
+        (str): The header value, e.g. `search.execute;dur=12.3;desc="solr.select"` \n
+    """
+    values = [
+        f"{_NON_TOKEN.sub('_', str(timing['name']))}.{timing['phase']};dur={timing['ms']:.1f}"
+        + (f";desc=\"{timing['processor']}\"" if timing["processor"] else "")
+        for timing in summarize(timings)
+    ]
+    if total_ms is not None:
+        values.append(f"total;dur={total_ms:.1f}")
+    return ", ".join(values)
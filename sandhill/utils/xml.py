@@ -2,57 +2,235 @@
 XML loading and handling functionality.
 '''
 import io
+import os
+import time
+import threading
+from collections import OrderedDict
+from functools import lru_cache
 from lxml import etree
-import requests
+from flask import g, has_request_context
 from requests.exceptions import (
     RequestException,
     ConnectionError as RequestsConnectionError
 )
 from validator_collection import checkers
 from sandhill import app, catch
+from sandhill.utils import metrics
+from sandhill.utils.api import get_session, get_timeout, api_get_async
+from sandhill.utils.generic import getconfig
+
+# Per-process cache of parsed documents, kept across requests when XML_CACHE_TTL is set
+_documents = {"pid": None, "docs": OrderedDict(), "bytes": 0}
+# Guards the per-process cache, and the per-request cache which processor threads share
+_documents_lock = threading.Lock()
+
+@lru_cache(maxsize=int(getconfig('XPATH_CACHE_SIZE', 256)))
+def compile_xpath(query, namespaces=()) -> etree.XPath:
+    '''
+    Compile an XPath query. Compiled queries are cached, so each query is only \
+    compiled once per process for a given set of namespaces. \n
+    Args:
+        query (str): XPath query to compile \n
+        namespaces (tuple): The (prefix, URI) pairs available to the query \n
+    Returns:
+        (lxml.etree.XPath): The compiled query \n
+    Raises:
+        lxml.etree.XPathSyntaxError: If the query is invalid \n
+    '''
+    return etree.XPath(query, namespaces=dict(namespaces))
+
+def document_key(source):
+    '''
+    Get the key a parsed document is cached under. The key for a local file includes \
+    its modification time, so a changed file is parsed again. \n
+    Args:
+        source (str|bytes): The stripped XML source \n
+    Returns:
+        (str|bytes|tuple): The key \n
+    '''
+    if isinstance(source, str) and source[0] != '<' and checkers.is_file(source):
+        return (source, os.stat(source).st_mtime_ns)
+    return source
+
+def _document_caches():
+    '''
+    Get the document caches in use; must be called holding `_documents_lock`. \n
+    Returns:
+        (list): Tuples of a cache and its TTL in seconds (None for no expiry); the \
+            per-request cache when in a request, then the per-process cache if enabled \n
+    '''
+    caches = []
+    if has_request_context():
+        caches.append((g.setdefault("xml_documents", {"docs": OrderedDict(), "bytes": 0}),
+                       None))
+    if ttl := int(getconfig('XML_CACHE_TTL', 0)):
+        if _documents["pid"] != os.getpid():
+            _documents.update({"pid": os.getpid(), "docs": OrderedDict(), "bytes": 0})
+        caches.append((_documents, ttl))
+    return caches
+
+def _cache_get(cache, key, now):
+    '''
+    Get an entry from a document cache, removing it if expired. \n
+    Args:
+        cache (dict): The cache \n
+        key (str|bytes|tuple): The document key \n
+        now (float): The current `time.monotonic()` \n
+    Returns:
+        (tuple|None): The (expires, size, document) entry, or None if not cached \n
+    '''
+    if (entry := cache["docs"].get(key)) is None:
+        return None
+    if entry[0] is not None and entry[0] <= now:
+        del cache["docs"][key]
+        cache["bytes"] -= entry[1]
+        return None
+    cache["docs"].move_to_end(key)
+    return entry
+
+def _cache_put(cache, key, entry, max_bytes):
+    '''
+    Add an entry to a document cache, evicting the least recently used documents \
+    beyond the size limit. \n
+    Args:
+        cache (dict): The cache \n
+        key (str|bytes|tuple): The document key \n
+        entry (tuple): The (expires, size, document) entry \n
+        max_bytes (int): The size limit of the cache \n
+    '''
+    if (old := cache["docs"].pop(key, None)) is not None:
+        cache["bytes"] -= old[1]
+    cache["docs"][key] = entry
+    cache["bytes"] += entry[1]
+    while cache["bytes"] > max_bytes:
+        cache["bytes"] -= cache["docs"].popitem(last=False)[1][1]
+
+def cache_limit():
+    '''
+    Get the size limit of each document cache, per the `XML_CACHE_SIZE_MB` config. \n
+    Returns:
+        (int): The limit in bytes; 0 when caching is disabled \n
+    '''
+    return int(getconfig('XML_CACHE_SIZE_MB', 64)) * 1024 * 1024
+
+def cached_document(key):
+    '''
+    Get a parsed document from the cache of the current request, else from the \
+    per-process cache if `XML_CACHE_TTL` is set. \n
+    Args:
+        key (str|bytes|tuple): The document key, from `document_key()` \n
+    Returns:
+        (lxml.etree._ElementTree|None): The document, or None if not cached \n
+    '''
+    if not (max_bytes := cache_limit()):
+        return None
+    now = time.monotonic()
+    entry = None
+    with _documents_lock:
+        caches = _document_caches()
+        for idx, (cache, _) in enumerate(caches):
+            if (entry := _cache_get(cache, key, now)) is not None:
+                # Keep for the rest of the request, even if it expires meanwhile
+                for earlier, _ in caches[:idx]:
+                    _cache_put(earlier, key, (None,) + entry[1:], max_bytes)
+                break
+    metrics.count("sandhill_cache_requests_total", cache="xml",
+                  result="miss" if entry is None else "hit")
+    return entry[2] if entry else None
+
+def store_document(key, doc, size):
+    '''
+    Cache a parsed document for the current request, and across requests for \
+    `XML_CACHE_TTL` seconds if set. Documents larger than `XML_CACHE_SIZE_MB` are not cached. \n
+    Args:
+        key (str|bytes|tuple): The document key, from `document_key()` \n
+        doc (lxml.etree._ElementTree): The parsed document \n
+        size (int): The size of the XML source, counted against the cache limit \n
+    '''
+    if size > (max_bytes := cache_limit()):
+        return
+    now = time.monotonic()
+    with _documents_lock:
+        for cache, ttl in _document_caches():
+            _cache_put(cache, key, (now + ttl if ttl else None, size, doc), max_bytes)
 
 @catch(etree.XMLSyntaxError, "Invalid XML source: {source} Exc: {exc}", return_val=None)
 @catch(RequestException, "XML API call failed: {source} Exc: {exc}", return_val=None)
 @catch(RequestsConnectionError, "Invalid host in XML call: {source} Exc: {exc}", return_val=None)
 def load(source, timeout=None) -> etree._Element: # pylint: disable=protected-access
     '''
-    Load an XML document. \n
+    Load an XML document. Parsed documents are cached by source for the rest of the \
+    request (see `store_document()`), so callers share them and must not modify them. \n
     Args:
         source: XML source. Either path, url, string, or loaded LXML Element \n
-        timeout: An integer timeout in seconds; defaults to 10 if not set
+        timeout: An integer timeout in seconds; defaults to `get_timeout()` for a URL if not set
     Returns:
         Loaded XML object tree, or None on invalid source or timeout \n
     '''
-    if timeout is None:
-        timeout = 10
     if not isinstance(source, (str, bytes)) or len(source) < 1:
         # pylint: disable=protected-access
         return source if isinstance(source, etree._ElementTree) else None
 
     source = source.strip()
+    key = document_key(source)
+    if (doc := cached_document(key)) is not None:
+        return doc
+    size = len(source)
     if source[0] == ord('<'):           # Handle source as bytes
         source = io.BytesIO(source)
     elif source[0] == '<':              # Handle source as string
         source = io.StringIO(source)
     elif checkers.is_file(source):      # Handle source as local file
-        pass  # etree.parse handles local file paths natively
+        size = os.path.getsize(source)  # etree.parse handles local file paths natively
     elif checkers.is_url(source):       # Handle source as URL
-        response = requests.get(source, timeout=timeout)
+        if timeout is None:
+            timeout = get_timeout(source)
+        response = get_session(source).get(source, timeout=timeout)
         if not response:
             app.logger.warning(f"Failed to retrieve XML URL (or timed out): {source}")
             return None
+        size = len(response.content)
         source = io.BytesIO(response.content)
     else:
         app.logger.warning(f"XML source is not valid file, URL, or XML string. {source[:40]}"
                            + (len(source) > 40) * '...')
         return None
 
-    return etree.parse(source)
+    doc = etree.parse(source)
+    store_document(key, doc, size)
+    return doc
+
+@catch(etree.XMLSyntaxError, "Invalid XML source: {source} Exc: {exc}", return_val=None)
+@catch(RequestException, "XML API call failed: {source} Exc: {exc}", return_val=None)
+@catch(RequestsConnectionError, "Invalid host in XML call: {source} Exc: {exc}", return_val=None)
+async def load_async(source, timeout=None) -> etree._Element: # pylint: disable=protected-access
+    '''
+    Load an XML document, retrieving a URL without blocking; the asynchronous \
+    version of `load()`, sharing its cache. Other sources are loaded as by `load()`. \n
+    Args:
+        source: XML source. Either path, url, string, or loaded LXML Element \n
+        timeout: An integer timeout in seconds; defaults to `get_timeout()` for a URL if not set
+    Returns:
+        Loaded XML object tree, or None on invalid source or timeout \n
+    '''
+    if not isinstance(source, str) or not checkers.is_url(source.strip()):
+        return load(source, timeout)
+    source = source.strip()
+    if (doc := cached_document(source)) is not None:
+        return doc
+    response = await api_get_async(url=source, timeout=timeout)
+    if not response:
+        app.logger.warning(f"Failed to retrieve XML URL (or timed out): {source}")
+        return None
+    doc = etree.parse(io.BytesIO(response.content))
+    store_document(source, doc, len(response.content))
+    return doc
 
-@catch(etree.XPathEvalError, "Invalid XPath query {query} Exc {exc}", return_val=None)
+@catch(etree.XPathError, "Invalid XPath query {query} Exc {exc}", return_val=None)
 def xpath(source, query, timeout=None) -> list:
     '''
-    Retrieve the matching xpath content from an XML source \n
+    Retrieve the matching xpath content from an XML source, using the compiled \
+    query from `compile_xpath()`. \n
     Args:
         query (str): XPath query to match against \n
         source: XML source. Either path, url, or string \n
@@ -60,7 +238,7 @@ def xpath(source, query, timeout=None) -> list:
         Matching results from XPath query, or None on failure \n
     '''
     doc = load(source, timeout)
-    return doc.xpath(query, namespaces=doc.getroot().nsmap) if doc else None
+    return compile_xpath(query, tuple(doc.getroot().nsmap.items()))(doc) if doc else None
 
 def xpath_by_id(source, query) -> dict:
     '''
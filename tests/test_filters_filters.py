@@ -513,6 +513,12 @@ def test_get_descendant():
     assert filters.filter_getdescendant(data, "0.key2.3") == None
     assert filters.filter_getdescendant(data, "0.key2.3", []) == []
 
+def test_get_descendant_many():
+    docs = [{"title": ["a"], "id": 1}, {"id": 2}, {"title": ["c", "d"], "id": 3}]
+    assert filters.filter_getdescendant_many(docs, "title.0") == ["a", None, "c"]
+    assert filters.filter_getdescendant_many(docs, "title.0", "") == ["a", "", "c"]
+    assert filters.filter_getdescendant_many(None, "id") == []
+
 def test_findstartswith():
     data = ["val-a", "val-b", "myteststring"]
     assert filters.findstartswith(data, "val") == "val-a"
@@ -1,10 +1,15 @@
 import os
+import time
+import asyncio
+import httpx
 from collections import OrderedDict
 from flask import request
+from jinja2 import TemplateError
 from pytest import raises
 from werkzeug.exceptions import HTTPException
 from sandhill.processors import base
 from sandhill import app
+from sandhill.utils.test import _test_async_client
 from sandhill.utils.context import list_custom_context_processors
 from sandhill.bootstrap import request as bootstrap_request
 
@@ -123,7 +128,7 @@ def test_load_route_data():
             loaded = base.load_route_data(route_data)
         assert 500 == http_error.type.code
 
-    # Test invalid char in request, causing a JSON decode failure
+    # Test invalid char in request, causing a JSON decode failure with legacy rendering
     route_data = [
          OrderedDict({
             "processor": "template.render_string",
@@ -131,11 +136,19 @@ def test_load_route_data():
             "value": "{{ view_args.namespace }}",
         })
     ]
+    app.config['LEGACY_JSON_RENDERING'] = 1
     with app.test_request_context('/dummy1'):
         request.view_args = { 'namespace': "a\\.aspx" }
         with raises(HTTPException) as http_error:
-            loaded = base.load_route_data(route_data)
+            loaded = base.load_route_data(list(route_data))
         assert 400 == http_error.type.code
+    app.config['LEGACY_JSON_RENDERING'] = 0
+
+    # Test the same invalid char renders without failure
+    with app.test_request_context('/dummy1'):
+        request.view_args = { 'namespace': "a\\.aspx" }
+        loaded = base.load_route_data(route_data)
+        assert loaded['string'] == "a\\.aspx"
 
     # Called processor triggers an HTTPException
     route_data = [
@@ -179,8 +192,13 @@ def test_eval_when():
         route_data['when'] = "{{ 1 == 0 }}"
         assert base.eval_when(route_data, loaded_data) is False
 
+        # The route data is not modified, so the clause is evaluated again
         route_data['when'] = "{{ 1 == 0 }}"
         assert base.eval_when(route_data, loaded_data) is False
+        assert route_data['when'] == "{{ 1 == 0 }}"
+
+        route_data['when'] = "{{ mylist[1:] }}"
+        assert base.eval_when(route_data, {"mylist": [1, 2]}) == [2]
 
         route_data['when'] = "{{ mylist[0] == 1 }}"
         with raises(HTTPException) as http_error:
@@ -196,3 +214,183 @@ def test_eval_when():
         with raises(HTTPException) as http_error:
             base.eval_when(route_data, loaded_data)
         assert 500 == http_error.type.code
+
+def test_processor_dependencies():
+    route_data = [
+        {"name": "record", "processor": "solr.select_record", "params": {"q": "id:1"}},
+        {"name": "api", "processor": "request.api_json", "url": "https://example.edu/1"},
+        {"name": "mods", "processor": "xml.load", "source": "{{ record.mods_url }}"},
+        {"name": "api", "processor": "request.api_json", "url": "https://example.edu/2"},
+        {"name": "post", "processor": "request.api_json", "url": "https://example.edu/3",
+         "method": "POST"},
+        {"name": "conf", "processor": "file.load_json", "paths": ["config/a.json"],
+         "when": "{{ view_args.id == 1 }}"},
+        {"name": "conf2", "processor": "file.load_json", "paths": ["config/b.json"],
+         "when": "{{ conf is none }}"},
+        {"name": "image", "processor": "iiif.load_image", "identifier": "{% bad syntax"},
+        {"name": "conf3", "processor": "file.load_json", "paths": ["{{ bad syntax"]},
+        {"name": "page", "processor": "template.render", "file": "page.html.j2"},
+        {"name": "after", "processor": "xml.load", "source": "page"},
+    ]
+    with app.test_request_context('/etd/1000'):
+        needs = base.processor_dependencies(route_data)
+        assert needs == (-1, -1, 0, 1, 3, 4, 5, 6, 7, 8, 9)
+        # Prepared route data keeps the analysis, rebased for slices
+        prepared = base.prepare_route_data(route_data)
+        assert prepared["needs"] == needs
+        assert base.slice_prepared(prepared, 0, 4)["needs"] == needs[:4]
+        assert base.slice_prepared(prepared, 4)["needs"] == (-1, 0, 1, 2, 3, 4, 5)
+        assert base.slice_prepared(prepared, 4)["needs"] == \
+            base.processor_dependencies(route_data[4:])
+
+        # Route data which is not JSON serializable is analyzed
+        route_data = [
+            {"name": "a", "processor": "xml.load", "source": "a", "extra": {1, 2}},
+            {"name": "b", "processor": "xml.load", "source": "b"},
+        ]
+        assert base.processor_dependencies(route_data) == (-1, -1)
+
+def test_prepare_route_data():
+    route_data = [
+        {"name": "conf", "processor": "file.load_json", "paths": ["config/search/main.json"]},
+        {"name": "string", "processor": "template.render_string",
+         "value": "{{ conf is defined }}", "when": "{{ view_args.id == 1000 }}"},
+        {"name": "bad", "processor": "template.render_string", "value": "{{ bad syntax"},
+    ]
+    prepared = base.prepare_route_data(route_data)
+    assert prepared["skeletons"][0] is None
+    assert prepared["skeletons"][1]["value"][1] is not None
+    assert "when" not in prepared["skeletons"][1]
+    assert prepared["skeletons"][2] is base._UNCOMPILED
+
+    assert base.slice_prepared(None, 1) is None
+    assert base.slice_prepared(prepared, 1)["skeletons"] == prepared["skeletons"][1:]
+    assert base.slice_prepared(prepared, 0, 1)["skeletons"] == prepared["skeletons"][:1]
+
+    with app.test_request_context('/etd/1000'):
+        request.view_args = {"id": 1000}
+        loaded = base.load_route_data(route_data[:2], prepared=base.slice_prepared(prepared, 0, 2))
+        assert loaded["string"] == "True"
+
+        # Entries are rendered using their prepared skeleton
+        changed = [dict(route_data[0]), dict(route_data[1], value="unused")]
+        loaded = base.load_route_data(changed, prepared=base.slice_prepared(prepared, 0, 2))
+        assert loaded["string"] == "True"
+
+        # Invalid templates still fail when rendered
+        with raises(TemplateError):
+            base.load_route_data(route_data, prepared=prepared)
+
+def test_load_route_data_parallel():
+    route_data = [
+        OrderedDict({
+            "processor": "file.load_json",
+            "name": "missing",
+            "paths": ["config/search/does_not_exist.json"],
+            "on_fail": 404
+        }),
+        OrderedDict({
+            "processor": "file.load_json",
+            "name": "search_conf",
+            "paths": ["config/search/main.json"],
+        }),
+        OrderedDict({
+            "processor": "template.render_string",
+            "name": "string",
+            "value": "{{ search_conf is defined }}",
+        })
+    ]
+
+    # The first entry's on_fail applies, even if later entries have already run
+    with app.test_request_context('/etd/1000'):
+        with raises(HTTPException) as http_error:
+            base.load_route_data([OrderedDict(entry) for entry in route_data])
+        assert 404 == http_error.type.code
+
+    # Same results whether run in parallel or sequentially
+    del route_data[0]['on_fail']
+    results = []
+    for parallel in [True, False]:
+        with app.test_request_context('/etd/1000'):
+            loaded = base.load_route_data(
+                [OrderedDict(entry) for entry in route_data], parallel=parallel
+            )
+            assert loaded['search_conf']
+            assert loaded['string'] == "True"
+            results.append(loaded)
+    assert results[0] == results[1]
+
+    # A response stops processing of later entries
+    route_data = [
+        OrderedDict({"processor": "request.redirect", "name": "redirect", "location": "/"}),
+        OrderedDict({"processor": "template.render_string", "name": "string", "value": "a"}),
+    ]
+    with app.test_request_context('/etd/1000'):
+        loaded = base.load_route_data(route_data)
+        assert loaded.status_code == 302
+
+    # Thread pool may be disabled
+    assert base.get_processor_pool() is base.get_processor_pool()
+    app.config['PROCESSOR_THREADS'] = 0
+    assert base.get_processor_pool() is None
+    app.config['PROCESSOR_THREADS'] = 4
+
+def test_load_route_data_async():
+    async def handler(request):
+        await asyncio.sleep(0.2)
+        if request.url.path == "/missing":
+            return httpx.Response(404, json={})
+        return httpx.Response(200, json={"path": request.url.path})
+
+    route_data = [
+        OrderedDict({"processor": "file.load_json", "name": "search_conf",
+                     "paths": ["config/search/main.json"]}),
+        OrderedDict({"processor": "request.api_json_async", "name": "one",
+                     "url": "https://example.edu/one"}),
+        OrderedDict({"processor": "request.api_json_async", "name": "two",
+                     "url": "https://example.edu/two"}),
+        OrderedDict({"processor": "request.api_json_async", "name": "skipped",
+                     "url": "https://example.edu/skipped", "when": "False"}),
+        OrderedDict({"processor": "xml.load_async", "name": "xml",
+                     "source": "<main>{{ one.path }}</main>"}),
+    ]
+    app.config['PROCESSOR_THREADS'] = 0
+    try:
+        with app.test_request_context('/etd/1000'), _test_async_client(handler):
+            # Independent calls overlap, without using the thread pool
+            start = time.monotonic()
+            loaded = base.load_route_data([OrderedDict(entry) for entry in route_data])
+            assert time.monotonic() - start < 0.35
+            assert loaded['one'] == {"path": "/one"} and loaded['two'] == {"path": "/two"}
+            assert 'skipped' not in loaded and loaded['search_conf']
+            assert loaded['xml'].getroot().text == "/one"
+
+            # Same results when run sequentially
+            sequential = base.load_route_data(
+                [OrderedDict(entry) for entry in route_data], parallel=False
+            )
+            assert sequential['one'] == loaded['one'] and sequential['two'] == loaded['two']
+
+            # on_fail is applied for async processors
+            route_data[2]['url'] = "https://example.edu/missing"
+            route_data[2]['on_fail'] = 0
+            with raises(HTTPException) as http_error:
+                base.load_route_data([OrderedDict(entry) for entry in route_data])
+            assert http_error.type.code == 404
+
+            # Errors rendering an entry are raised in order
+            route_data[2] = OrderedDict({"processor": "request.api_json_async", "name": "two",
+                                         "url": "https://example.edu/two", "when": "{{ 1 + }}"})
+            with raises(HTTPException) as http_error:
+                base.load_route_data([OrderedDict(entry) for entry in route_data])
+            assert http_error.type.code == 500
+    finally:
+        app.config['PROCESSOR_THREADS'] = 4
+
+    assert base.is_async_entry({"processor": "solr.select_async"})
+    assert not base.is_async_entry({"processor": "solr.select"})
+    assert not base.is_async_entry({"processor": "solr"})
+    assert base.processor_dependencies([
+        {"processor": "request.api_json_async", "name": "a", "url": "x", "method": "POST"},
+        {"processor": "request.api_json_async", "name": "b", "url": "y"},
+    ]) == (-1, 0)
@@ -1,9 +1,11 @@
+from sandhill import app
 from sandhill.processors import iiif
 from requests.models import Response as RequestsResponse
 from pytest import raises
 from werkzeug.exceptions import HTTPException
 from requests.exceptions import RequestException
-from sandhill.utils.test import _test_api_get, _test_api_get_fail, _test_api_get_unavailable
+from sandhill.utils import iiif as iiif_utils
+from sandhill.utils.test import _test_api_get, _test_api_get_fail, _test_api_get_unavailable, _test_api_get_json
 
 
 def test_load_image():
@@ -45,3 +47,45 @@ def test_load_image():
     with raises(HTTPException) as http_error:
         response = iiif.load_image(data, url="https://example.edu/iiif", api_get_function=_test_api_get)
     assert http_error.type.code == 500
+
+def test_load_image_headers():
+    data = {
+        'view_args': {'iiif_path': 'full/full/0/default.jpg'},
+        'identifier': 'pid'
+    }
+    calls = []
+    def capture_api_get(url=None, params=None, stream=True, headers=None):
+        calls.append(headers)
+        return _test_api_get(url, params, stream, headers)
+
+    # Conditional and range headers are passed to the IIIF server
+    headers = {'If-None-Match': '"abc"', 'Range': 'bytes=0-100', 'Cookie': 'a=b'}
+    with app.test_request_context('/iiif/pid/full/full/0/default.jpg', headers=headers):
+        iiif.load_image(data, url="https://example.edu/iiif", api_get_function=capture_api_get)
+    assert calls[-1] == {'If-None-Match': '"abc"', 'Range': 'bytes=0-100'}
+
+    # Not modified is a valid response
+    def not_modified_api_get(url=None, params=None, stream=True, headers=None):
+        response = RequestsResponse()
+        response.status_code = 304
+        return response
+    response = iiif.load_image(data, url="https://example.edu/iiif",
+                               api_get_function=not_modified_api_get)
+    assert response.status_code == 304
+
+def test_load_image_cached():
+    data = {
+        'view_args': {'iiif_path': 'full/full/0/default.jpg'},
+        'identifier': 'cached_pid'
+    }
+    iiif_utils.tile_cache().clear()
+    app.config['IIIF_TILE_CACHE'] = 1
+    with app.test_request_context('/iiif/cached_pid/full/full/0/default.jpg'):
+        image = iiif.load_image(data, url="https://example.edu/iiif", api_get_function=_test_api_get_json)
+        assert image.content == b'{"test":["test"]}'
+        image.close()
+        image = iiif.load_image(data, url="https://example.edu/iiif", api_get_function=_test_api_get_fail)
+        assert image.content == b'{"test":["test"]}'
+        image.close()
+    app.config['IIIF_TILE_CACHE'] = 0
+    iiif_utils.tile_cache().clear()
@@ -1,5 +1,9 @@
+import contextvars
+import httpx
 from sandhill import app
 import flask
+from sandhill.utils.aio import run_coroutine
+from sandhill.utils.test import _test_async_client
 from sandhill.processors import request
 from pytest import raises
 from werkzeug.exceptions import HTTPException
@@ -65,3 +69,30 @@ def test_redirect():
     with raises(HTTPException) as http_error:
         result = request.redirect({})
     assert http_error.type.code == 500
+
+def test_api_json_async():
+    def handler(request):
+        if request.url.path == "/down":
+            raise httpx.ConnectError("Connection refused", request=request)
+        if request.url.path == "/text":
+            return httpx.Response(200, text="Not JSON")
+        status = 404 if request.url.path == "/missing" else 200
+        return httpx.Response(status, json={"method": request.method})
+
+    with app.test_request_context('/'), _test_async_client(handler):
+        ctx = contextvars.copy_context
+        data = {'url': 'https://example.edu/todos', 'method': 'POST'}
+        assert run_coroutine(request.api_json_async(data), ctx()).result(5) == {"method": "POST"}
+
+        data = {'url': 'https://example.edu/missing', 'on_fail': 0}
+        with raises(HTTPException) as http_error:
+            run_coroutine(request.api_json_async(data), ctx()).result(5)
+        assert http_error.type.code == 404
+
+        data = {'url': 'https://example.edu/text'}
+        assert run_coroutine(request.api_json_async(data), ctx()).result(5) == {}
+
+        data = {'url': 'https://example.edu/down'}
+        with raises(HTTPException) as http_error:
+            run_coroutine(request.api_json_async(data), ctx()).result(5)
+        assert http_error.type.code == 503
@@ -1,11 +1,19 @@
 import os
+import json
+import threading
+import contextvars
+from unittest.mock import patch
 from pytest import raises
 from werkzeug.exceptions import HTTPException
 from sandhill.processors import solr
+from sandhill.utils.template import render_template_json
 from flask import Response as FlaskResponse
 from requests.exceptions import RequestException
+from requests.models import Response as RequestsResponse
 from sandhill.utils.test import _test_api_get, _test_api_get_fail, _test_api_get_unavailable, _test_api_get_json, _test_api_get_json_error, _test_api_get_json_params
 from sandhill import app
+from sandhill.utils.aio import run_coroutine
+from sandhill.utils.test import _test_api_get_json_async, _test_api_get_fail_async
 
 def test_select():
     if 'SOLR_URL' in app.config:
@@ -177,3 +185,280 @@ def test_search():
         data['view_args']['format'] = None
         assert response.json['q'] == "MyTestString"
     del data['config_ext']
+
+def test_cached_select():
+    calls = []
+    def counting_api_get(url=None, params=None, stream=True, headers=None):
+        calls.append(params)
+        return _test_api_get_json(url, params)
+
+    data = {
+        'params': {'q': '*', 'fq': ['a:1', 'b:2', 'a:1'], 'rows': 10},
+        'cache_ttl': 300
+    }
+    solr._select_cache["memory"] = None
+    before = solr.select_cache_info()
+    with app.app_context():
+        response = solr.select(data, url="https://test.example.edu", api_get_function=counting_api_get)
+        assert response == {"test": ["test"]}
+        assert len(calls) == 1
+
+        # Same query with params in a different order is a cache hit
+        data['params'] = {'rows': '10', 'fq': ['b:2', 'a:1'], 'q': '*'}
+        response = solr.select(data, url="https://test.example.edu", api_get_function=counting_api_get)
+        assert response == {"test": ["test"]}
+        assert len(calls) == 1
+
+        # Without cache_ttl, Solr is always called
+        del data['cache_ttl']
+        solr.select(data, url="https://test.example.edu", api_get_function=counting_api_get)
+        assert len(calls) == 2
+
+        # Failed responses are not cached
+        data['cache_ttl'] = 300
+        data['params'] = {'q': 'fail'}
+        assert solr.select(data, url="https://test.example.edu", api_get_function=_test_api_get_json_error) is None
+        solr.select(data, url="https://test.example.edu", api_get_function=counting_api_get)
+        assert len(calls) == 3
+
+        # Expired responses are served stale while refreshed in the background
+        key = solr.select_cache_key("https://test.example.edu/select", data['params'])
+        cached = solr._select_memory_cache().get(key)
+        cached['expires'] = 0
+        data['cache_stale'] = 60
+        response = solr.select(data, url="https://test.example.edu", api_get_function=counting_api_get)
+        assert response == {"test": ["test"]}
+        for thread in threading.enumerate():
+            if thread is not threading.current_thread() and thread.daemon \
+                    and thread.name != "sandhill-event-loop":
+                thread.join(timeout=5)
+        assert len(calls) == 4
+        assert solr._select_memory_cache().get(key)['expires'] > 0
+
+        # Only one refresh at a time per key; failed refreshes leave the cache as is
+        solr._select_refreshing.add(key)
+        solr._select_cache_refresh(key, "https://test.example.edu", {}, (1, 1), counting_api_get)
+        solr._select_refreshing.discard(key)
+        solr._select_cache_refresh(key, "https://test.example.edu", {}, (1, 1),
+                                   _test_api_get_unavailable)
+        for thread in threading.enumerate():
+            if thread is not threading.current_thread() and thread.daemon \
+                    and thread.name != "sandhill-event-loop":
+                thread.join(timeout=5)
+        assert len(calls) == 4
+        assert key not in solr._select_refreshing
+
+        # Disk backend
+        app.config['SOLR_CACHE_BACKEND'] = 'disk'
+        data['params'] = {'q': 'disk', 'uncached': str(os.getpid()) + str(len(calls))}
+        solr.select(data, url="https://test.example.edu", api_get_function=counting_api_get)
+        solr.select(data, url="https://test.example.edu", api_get_function=counting_api_get)
+        assert len(calls) == 5
+        app.config['SOLR_CACHE_BACKEND'] = 'memory'
+
+    info = solr.select_cache_info()
+    assert info['hits'] - before['hits'] == 2
+    assert info['misses'] - before['misses'] == 4
+    assert info['stale'] - before['stale'] == 1
+    assert info['refreshes'] - before['refreshes'] == 1
+    assert info['memory']['size'] == 2
+
+def test_select_cache_key():
+    key = solr.select_cache_key("https://solr/select", {'q': '*', 'fq': ['a', 'b']})
+    assert key == solr.select_cache_key("https://solr/select", {'fq': ['b', 'a', 'a'], 'q': '*'})
+    assert key != solr.select_cache_key("https://solr/select", {'q': '*', 'fq': ['a']})
+    assert key != solr.select_cache_key("https://solr2/select", {'q': '*', 'fq': ['a', 'b']})
+    # Order of other multi-valued params is kept
+    assert solr.select_cache_key("https://solr/select", {'sort': ['a', 'b']}) != \
+        solr.select_cache_key("https://solr/select", {'sort': ['b', 'a']})
+
+def _export_api_get(records, fail_after=None):
+    '''
+    Create a fake Solr API call paging through the records with a cursor mark
+    '''
+    calls = []
+    def api_get(url=None, params=None, stream=True, headers=None):
+        calls.append(params)
+        if fail_after is not None and len(calls) > fail_after:
+            raise RequestException()
+        start = 0 if params['cursorMark'] == '*' else int(params['cursorMark'])
+        docs = records[start:start + params['rows']]
+        next_cursor = str(start + len(docs)) if docs else params['cursorMark']
+        response = RequestsResponse()
+        response._content = json.dumps({
+            "response": {"numFound": len(records), "docs": docs},
+            "nextCursorMark": next_cursor
+        }).encode()
+        response.status_code = 200
+        return response
+    return api_get, calls
+
+def test_export():
+    records = [{"id": f"rec{idx}", "title": f"Title {idx}", "subject": ["a", "b"]}
+               for idx in range(25)]
+    data = {'params': {'q': '*:*', 'start': 10, 'rows': 5}, 'page_size': 10}
+    with app.test_request_context('/export'):
+        api_get, calls = _export_api_get(records)
+        response = solr.export(data, url="https://test.example.edu", api_get_function=api_get)
+        # The first page is loaded before streaming
+        assert len(calls) == 1
+        assert response.mimetype == 'text/csv' and response.is_streamed
+        lines = response.get_data(True).splitlines()
+        assert lines[0] == 'id,title,subject'
+        assert lines[1] == 'rec0,Title 0,a|b'
+        assert len(lines) == 26
+        assert [call['rows'] for call in calls] == [10, 10, 10, 10]
+        assert calls[0]['sort'] == 'id asc' and 'start' not in calls[0]
+        assert calls[1]['cursorMark'] == '10'
+
+        # JSON Lines limited by max_records, with fields from fl
+        data.update({'format': 'jsonl', 'max_records': 12, 'filename': 'export.jsonl'})
+        api_get, calls = _export_api_get(records)
+        response = solr.export(data, url="https://test.example.edu", api_get_function=api_get)
+        assert response.mimetype == 'application/x-ndjson'
+        assert 'export.jsonl' in response.headers['Content-Disposition']
+        lines = response.get_data(True).splitlines()
+        assert len(lines) == 12 and json.loads(lines[11])['id'] == 'rec11'
+        assert [call['rows'] for call in calls] == [10, 2]
+
+        # XML, with a failure after the first page
+        data.update({'format': 'xml', 'max_records': 0})
+        api_get, calls = _export_api_get(records, fail_after=1)
+        response = solr.export(data, url="https://test.example.edu", api_get_function=api_get)
+        body = response.get_data(True)
+        assert body.count('<doc>') == 10
+        assert '<field name="subject">b</field>' in body
+        assert body.endswith('</docs>\n')
+
+        # Error status from Solr after the first page
+        api_get, calls = _export_api_get(records)
+        failing = lambda **kwargs: _test_api_get_fail() if calls else api_get(**kwargs)
+        response = solr.export(data, url="https://test.example.edu", api_get_function=failing)
+        assert response.get_data(True).count('<doc>') == 10
+
+        # CSV using the fl parameter
+        data.update({'format': 'csv', 'params': {'q': '*', 'fl': 'id, title score'}})
+        api_get, calls = _export_api_get(records[:3])
+        response = solr.export(data, url="https://test.example.edu", api_get_function=api_get)
+        assert response.get_data(True).splitlines()[0] == 'id,title,score'
+
+        # Invalid format
+        data['format'] = 'py'
+        assert solr.export(data, url="https://test.example.edu", api_get_function=api_get) is None
+
+        # Failed query
+        data['format'] = 'csv'
+        assert solr.export(data, url="https://test.example.edu",
+                           api_get_function=_test_api_get_fail) is None
+        data['on_fail'] = 0
+        with raises(HTTPException) as http_exc:
+            solr.export(data, url="https://test.example.edu", api_get_function=_test_api_get_fail)
+        assert http_exc.value.code == 503
+
+def test_export_params():
+    params = solr.export_params({'q': '*', 'rows': 10, 'start': 20}, 'id')
+    assert params == {'q': '*', 'wt': 'json', 'sort': 'id asc'}
+    params = solr.export_params({'q': '*', 'sort': 'title asc'}, 'id')
+    assert params['sort'] == 'title asc,id asc'
+    params = solr.export_params({'q': '*', 'sort': 'date desc, id desc'}, 'id')
+    assert params['sort'] == 'date desc, id desc'
+
+def test_select_records():
+    calls = []
+    def terms_api_get(url=None, params=None, stream=True, headers=None):
+        calls.append(params)
+        local_params, ids = params['q'].split('}', 1)
+        separator = local_params.split("separator='")[1][0] if 'separator' in local_params else ','
+        response = RequestsResponse()
+        response._content = json.dumps({"response": {"docs": [
+            {"id": ident, "fl": params.get('fl')} for ident in reversed(ids.split(separator))
+            if ident != 'missing'
+        ]}}).encode()
+        response.status_code = 200
+        return response
+
+    data = {'ids': ['b', 'a', 'missing', 'c', 'a'], 'params': {'fl': 'id', 'q': '*', 'rows': 1}}
+    with app.app_context():
+        records = solr.select_records(data, url="https://test.example.edu",
+                                      api_get_function=terms_api_get)
+        assert list(records) == ['b', 'a', 'missing', 'c']
+        assert records['a'] == {"id": "a", "fl": "id"}
+        assert records['missing'] is None
+        assert len(calls) == 1
+        assert calls[0]['q'] == '{!terms f=id}b,a,missing,c' and calls[0]['rows'] == 4
+
+        # Ids as a string, containing a comma
+        calls.clear()
+        data['ids'] = 'x, y'
+        assert list(solr.select_records(data, url="https://test.example.edu",
+                                        api_get_function=terms_api_get)) == ['x', 'y']
+        data['ids'] = ['a,1', 'b']
+        records = solr.select_records(data, url="https://test.example.edu",
+                                      api_get_function=terms_api_get)
+        assert records == {'a,1': {"id": "a,1", "fl": "id"}, 'b': {"id": "b", "fl": "id"}}
+        assert calls[-1]['q'] == "{!terms f=id separator='|'}a,1|b"
+
+        # Ids rendered from a template, as a list
+        entry = render_template_json({**data, 'ids': "{{ parent.children }}"},
+                                     {'parent': {'children': ['a:1', 'b,2']}})
+        assert entry['ids'] == "['a:1', 'b,2']"
+        records = solr.select_records(entry, url="https://test.example.edu",
+                                      api_get_function=terms_api_get)
+        assert records == {'a:1': {"id": "a:1", "fl": "id"}, 'b,2': {"id": "b,2", "fl": "id"}}
+        entry = render_template_json({**data, 'ids': "{{ parent.children | join(',') }}"},
+                                     {'parent': {'children': ['a:1', 'b:2']}})
+        assert list(solr.select_records(entry, url="https://test.example.edu",
+                                        api_get_function=terms_api_get)) == ['a:1', 'b:2']
+        assert solr.record_ids(' ["a", "b"] ') == ['a', 'b']
+        assert solr.record_ids("[a, b") == ["[a", " b"]
+        assert solr.record_ids("[1]") == [1]
+        assert solr.record_ids("['a']x") == ["['a']x"]
+
+        # Split over multiple calls to keep within the maximum URL length
+        calls.clear()
+        data['ids'] = [f"record:{idx:04}" for idx in range(100)]
+        app.config['SOLR_MAX_URL_LENGTH'] = 500
+        try:
+            records = solr.select_records(data, url="https://test.example.edu",
+                                          api_get_function=terms_api_get)
+        finally:
+            app.config['SOLR_MAX_URL_LENGTH'] = 4000
+        assert len(calls) > 1
+        assert list(records) == data['ids'] and all(records.values())
+
+        # No ids
+        data['ids'] = []
+        assert solr.select_records(data, api_get_function=terms_api_get) == {}
+
+        # Failures
+        data['ids'] = ['a']
+        assert solr.select_records(data, url="https://test.example.edu",
+                                   api_get_function=_test_api_get_fail) is None
+        data['ids'] = ['a,|; b']
+        assert solr.select_records(data, url="https://test.example.edu",
+                                   api_get_function=terms_api_get) is None
+
+def test_select_async():
+    data = {'params': {"q": "*", "rows": "20"}}
+    with app.test_request_context('/'):
+        response = run_coroutine(solr.select_async(
+            data, url="https://test.example.edu", api_get_function=_test_api_get_json_async
+        )).result(timeout=5)
+        assert response == {"test": ["test"]}
+
+        # Failures abort as with select()
+        data['on_fail'] = 0
+        with raises(HTTPException) as http_error:
+            run_coroutine(solr.select_async(
+                data, url="https://test.example.edu", api_get_function=_test_api_get_fail_async
+            )).result(timeout=5)
+        assert http_error.type.code == 500
+
+        # Cached calls are made via select()
+        solr._select_cache["memory"] = None
+        data = {'params': {"q": "*"}, 'cache_ttl': 60}
+        with patch.object(solr, 'select', return_value={"cached": True}) as select:
+            response = run_coroutine(solr.select_async(data, url="https://test.example.edu"),
+                                     contextvars.copy_context()).result(timeout=5)
+        assert response == {"cached": True}
+        select.assert_called_once_with(data, "https://test.example.edu")
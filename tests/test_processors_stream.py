@@ -2,7 +2,9 @@
 Test the stream processor
 '''
 import io
+import os
 import tempfile
+from unittest.mock import patch
 
 from flask import Response as FlaskResponse
 from werkzeug.exceptions import HTTPException
@@ -74,6 +76,61 @@ def test_stream():
             resp = stream.response(data)
         assert http_exc.type.code == 500
 
+def test_stream_conditional():
+    '''
+    Tests streaming not modified responses and passing caching headers
+    '''
+    test_resp = RequestsResponse()
+    test_resp.raw = io.BytesIO(b"image data")
+    test_resp.status_code = 304
+    test_resp.headers['ETag'] = '"abc"'
+    test_resp.headers['Cache-Control'] = 'max-age=3600'
+    test_resp.headers['Last-Modified'] = 'Wed, 21 Oct 2015 07:28:00 GMT'
+    data = {"image": test_resp, "response": "image"}
+
+    with app.test_request_context('/home'):
+        resp = stream.response(data)
+        assert resp.status_code == 304
+        assert not resp.get_data()
+        assert resp.headers['ETag'] == '"abc"'
+        assert resp.headers['Cache-Control'] == 'max-age=3600'
+        assert resp.headers['Last-Modified'] == 'Wed, 21 Oct 2015 07:28:00 GMT'
+        assert test_resp.raw.closed
+
+        # Upstream response is closed once streamed
+        test_resp.raw = io.BytesIO(b"image data")
+        test_resp.status_code = 200
+        with patch.object(test_resp, 'close') as close:
+            resp = stream.response(data)
+            assert resp.get_data() == b"image data"
+            close.assert_not_called()
+            resp.close()
+            close.assert_called_once()
+
+def test_stream_local_file():
+    '''
+    Tests sending responses read from local files
+    '''
+    with tempfile.NamedTemporaryFile(suffix=".jpg") as tmp:
+        tmp.write(b"image data")
+        tmp.flush()
+        test_resp = RequestsResponse()
+        test_resp.raw = open(tmp.name, 'rb')
+        test_resp.status_code = 200
+        test_resp.headers['Content-Type'] = 'image/jpeg'
+        test_resp.headers['Cache-Control'] = 'max-age=3600'
+        data = {"image": test_resp, "response": "image"}
+
+        with app.test_request_context('/home'):
+            resp = stream.response(data)
+            assert resp.direct_passthrough
+            assert resp.headers['Content-Length'] == "10"
+            assert resp.headers['Cache-Control'] == 'max-age=3600'
+            assert resp.mimetype == 'image/jpeg'
+            assert resp.get_etag()[0]
+            assert test_resp.raw.closed
+            resp.close()
+
 def test_string():
     '''
     Testing the string function
@@ -136,3 +193,56 @@ def test_serve_file():
         response = stream.serve_file(data)
         assert isinstance(response, FlaskResponse)
         response.close()
+
+def test_serve_file_sendfile():
+    '''
+    Tests the serve_file function offloading to the web server and range requests
+    '''
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'sub', 'test.txt')
+        os.mkdir(os.path.dirname(path))
+        with open(path, 'wb') as test_file:
+            test_file.write(b'text for test file')
+        data = {"file_to_serve": path, "mimetype": "text/plain"}
+
+        # Range requests are handled when sent by Sandhill
+        with app.test_request_context('/home', headers={'Range': 'bytes=0-3'}):
+            response = stream.serve_file(data)
+            assert response.status_code == 206
+            assert response.headers['Content-Range'] == 'bytes 0-3/18'
+            assert response.headers['ETag']
+            response.close()
+
+        path_map = {tmpdir: '/files', os.path.join(tmpdir, 'sub'): '/protected/'}
+        with patch.dict(app.config, {"SENDFILE_MODE": "x-accel", "SENDFILE_PATH_MAP": path_map}), \
+                app.test_request_context('/home'):
+            response = stream.serve_file(data)
+            assert response.headers['X-Accel-Redirect'] == '/protected/test.txt'
+            assert 'attachment' in response.headers['Content-Disposition']
+            assert response.headers['Content-Type'].startswith('text/plain')
+            assert 'Content-Length' not in response.headers
+            assert response.get_data() == b''
+
+        # Files outside of the mapped paths are sent by Sandhill
+        with patch.dict(app.config, {"SENDFILE_MODE": "x-accel", "SENDFILE_PATH_MAP": {}}), \
+                app.test_request_context('/home'):
+            response = stream.serve_file(data)
+            assert 'X-Accel-Redirect' not in response.headers
+            response.close()
+
+        with patch.dict(app.config, {"SENDFILE_MODE": "x-sendfile", "SENDFILE_PATH_MAP": {}}), \
+                app.test_request_context('/home'):
+            response = stream.serve_file(data)
+            assert response.headers['X-Sendfile'] == os.path.realpath(path)
+
+def test_sendfile_path():
+    '''
+    Tests the sendfile_path function
+    '''
+    path_map = {"/data": "/internal", "/data/files/": "/files", "/dat": "/wrong"}
+    with patch.dict(app.config, {"SENDFILE_PATH_MAP": path_map}):
+        assert stream.sendfile_path("/data/files/a.pdf", "x-accel") == "/files/a.pdf"
+        assert stream.sendfile_path("/data/other/a.pdf", "x-accel") == "/internal/other/a.pdf"
+        assert stream.sendfile_path("/database/a.pdf", "x-accel") is None
+        assert stream.sendfile_path("/database/a.pdf", "x-sendfile") == "/database/a.pdf"
+        assert stream.sendfile_path("/data/files/a.pdf", "wsgi") is None
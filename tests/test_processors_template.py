@@ -6,7 +6,7 @@ from werkzeug.exceptions import HTTPException
 from requests.models import Response as RequestsResponse
 from pytest import raises
 from sandhill import app
-from sandhill.processors import template
+from sandhill.processors import template, base
 
 def test_render():
     '''
@@ -74,3 +74,51 @@ def test_render_string():
         del data_dict['value']
         evaluation = template.render_string(data_dict)
         assert evaluation is None
+
+def test_render_stream():
+    '''
+    Tests the render function with streaming enabled
+    '''
+    data_dict = {
+        "file": "stream.html.j2",
+        "items": list(range(20)),
+        "divisor": 1,
+        "stream": True,
+        "stream_buffer": 4,
+    }
+    with app.test_request_context('/home'):
+        expected = template.render({**data_dict, "stream": False}).get_data(True)
+        resp = template.render(data_dict)
+        assert isinstance(resp, FlaskResponse)
+        assert resp.is_streamed and resp.status_code == 200
+        chunks = list(resp.response)
+        assert len(chunks) > 1
+        assert ''.join(chunks) == expected
+
+        # Errors after streaming has begun end the output with a marker
+        data_dict["divisor"] = 0
+        body = ''.join(template.render(data_dict).response)
+        assert body.startswith('<p>Start</p>')
+        assert '<li>19</li>' in body
+        assert body.endswith(app.config['TEMPLATE_STREAM_ERROR'])
+
+        # Errors before the first chunk is sent are raised, as without streaming
+        data_dict["stream_buffer"] = 100
+        with raises(ZeroDivisionError):
+            template.render({**data_dict, "stream": False})
+        with raises(ZeroDivisionError):
+            template.render(data_dict)
+        with raises(HTTPException) as http_exc:
+            template.render({**data_dict, "file": "stream_error.html.j2"})
+        assert http_exc.type.code == 500
+        with raises(HTTPException) as http_exc:
+            base.load_route_data([{"name": "page", "processor": "template.render",
+                                   "file": "stream_error.html.j2", "stream": True,
+                                   "on_fail": 503}])
+        assert http_exc.type.code == 503
+
+        # Errors loading the template are raised before streaming
+        data_dict["file"] = "invalid.html.j2"
+        with raises(HTTPException) as http_exc:
+            template.render(data_dict)
+        assert http_exc.type.code == 500
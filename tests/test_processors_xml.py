@@ -2,6 +2,7 @@ import os
 from lxml.etree import _ElementTree
 from sandhill.processors import xml
 from sandhill import app
+from sandhill.utils.aio import run_coroutine
 
 def test_xml_load():
     data_str = {
@@ -54,3 +55,11 @@ def test_xml_xpath_by_id():
 
     matched = xml.xpath_by_id(data_nopath)
     assert matched is None
+
+def test_xml_load_async():
+    data_str = {
+        'source': '<main><str>one</str><str>two</str></main>'
+    }
+    result = run_coroutine(xml.load_async(data_str)).result(timeout=5)
+    assert isinstance(result, _ElementTree)
+    assert run_coroutine(xml.load_async({})).result(timeout=5) is None
@@ -1,7 +1,10 @@
 '''
 Tests the main.py route file
 '''
+from unittest.mock import patch
 from sandhill import app
+from sandhill.routes import main
+from sandhill.utils.sandcache import sandcache
 
 def test_main():
     '''
@@ -54,3 +57,57 @@ def test_main():
         # test passing in a route config that contains no data
         result = client.get('/no-data')
         assert result.status_code == 200
+
+def test_main_response_cache():
+    '''
+    Tests routes with response_cache enabled
+    '''
+    sandcache('responses').clear()
+    with app.test_client() as client:
+        result = client.get('/cached/1')
+        assert result.status_code == 200
+        assert result.headers['Cache-Control'] == "public, max-age=60"
+        etag = result.headers['ETag']
+        body = result.get_data()
+
+        # A matching If-None-Match skips rendering
+        result = client.get('/cached/1', headers={'If-None-Match': etag})
+        assert result.status_code == 304
+        assert result.headers['ETag'] == etag
+        assert not result.get_data()
+
+        # Changed data has a different ETag
+        result = client.get('/cached/2', headers={'If-None-Match': etag})
+        assert result.status_code == 200
+        assert result.headers['ETag'] != etag
+
+        # Stored rendered page is served
+        with patch('sandhill.processors.template.render_template') as render:
+            result = client.get('/cached/1')
+            render.assert_not_called()
+        assert result.status_code == 200
+        assert result.headers['ETag'] == etag
+        assert result.get_data() == body
+    sandcache('responses').clear()
+
+    # Unable to compute ETag
+    with app.test_request_context('/cached/1'):
+        route_data = [
+            {"name": "obj", "processor": "template.render_string", "value": "a"},
+            {"name": "page", "processor": "template.render", "file": "about.html.j2"},
+        ]
+        with patch('sandhill.routes.main.validator_etag', return_value=None):
+            result = main.cached_route_response(route_data, {})
+        assert result.status_code == 200
+        assert 'ETag' not in result.headers
+
+        # Responses from data processors are returned as is
+        route_data = [
+            {"name": "redirect", "processor": "request.redirect", "location": "/"},
+        ]
+        assert main.cached_route_response(route_data, {}).status_code == 302
+
+        # Templates which cannot be found are skipped
+        assert main._template_mtimes([
+            {"name": "page", "processor": "template.render", "file": "{{ missing }}"}
+        ]) == []
@@ -1,7 +1,12 @@
 '''
 Test the static.py file
 '''
+import os
+import gzip
+import tempfile
+from unittest.mock import patch
 from sandhill import app
+from sandhill.utils import static
 
 
 def test_handle_static():
@@ -33,3 +38,59 @@ def test_favicon():
         result = client.get("/favicon.ico")
         assert result.status_code == 200
         result.close()
+
+def test_handle_static_manifest():
+    '''
+    tests serving precompressed and fingerprinted static files
+    '''
+    with tempfile.TemporaryDirectory() as instance, \
+            patch.object(static, 'roots', return_value=[instance]), \
+            patch.dict(app.config, {"STATIC_MANIFEST": os.path.join(instance, 'manifest.json')}):
+        with open(os.path.join(instance, 'main.css'), 'w', encoding='utf-8') as cssfile:
+            cssfile.write('body { color: red; }\n' * 100)
+        try:
+            entry = static.build()['main.css']
+            with app.test_client() as client:
+                result = client.get("/static/main.css", headers={"Accept-Encoding": "gzip"})
+                assert result.status_code == 200
+                assert result.headers['Content-Encoding'] == 'gzip'
+                assert result.headers['Content-Type'].startswith('text/css')
+                assert 'Accept-Encoding' in result.headers['Vary']
+                assert 'immutable' not in result.headers.get('Cache-Control', '')
+                assert gzip.decompress(result.data) == b'body { color: red; }\n' * 100
+                result.close()
+
+                result = client.get("/static/main.css")
+                assert 'Content-Encoding' not in result.headers
+                assert result.data == b'body { color: red; }\n' * 100
+                result.close()
+
+                result = client.get(f"/static/main.css?v={entry['hash']}")
+                assert 'immutable' in result.headers['Cache-Control']
+                assert 'max-age=31536000' in result.headers['Cache-Control']
+                result.close()
+
+                # A stale fingerprint is not immutable
+                result = client.get("/static/main.css?v=old")
+                assert 'immutable' not in result.headers.get('Cache-Control', '')
+                result.close()
+        finally:
+            static._manifest["files"] = None
+
+def test_static_command():
+    '''
+    tests the static command
+    '''
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=["static"])
+    assert "test.txt" in result.output and "favicon.ico" in result.output
+
+    with tempfile.TemporaryDirectory() as instance, \
+            patch.object(static, 'roots', return_value=[instance]), \
+            patch.dict(app.config, {"STATIC_MANIFEST": os.path.join(instance, 'manifest.json')}):
+        try:
+            result = runner.invoke(args=["static", "--build", "--no-compress"])
+            assert "Wrote manifest for 0 files" in result.output
+            assert os.path.exists(os.path.join(instance, 'manifest.json'))
+        finally:
+            static._manifest["files"] = None
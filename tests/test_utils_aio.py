@@ -0,0 +1,60 @@
+import os
+import time
+import asyncio
+import contextvars
+from pytest import raises
+from sandhill.utils import aio
+
+def test_event_loop():
+    loop = aio.event_loop()
+    assert loop is aio.event_loop()
+    assert loop.is_running()
+
+    # A new loop is started after a fork
+    aio._event_loop["pid"] = -1
+    assert aio.event_loop() is not loop
+    assert aio._event_loop["pid"] == os.getpid()
+    loop.call_soon_threadsafe(loop.stop)
+    while loop.is_running():
+        time.sleep(0.01)
+    loop.close()
+
+def test_run_coroutine():
+    async def double(value):
+        await asyncio.sleep(0)
+        return value * 2
+    assert aio.run_coroutine(double(4)).result(timeout=5) == 8
+
+    # Exceptions are raised from the result
+    async def fail():
+        raise ValueError("failed")
+    with raises(ValueError):
+        aio.run_coroutine(fail()).result(timeout=5)
+
+    # Runs within the given context
+    var = contextvars.ContextVar("var", default="unset")
+    async def get_var():
+        return var.get()
+    var.set("set")
+    assert aio.run_coroutine(get_var(), contextvars.copy_context()).result(timeout=5) == "set"
+
+    # Cancelling the future cancels the coroutine
+    cancelled = []
+    async def wait():
+        try:
+            await asyncio.sleep(30)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+        return "ignored cancel"
+    future = aio.run_coroutine(wait())
+    assert future.cancel()
+    aio.run_coroutine(asyncio.sleep(0.05)).result(timeout=5)
+    assert cancelled == [True] and future.cancelled()
+
+    # Cancelling the task cancels the future
+    async def cancel_self():
+        asyncio.current_task().cancel()
+        await asyncio.sleep(1)
+    future = aio.run_coroutine(cancel_self())
+    aio.run_coroutine(asyncio.sleep(0.05)).result(timeout=5)
+    assert future.cancelled()
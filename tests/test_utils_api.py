@@ -1,7 +1,15 @@
+import threading
+from http.server import HTTPServer, BaseHTTPRequestHandler
 from sandhill import app
 from sandhill.utils import api
+from unittest.mock import patch, MagicMock
 from pytest import raises
-from requests.exceptions import RequestException
+import httpx
+from requests.exceptions import RequestException, Timeout
+from requests.models import Response as RequestsResponse
+from sandhill.utils.aio import run_coroutine
+from sandhill.utils import timing
+from sandhill.utils.test import _test_async_client
 from werkzeug.exceptions import HTTPException
 
 def test_api_get():
@@ -76,3 +84,111 @@ def test_establish_url():
         url = api.establish_url(None, "not_a_url")
     assert http_error.type.code == 400
 
+
+def test_get_session():
+    session = api.get_session("https://solr.example.edu/solr/select")
+    assert session is api.get_session("https://solr.example.edu/other?q=1")
+    assert session is not api.get_session("http://solr.example.edu/solr/select")
+    assert session is not api.get_session("https://iiif.example.edu/image")
+
+    adapter = session.get_adapter("https://solr.example.edu/")
+    assert adapter.max_retries.total == 2
+    assert 503 in adapter.max_retries.status_forcelist
+
+    # Sessions are recreated in a forked process
+    api._session_registry["pid"] = -1
+    assert session is not api.get_session("https://solr.example.edu/solr/select")
+
+def test_get_session_cookies():
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Set-Cookie", "upstream_session=secret; Path=/")
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(self.headers.get("Cookie", "no").encode()[:2])
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/"
+        session = api.get_session(url)
+        assert session.get(url, timeout=5).cookies["upstream_session"] == "secret"
+        # Cookies set by upstream services are not kept for the next call
+        assert len(session.cookies) == 0
+        assert session.get(url, timeout=5).content == b"no"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def test_api_get_timing():
+    session = MagicMock()
+    session.get.return_value.ok = True
+    with app.test_request_context('/'), patch.object(api, 'get_session', return_value=session):
+        with timing.timed('record', 'solr.select', 'execute'):
+            api.api_get(url="https://solr.example.edu/solr/select")
+        assert session.get.call_args.kwargs['timeout'] == 10
+        upstream = timing.request_timings()[0]
+        assert (upstream['name'], upstream['phase']) == ('record', 'upstream')
+
+        session.get.return_value.ok = False
+        assert not api.api_get(url="https://solr.example.edu/solr/select").ok
+
+        session.get.side_effect = RequestException
+        with raises(RequestException):
+            api.api_get(url="https://solr.example.edu/solr/select")
+
+def test_get_timeout():
+    with app.app_context():
+        assert api.get_timeout("https://solr.example.edu/solr") == 10
+        app.config['HTTP_HOST_TIMEOUTS'] = {"solr.example.edu": 30}
+        assert api.get_timeout("https://solr.example.edu:8983/solr") == 30
+        assert api.get_timeout("https://iiif.example.edu/image") == 10
+        assert api.get_timeout(None) == 10
+        app.config['HTTP_HOST_TIMEOUTS'] = {}
+
+def test_api_request_async():
+    def handler(request):
+        if request.url.path == "/timeout":
+            raise httpx.ReadTimeout("Timed out", request=request)
+        if request.url.path == "/down":
+            raise httpx.ConnectError("Connection refused", request=request)
+        status = 404 if request.url.path == "/missing" else 200
+        return httpx.Response(status, json={"method": request.method, "q": request.url.params.get("q")},
+                              headers={"X-Test": "yes"})
+
+    with app.app_context(), _test_async_client(handler):
+        response = run_coroutine(
+            api.api_get_async(url="https://example.edu/path", params={"q": "a"}, stream=True)
+        ).result(timeout=5)
+        assert isinstance(response, RequestsResponse)
+        assert response.ok and response.json() == {"method": "GET", "q": "a"}
+        assert response.headers['x-test'] == "yes"
+        assert response.url == "https://example.edu/path?q=a"
+
+        response = run_coroutine(
+            api.api_request_async("POST", "https://example.edu/missing", timeout=1)
+        ).result(timeout=5)
+        assert response.status_code == 404 and response.json()["method"] == "POST"
+        response = run_coroutine(api.api_get_async(url="https://example.edu/missing")).result(5)
+        assert not response.ok
+
+        with raises(Timeout):
+            run_coroutine(api.api_get_async(url="https://example.edu/timeout")).result(timeout=5)
+        with raises(RequestException):
+            run_coroutine(api.api_get_async(url="https://example.edu/down")).result(timeout=5)
+
+    # Client is shared, and recreated after a fork
+    client = api.get_async_client()
+    assert client is api.get_async_client()
+    # Cookies set by upstream services are not kept
+    client.cookies.extract_cookies(httpx.Response(
+        200, headers={"Set-Cookie": "upstream_session=secret; Path=/"},
+        request=httpx.Request("GET", "https://solr.example.edu/solr/select")))
+    assert len(client.cookies.jar) == 0
+    api._async_client["pid"] = -1
+    assert api.get_async_client() is not client
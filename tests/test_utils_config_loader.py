@@ -4,6 +4,7 @@ from sandhill.utils import config_loader
 from sandhill.modules.routing import Route
 from pytest import raises
 from collections import OrderedDict
+from unittest.mock import patch
 
 def test_load_json_config():
     # test valid file path which has properly formatted json
@@ -93,3 +94,76 @@ def test_load_json_configs():
     assert isinstance(data, dict)
     assert os.path.join(config_path, "config/routes/", "home.json") in data
 
+
+def test_route_registry():
+    # test the registry maps each rule to its config
+    registry = config_loader.build_route_registry()
+    assert registry["rules"]["/home"] is registry["rules"]["/"]
+    assert "/about" in registry["rules"]
+    assert os.path.join(app.instance_path, "config/routes/home.json") in registry["mtimes"]
+    assert config_loader.get_route_registry() is registry
+
+    # test an invalid route config path
+    assert config_loader.build_route_registry("invalid_dir") is None
+
+    # test that modifying a loaded config does not modify the registry
+    data = config_loader.load_route_config("/about")
+    data["data"].append({"name": "extra"})
+    assert len(config_loader.load_route_config("/about")["data"]) == 1
+
+    # test an unknown rule
+    assert config_loader.load_route_config("/not/a/rule") == OrderedDict()
+    assert config_loader.load_route("/not/a/rule") == (OrderedDict(), None)
+
+    # test the route data is prepared once per rule
+    data, prepared = config_loader.load_route("/about")
+    assert len(prepared["skeletons"]) == len(config_loader.get_route_data(data)[0])
+    assert config_loader.load_route("/about")[1] is prepared
+    assert registry["prepared"]["/about"] is prepared
+
+def test_get_route_data():
+    route_config = {
+        "template": "page.html.j2",
+        "data": [{"name": "one", "processor": "file.load_json"}, {"name": "invalid"}],
+    }
+    route_data, invalid = config_loader.get_route_data(route_config)
+    assert [entry["name"] for entry in route_data] == ["one", "_template_render"]
+    assert route_data[1]["file"] == "page.html.j2"
+    assert route_data[1]["status_code"] == 200
+    assert invalid == [1]
+    assert len(route_config["data"]) == 2
+    assert config_loader.get_route_data({}) == ([], [])
+
+def test_route_registry_auto_reload(tmp_path):
+    routes_dir = str(tmp_path)
+    conf_path = tmp_path / "page.json"
+    conf_path.write_text('{"route": "/page", "template": "one.html.j2"}')
+    assert config_loader.load_route_config("/page", routes_dir)["template"] == "one.html.j2"
+
+    # test changes are not loaded with auto reload disabled
+    conf_path.write_text('{"route": "/page", "template": "two.html.j2"}')
+    os.utime(conf_path, ns=(0, 0))
+    app.config["ROUTES_AUTO_RELOAD"] = 0
+    assert config_loader.load_route_config("/page", routes_dir)["template"] == "one.html.j2"
+
+    # test changes are loaded with auto reload enabled
+    app.config["ROUTES_AUTO_RELOAD"] = 1
+    assert config_loader.load_route_config("/page", routes_dir)["template"] == "two.html.j2"
+
+    # test removal of the route dir falls back to the welcome home page route
+    conf_path.unlink()
+    tmp_path.rmdir()
+    data = config_loader.load_route_config("/page", routes_dir)
+    assert data == OrderedDict([('route', ['/']), ('template', 'home.html.j2')])
+    app.config["ROUTES_AUTO_RELOAD"] = 0
+
+def test_route_registry_when_errors(tmp_path):
+    conf_path = tmp_path / "page.json"
+    conf_path.write_text('{"route": "/page", "data": [{"name": "bad", "processor": '
+                         '"template.render_string", "value": "x", "when": "{{ 1 + }}"}]}')
+    with patch.object(app.logger, 'warning') as log:
+        registry = config_loader.build_route_registry(str(tmp_path))
+    assert "/page" in registry["rules"]
+    log.assert_called_once()
+    assert "Invalid 'when' clause for 'bad'" in log.call_args[0][0]
+    assert str(conf_path) in log.call_args[0][0]
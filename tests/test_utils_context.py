@@ -11,7 +11,8 @@ def test_list_custom_context_processors():
         'sandbug',
         'urlcomponents',
         'find_mismatches',
-        'get_var'
+        'get_var',
+        'static_url'
     ]
 
 def test_context_processors():
@@ -1,3 +1,5 @@
+import asyncio
+import inspect
 from sandhill import app
 from sandhill.utils import error_handling
 from pytest import raises
@@ -62,3 +64,23 @@ def test_catch():
     # Test for not providing any action or return
     with raises(OSError):
         res = myfunc(30)
+
+def test_catch_async():
+
+    @error_handling.catch(ValueError, "VALUE ERROR: {exc}", return_val=-1)
+    @error_handling.catch(KeyError, "KEY ERROR: {a} {exc}", abort=400)
+    async def myfunc(a):
+        await asyncio.sleep(0)
+        if a < 0:
+            raise ValueError("Negatives are a no no!")
+        if a == 1:
+            raise KeyError("1 is not a valid key")
+        return a * a
+
+    assert inspect.iscoroutinefunction(myfunc)
+    assert asyncio.run(myfunc(2)) == 4
+    assert asyncio.run(myfunc(-3)) == -1
+    with app.test_request_context('/'):
+        with raises(HTTPException) as http_error:
+            asyncio.run(myfunc(1))
+        assert http_error.type.code == 400
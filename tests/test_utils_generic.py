@@ -70,6 +70,7 @@ def test_getdescendant():
             ]
         }
     assert generic.getdescendant(test_dict, []) is None
+    assert generic.getdescendant(test_dict, [], put="none") is None
     assert generic.getdescendant(test_dict, ['level1', 'level2']) == test_dict['level1']['level2']
     assert generic.getdescendant(test_dict, ['level1', 'level2', 'level3', 'level4']) == "val"
     assert generic.getdescendant(test_dict, ['other_level']) == test_dict['other_level']
@@ -94,6 +95,38 @@ def test_getdescendant():
     with raises(IndexError):
         generic.getdescendant(test_dict, "dict1.strkey", put="using str as index for list")
 
+def test_compile_descendant():
+    path = generic.compile_descendant("response.docs.0")
+    assert path.segments == (("response", None), ("docs", None), ("0", 0))
+    assert generic.compile_descendant("response.docs.0") is path
+    assert generic.compile_descendant(["response", "docs", "0"]).segments == path.segments
+
+    # Keys which equal other keys are not cached together
+    assert generic.compile_descendant([True]).segments == ((True, None),)
+    assert generic.compile_descendant([1]).segments == ((1, 1),)
+    assert generic.getdescendant([0, 1], [True]) is None
+    assert generic.getdescendant({1: "int"}, [True]) == "int"
+    with raises(TypeError):
+        generic.getdescendant({"a": 1}, [["unhashable"]])
+
+    # Digits which are not valid indexes
+    assert generic.compile_descendant("\u00b2").segments == (("\u00b2", None),)
+
+def test_getdescendant_many():
+    docs = [{"id": 1, "title": ["one"]}, {"id": 2}, "invalid", {"id": 3, "title": []}]
+    assert generic.getdescendant_many(docs, "title.0") == ["one", None, None, None]
+    assert generic.getdescendant_many(docs, ["id"]) == [1, 2, None, 3]
+    assert generic.getdescendant_many([], "id") == []
+
+    # Extract and put apply to each object
+    assert generic.getdescendant_many(docs, "id", extract=True) == [1, 2, None, 3]
+    assert "id" not in docs[0] and "id" not in docs[3]
+    generic.getdescendant_many(docs, "title.[]", put="new")
+    assert docs[0]["title"] == ["one", "new"] and docs[3]["title"] == ["new"]
+    assert docs[1] == {}
+    with raises(IndexError):
+        generic.getdescendant_many(docs, "title.5", put="new")
+
 def test_getconfig():
     # Test getting a value from the environment when also present in config
     response = generic.getconfig("PATH")
@@ -0,0 +1,85 @@
+import io
+from concurrent.futures import wait
+from requests.models import Response as RequestsResponse
+from requests.exceptions import RequestException
+from sandhill import app
+from sandhill.utils import iiif
+
+def _image_api_get(calls):
+    def api_get(url=None, params=None, stream=True, headers=None):
+        calls.append(url)
+        response = RequestsResponse()
+        response.raw = io.BytesIO(b"image:" + url.encode())
+        response.headers['Content-Type'] = 'image/jpeg'
+        response.headers['ETag'] = '"abc"'
+        response.status_code = 404 if "missing" in url else 200
+        return response
+    return api_get
+
+def test_neighbour_tiles():
+    assert iiif.neighbour_tiles("512,1024,512,512/512,/0/default.jpg") == [
+        "0,1024,512,512/512,/0/default.jpg",
+        "1024,1024,512,512/512,/0/default.jpg",
+        "512,512,512,512/512,/0/default.jpg",
+        "512,1536,512,512/512,/0/default.jpg",
+    ]
+    # Tiles on the edge
+    assert iiif.neighbour_tiles("0,0,256,256/256,/0/default.jpg") == [
+        "256,0,256,256/256,/0/default.jpg",
+        "0,256,256,256/256,/0/default.jpg",
+    ]
+    # Not tiles, or not aligned to the tile grid
+    assert iiif.neighbour_tiles("full/max/0/default.jpg") == []
+    assert iiif.neighbour_tiles("info.json") == []
+    assert iiif.neighbour_tiles("1024,0,200,512/200,/0/default.jpg") == []
+    assert iiif.neighbour_tiles("0,0,0,512/200,/0/default.jpg") == []
+
+def test_load_cached_image():
+    iiif.tile_cache().clear()
+    calls = []
+    api_get = _image_api_get(calls)
+    with app.app_context():
+        app.config['IIIF_TILE_PREFETCH'] = 0
+        image = iiif.load_cached_image("https://example.edu/iiif", "pid", "full/max/0/default.jpg", api_get)
+        assert image.status_code == 200
+        assert image.headers['Content-Type'] == 'image/jpeg'
+        assert 'ETag' not in image.headers
+        assert image.raw.name.startswith(iiif.tile_cache().directory)
+        assert image.content == b"image:https://example.edu/iiif/pid/full/max/0/default.jpg"
+        assert len(calls) == 1
+        image.close()
+
+        # Served from the cache
+        image = iiif.load_cached_image("https://example.edu/iiif", "pid", "full/max/0/default.jpg", api_get)
+        assert image.content == b"image:https://example.edu/iiif/pid/full/max/0/default.jpg"
+        assert len(calls) == 1
+        image.close()
+
+        # Failures are not cached
+        image = iiif.load_cached_image("https://example.edu/iiif", "missing", "info.json", api_get)
+        assert image.status_code == 404
+        iiif.load_cached_image("https://example.edu/iiif", "missing", "info.json", api_get)
+        assert len(calls) == 3
+
+        # Neighbouring tiles are prefetched
+        app.config['IIIF_TILE_PREFETCH'] = 2
+        futures = iiif.prefetch_tiles("https://example.edu/iiif", "pid", "0,0,256,256/256,/0/default.jpg", api_get)
+        assert len(futures) == 2
+        wait(futures)
+        assert len(calls) == 5
+        key = iiif.tile_cache_key("https://example.edu/iiif", "pid", "256,0,256,256/256,/0/default.jpg")
+        image = iiif.cached_image(key)
+        assert image.content == b"image:https://example.edu/iiif/pid/256,0,256,256/256,/0/default.jpg"
+        image.close()
+
+        # Cached or pending tiles are not prefetched again
+        assert iiif.prefetch_tiles("https://example.edu/iiif", "pid", "0,0,256,256/256,/0/default.jpg", api_get) == []
+
+        # Failed prefetches are ignored
+        def unavailable(url=None, params=None, stream=True, headers=None):
+            raise RequestException()
+        futures = iiif.prefetch_tiles("https://example.edu/iiif", "pid", "512,512,256,256/256,/0/default.jpg", unavailable)
+        wait(futures)
+        assert not iiif._prefetch["pending"]
+        app.config['IIIF_TILE_PREFETCH'] = 2
+    iiif.tile_cache().clear()
@@ -163,3 +163,55 @@ def test_eval_within():
 
     string8 = "$thing1.wont.find.this == $missing.location[0]"
     assert jsonpath.eval_within(string8, ctx1) == "[] == []"
+
+def test_compile_path():
+    jsonpath.compile_path.cache_clear()
+    pattern = jsonpath.compile_path("$.key1[*]")
+    assert jsonpath.compile_path("$.key1[*]") is pattern
+    assert jsonpath.find({"key1": [1, 2]}, "$.key1[*]") == [1, 2]
+    assert jsonpath.compile_path.cache_info().hits == 2
+    with pytest.raises(JSONPathError):
+        jsonpath.compile_path("invalid.$[*]-")
+
+def test_copy_path():
+    data = {
+        "key1": {"sub": [1, 2]},
+        "key2": [{"a": 1}, {"a": 2}],
+        "key3": {"untouched": ["x"]},
+    }
+    expected = {
+        "key1": {"sub": [1, 2]},
+        "key2": [{"a": 1, "b": 0}, {"a": 2, "b": 0}],
+        "key3": {"untouched": ["x"]},
+    }
+    updated = jsonpath.put(data, "$.key2[*].b", 0, copy_path=True)
+    assert updated == expected == jsonpath.put(data, "$.key2[*].b", 0)
+    # Only containers along the modified paths are copied
+    assert "b" not in data["key2"][0]
+    assert updated is not data and updated["key2"] is not data["key2"]
+    assert updated["key2"][1] is not data["key2"][1]
+    assert updated["key1"] is data["key1"] and updated["key3"] is data["key3"]
+
+    updated = jsonpath.append(data, "$.key1.sub", 3, copy_path=True)
+    assert updated["key1"]["sub"] == [1, 2, 3] and data["key1"]["sub"] == [1, 2]
+    assert updated["key2"] is data["key2"]
+
+    updated = jsonpath.delete(data, "$.key2[*].a", copy_path=True)
+    assert updated["key2"] == [{}, {}] and data["key2"] == [{"a": 1}, {"a": 2}]
+    assert updated["key1"] is data["key1"]
+
+    updated = jsonpath.put(data, "$.id", 5, copy_path=True)
+    assert updated["id"] == 5 and "id" not in data
+    assert updated["key1"] is data["key1"]
+
+    # Paths through descendants and slices
+    data = {"items": [{"id": 1, "tags": []}, {"id": 2, "tags": []}]}
+    updated = jsonpath.append(data, "$..items[1].tags", "new", copy_path=True)
+    assert updated["items"][1]["tags"] == ["new"] and data["items"][1]["tags"] == []
+    assert updated["items"][0] is data["items"][0]
+    updated = jsonpath.put(updated, "$.items[0:1].id", 9, copy_path=True)
+    assert [item["id"] for item in updated["items"]] == [9, 2]
+    assert data["items"][0]["id"] == 1
+
+    # No matches returns the data as is
+    assert jsonpath.put(data, "$.missing.key", 1, copy_path=True) is data
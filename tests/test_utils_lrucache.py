@@ -0,0 +1,29 @@
+import time
+from sandhill.utils.lrucache import LRUCache
+
+def test_lrucache():
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    # "b" is least recently used, so is removed
+    cache.set("c", 3)
+    assert "b" not in cache
+    assert cache.get("b") is None
+    assert cache.get("b", "default") == "default"
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+    # Expiration
+    cache.set("d", 4, expire=0.01)
+    assert "d" in cache
+    time.sleep(0.02)
+    assert "d" not in cache
+    assert cache.get("d") is None
+
+    cache.delete("c")
+    cache.delete("missing")
+    assert cache.info() == {"hits": 2, "misses": 3, "size": 0, "maxsize": 2}
+
+    cache.clear()
+    assert cache.info() == {"hits": 0, "misses": 0, "size": 0, "maxsize": 2}
@@ -0,0 +1,129 @@
+'''
+Test the application metrics
+'''
+import threading
+from unittest.mock import patch
+from flask import g
+from requests.models import Response
+from sandhill import app
+from sandhill.processors import solr
+from sandhill.utils import metrics, timing
+
+def setup_function():
+    '''
+    Start each test with no recorded metrics
+    '''
+    metrics.metrics_cache().clear()
+
+def test_disabled():
+    '''
+    Test nothing is recorded when metrics are disabled
+    '''
+    with app.test_request_context('/'):
+        assert not metrics.enabled()
+        metrics.observe("sandhill_request_duration_seconds", 1, route="/")
+        metrics.count("sandhill_cache_requests_total", cache="solr", result="hit")
+        metrics.flush()
+    assert len(metrics.metrics_cache()) == 0
+
+    # Counters are never evicted from the store
+    assert metrics.metrics_cache().eviction_policy == 'none'
+
+    with app.test_client() as client:
+        assert client.get('/metrics').status_code == 404
+
+@patch.dict(app.config, {"METRICS": 1})
+def test_record():
+    '''
+    Test recording and exporting metrics
+    '''
+    with app.test_request_context('/'):
+        metrics.observe("sandhill_upstream_duration_seconds", 0.02, host="solr", status=200)
+        metrics.observe("sandhill_upstream_duration_seconds", 0.3, host="solr", status=200)
+        metrics.observe("sandhill_upstream_duration_seconds", 60, host="solr", status=200)
+        metrics.count("sandhill_cache_requests_total", cache="solr", result="hit")
+        metrics.count("sandhill_cache_requests_total", cache="solr", result="hit")
+        # Only written when flushed
+        assert len(metrics.metrics_cache()) == 0
+        metrics.flush()
+
+    # Written immediately outside of a request
+    metrics.count("sandhill_cache_requests_total", cache="iiif", result='say "hi"\\\n')
+
+    values = metrics.collect()
+    upstream = values["sandhill_upstream_duration_seconds"][(("host", "solr"), ("status", "200"))]
+    assert upstream["count"] == 3
+    assert upstream["sum"] == 60.32
+    assert upstream["buckets"] == {0.025: 1, 0.5: 1, "+Inf": 1}
+    assert values["sandhill_cache_requests_total"][(("cache", "solr"), ("result", "hit"))] == 2
+    assert values["sandhill_worker_threads"][()] == threading.active_count()
+    assert values["sandhill_workers"][()] == 1
+
+    exported = metrics.export()
+    assert "# TYPE sandhill_upstream_duration_seconds histogram\n" in exported
+    assert 'sandhill_upstream_duration_seconds_bucket{host="solr",status="200",le="0.01"} 0\n' \
+        in exported
+    assert 'sandhill_upstream_duration_seconds_bucket{host="solr",status="200",le="1.0"} 2\n' \
+        in exported
+    assert 'sandhill_upstream_duration_seconds_bucket{host="solr",status="200",le="+Inf"} 3\n' \
+        in exported
+    assert 'sandhill_upstream_duration_seconds_count{host="solr",status="200"} 3\n' in exported
+    assert 'sandhill_cache_requests_total{cache="iiif",result="say \\"hi\\"\\\\\\n"} 1\n' \
+        in exported
+    assert "\nsandhill_workers 1\n" in exported
+
+    # Unknown keys in the store are ignored
+    metrics.metrics_cache()["other"] = 1
+    assert metrics.collect()["sandhill_cache_requests_total"]
+
+@patch.dict(app.config, {"METRICS": 1})
+def test_request_metrics():
+    '''
+    Test metrics are recorded for requests, and served from /metrics
+    '''
+    with app.test_client() as client:
+        assert client.get('/about').status_code == 200
+        assert client.get('/invalid/page/route').status_code == 404
+        result = client.get('/metrics')
+        assert result.status_code == 200
+        assert result.content_type.startswith("text/plain")
+        exported = result.get_data(as_text=True)
+        assert 'sandhill_request_duration_seconds_count{route="/about"} 1\n' in exported
+        assert 'sandhill_request_duration_seconds_count{route="unmatched"} 1\n' in exported
+        assert 'sandhill_processor_duration_seconds_count{processor="template.render"}' \
+            in exported
+
+    # Route labels are reloaded after a fork
+    metrics._route_rules["pid"] = -1
+    with app.test_request_context('/about'):
+        assert metrics.route_label() == "/about"
+    assert metrics._route_rules["pid"] != -1
+
+@patch.dict(app.config, {"METRICS": 1})
+def test_background_metrics():
+    '''
+    Test metrics recorded by a background Solr cache refresh are written to the store,
+    even though the request which started it has already finished
+    '''
+    def refresh_api_get(url, params): # pylint: disable=unused-argument
+        timing.record_upstream(url, 0.02, 200)
+        response = Response()
+        response.status_code = 200
+        response._content = b'{"response": {"docs": []}}'
+        return response
+
+    with app.test_request_context('/'):
+        metrics.flush()
+        key = solr.select_cache_key("https://refresh.example.edu/select", {'q': '*'})
+        solr._select_cache_refresh(key, "https://refresh.example.edu/select", {'q': '*'},
+                                   (1, 1), refresh_api_get)
+        for thread in threading.enumerate():
+            if thread is not threading.current_thread() and thread.daemon \
+                    and thread.name != "sandhill-event-loop":
+                thread.join(timeout=5)
+        assert "metrics" not in g
+        assert solr._select_memory_cache().get(key)
+        solr._select_memory_cache().delete(key)
+
+    upstream = metrics.collect()["sandhill_upstream_duration_seconds"]
+    assert upstream[(("host", "refresh.example.edu"), ("status", "200"))]["count"] == 1
@@ -124,3 +124,11 @@ def test_overlay_with_query_args():
         assert "q.alt" not in query_params
         assert query_params["q"] == ["elephant"]
 
+
+def test_forward_headers():
+    # Without a request context
+    assert request.forward_headers(['Range']) == {}
+
+    with app.test_request_context('/', headers={'Range': 'bytes=0-1', 'Accept': 'text/html'}):
+        assert request.forward_headers(['Range', 'If-None-Match']) == {'Range': 'bytes=0-1'}
+        assert request.forward_headers([]) == {}
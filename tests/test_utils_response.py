@@ -0,0 +1,50 @@
+import io
+from flask import Response
+from lxml import etree
+from requests.models import Response as RequestsResponse
+from sandhill.utils import response as resp
+
+def test_to_response():
+    response = resp.to_response("text")
+    assert response.get_data(as_text=True) == "text"
+    assert response.content_type == "text/plain"
+
+def test_validator_etag():
+    data = {"record": {"_version_": 1, "title": "A"}, "view_args": {"id": 1}}
+    etag = resp.validator_etag(data, ["record._version_"])
+    assert etag == resp.validator_etag({"record": {"_version_": 1, "title": "B"}},
+                                       ["record._version_"])
+    assert etag != resp.validator_etag({"record": {"_version_": 2}}, ["record._version_"])
+    assert etag != resp.validator_etag(data, ["record._version_"], extra="/item/1")
+
+    # Without validators, all data is used
+    assert resp.validator_etag(data) != resp.validator_etag({**data, "other": 1})
+
+    # Upstream responses are validated by their ETag or Last-Modified
+    upstream = RequestsResponse()
+    upstream.raw = io.BytesIO(b'')
+    upstream.headers['ETag'] = '"abc"'
+    etag = resp.validator_etag({"image": upstream})
+    assert etag
+    upstream.headers['ETag'] = '"def"'
+    assert etag != resp.validator_etag({"image": upstream})
+    del upstream.headers['ETag']
+    assert resp.validator_etag({"image": upstream}) is None
+
+    # XML is serialized
+    xml = etree.fromstring("<a><b>1</b></a>")
+    assert resp.validator_etag({"xml": xml}) != \
+        resp.validator_etag({"xml": etree.fromstring("<a><b>2</b></a>")})
+
+    # Unknown objects cannot be validated
+    assert resp.validator_etag({"obj": object()}) is None
+
+def test_set_cache_headers():
+    response = resp.set_cache_headers(Response("text"), "abc", 60)
+    assert response.headers['ETag'] == '"abc"'
+    assert response.cache_control.max_age == 60
+    assert response.cache_control.public
+
+    response = resp.set_cache_headers(Response("text"), "abc")
+    assert response.cache_control.no_cache
+    assert response.cache_control.max_age is None
@@ -1,4 +1,5 @@
-from sandhill.utils.sandcache import sandcache
+from sandhill.utils import sandcache as sandcache_module
+from sandhill.utils.sandcache import sandcache, memoize
 
 def test_sandcache():
     with sandcache() as cache:
@@ -12,3 +13,42 @@ def test_sandcache():
         del cache['data']
         assert cache.get('data') is None
         cache.clear()
+
+def test_sandcache_named():
+    cache = sandcache('test')
+    assert cache is sandcache('test')
+    assert cache is not sandcache()
+    assert cache.directory.endswith('/crane-cache/test')
+
+    # Handle remains open after use as context manager
+    with sandcache('test') as ctx_cache:
+        ctx_cache['data'] = "Named"
+    assert cache['data'] == "Named"
+    assert sandcache().get('data') is None
+
+    # Handles are reopened after a fork
+    sandcache_module._handles["pid"] = -1
+    assert cache is not sandcache('test')
+    assert sandcache('test')['data'] == "Named"
+    sandcache('test').clear()
+
+    # Settings apply when first opened
+    cache = sandcache('test_lru', eviction_policy='least-recently-used')
+    assert cache.eviction_policy == 'least-recently-used'
+    assert sandcache().eviction_policy == 'least-recently-stored'
+
+def test_memoize():
+    calls = []
+
+    @memoize('test', expire=60)
+    def double(val, other=None):
+        calls.append(val)
+        return val * 2
+
+    sandcache('test').clear()
+    assert double(2) == 4
+    assert double(2) == 4
+    assert double(3, other=1) == 6
+    assert calls == [2, 3]
+    assert sandcache('test').get(double.__cache_key__(2)) == 4
+    sandcache('test').clear()
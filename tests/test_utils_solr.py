@@ -1,3 +1,4 @@
+from pytest import raises
 from sandhill.utils import solr
 
 def test_Solr_encode_value():
@@ -16,3 +17,54 @@ def test_Solr_encode_query():
     _, _ = next(testsolr._get_token())
     assert testsolr._next_token_is("SPACE")
     
+
+def test_tokenize_query():
+    assert solr.tokenize_query('title:"a b" AND [1 TO *]') == (
+        ("TERM", "title:"), ("QUOTE", '"'), ("TERM", "a"), ("SPACE", " "), ("TERM", "b"),
+        ("QUOTE", '"'), ("SPACE", " "), ("LOGIC", "AND"), ("SPACE", " "), ("RANGE", "["),
+        ("TERM", "1"), ("SPACE", " "), ("TERM", "TO"), ("SPACE", " "), ("WILD", "*"),
+        ("RANGE", "]"),
+    )
+    # Logic operators take precedence over terms, as with re.Scanner
+    assert solr.tokenize_query("ANDROID") == (("LOGIC", "AND"), ("TERM", "ROID"))
+    assert solr.tokenize_query("") == ()
+
+def test_encode_query():
+    # Values without special characters are returned as is
+    assert solr.encode_query("plain query text") == "plain query text"
+    assert solr.encode_query("wild*") == "wild*"
+    assert solr.encode_query("wild*", escape_wildcards=True) == "wild\\*"
+
+    assert solr.encode_query("a:b c-d") == "a\\:b c\\-d"
+    assert solr.encode_query('"a:b" [1 TO 2] (c:d)') == '"a:b" [1 TO 2] (c\\:d)'
+    assert solr.encode_query("-excluded +required") == "-excluded +required"
+
+    # Results are cached
+    solr.encode_query.cache_clear()
+    assert solr.encode_query("x:y") == solr.encode_query("x:y")
+    assert solr.encode_query.cache_info().hits == 1
+
+    # Unmatched pairs raise
+    for query, message in (('"open', "Unmatched QUOTE"), ("(open", "Unmatched PAREN"),
+                           ("[1 TO 2", "Unmatched RANGE"), ("close)", "Cannot close PAREN"),
+                           ("[1 TO 2)", "Cannot close PAREN")):
+        with raises(ValueError) as exc:
+            solr.encode_query(query)
+        assert message in str(exc.value)
+
+def test_decode_value():
+    assert solr.decode_value("no escapes") == "no escapes"
+    assert solr.decode_value("a\\ b\\:c\\*") == "a b:c\\*"
+    assert solr.decode_value("a\\ b\\:c\\*", escape_wildcards=True) == "a b:c*"
+    assert solr.Solr().decode_value(solr.encode_value("x\\y (z)")) == "x\\y (z)"
+
+def test_Solr_tokens():
+    testsolr = solr.Solr()
+    assert testsolr.encode_query("a:b (c)") == "a\\:b (c)"
+    testsolr._tokenize_query("test -query")
+    tokens = testsolr._get_token()
+    next(tokens)
+    assert not testsolr._prev_token_is("TERM")
+    next(tokens)
+    assert testsolr._prev_token_is("TERM")
+    assert testsolr._next_token_is("PLMS")
@@ -0,0 +1,112 @@
+'''
+Test the static manifest utilities
+'''
+import os
+import sys
+import gzip
+import json
+import tempfile
+from types import SimpleNamespace
+from unittest.mock import patch
+from sandhill import app
+from sandhill.utils import static
+
+def write(path, content):
+    '''
+    Write a test file, creating its directory
+    '''
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as tfile:
+        tfile.write(content)
+
+def test_scan():
+    '''
+    Test scanning the instance and core static directories
+    '''
+    with tempfile.TemporaryDirectory() as instance, tempfile.TemporaryDirectory() as core:
+        write(os.path.join(instance, 'css/main.css'), 'instance')
+        write(os.path.join(core, 'css/main.css'), 'core')
+        write(os.path.join(core, 'js/app.js'), 'core js')
+        write(os.path.join(core, 'js/app.js.gz'), 'fake gzip')
+        with patch.object(static, 'roots', return_value=[instance, core]):
+            files = static.scan()
+            assert files['css/main.css']['path'] == os.path.join(instance, 'css/main.css')
+            assert files['css/main.css']['hash'] is None
+            assert files['js/app.js']['encodings'] == {'gzip': os.path.join(core, 'js/app.js.gz')}
+
+            # Stale variants are ignored
+            os.utime(os.path.join(core, 'js/app.js.gz'), (0, 0))
+            files = static.scan(hashes=True)
+            assert not files['js/app.js']['encodings']
+            assert len(files['css/main.css']['hash']) == 12
+            assert files['css/main.css']['hash'] != files['js/app.js']['hash']
+
+def test_build():
+    '''
+    Test building the compressed variants and manifest file
+    '''
+    with tempfile.TemporaryDirectory() as instance, \
+            patch.object(static, 'roots', return_value=[instance]), \
+            patch.dict(app.config, {"STATIC_MANIFEST": os.path.join(instance, 'manifest.json')}):
+        write(os.path.join(instance, 'main.css'), 'body { color: red; }\n' * 100)
+        write(os.path.join(instance, 'small.css'), 'a {}')
+        write(os.path.join(instance, 'image.png'), 'x' * 1000)
+        try:
+            files = static.build()
+            assert files['main.css']['encodings']['gzip'].endswith('main.css.gz')
+            with gzip.open(os.path.join(instance, 'main.css.gz'), 'rt') as gzfile:
+                assert gzfile.read() == 'body { color: red; }\n' * 100
+            assert not os.path.exists(os.path.join(instance, 'small.css.gz'))
+            assert not os.path.exists(os.path.join(instance, 'image.png.gz'))
+            assert static.manifest() is files
+
+            with open(static.manifest_path(), encoding='utf-8') as mfile:
+                hashes = json.load(mfile)
+            assert hashes['main.css']['hash'] == files['main.css']['hash']
+
+            # Hashes are loaded from the manifest file when current
+            hashes['main.css']['hash'] = 'fromfile'
+            hashes['small.css']['mtime'] = 0
+            with open(static.manifest_path(), 'w', encoding='utf-8') as mfile:
+                json.dump(hashes, mfile)
+            loaded = static.load()
+            assert loaded['main.css']['hash'] == 'fromfile'
+            assert loaded['small.css']['hash'] is None
+
+            # Building without compressing
+            os.remove(os.path.join(instance, 'main.css.gz'))
+            assert not static.build(compress_files=False)['main.css']['encodings']
+        finally:
+            static._manifest["files"] = None
+
+        # Brotli variants are written when the brotli package is available
+        brotli = SimpleNamespace(compress=lambda content: b'fake brotli')
+        with patch.dict(sys.modules, {"brotli": brotli}):
+            entry = static.scan()['main.css']
+            assert static.compress(entry) == ['gzip', 'br']
+            assert entry['encodings']['br'].endswith('main.css.br')
+
+        # Missing or invalid manifest files are ignored
+        with open(static.manifest_path(), 'w', encoding='utf-8') as mfile:
+            mfile.write('not json')
+        assert static.load()['main.css']['hash'] is None
+
+def test_manifest():
+    '''
+    Test the manifest is built once, except in debug mode
+    '''
+    manifest = static.manifest()
+    assert manifest is static.manifest()
+    assert 'test.txt' in manifest and 'favicon.ico' in manifest
+    with patch.dict(app.config, {"DEBUG": True}):
+        assert static.manifest() is not manifest
+        assert static.manifest() == manifest
+
+def test_url():
+    '''
+    Test fingerprinted static URLs
+    '''
+    with app.test_request_context('/'):
+        entry = static.manifest()['test.txt']
+        assert static.url('test.txt') == f"/static/test.txt?v={static.file_hash(entry)}"
+        assert static.url('missing.txt') == "/static/missing.txt"
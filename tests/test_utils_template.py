@@ -104,3 +104,119 @@ def test_evaluate_conditions():
         with raises(KeyError):
             template.evaluate_conditions(conditions, context, match_all=True)
 
+
+def test_compile_template():
+    with app.app_context():
+        template._compile_template.cache_clear()
+        tmpl = template.compile_template("{{ cached }}")
+        assert template.template_cache_info().misses == 1
+
+        # Compiling the same source again is a cache hit
+        assert template.compile_template("{{ cached }}") is tmpl
+        assert template.render_template_string("{{ cached }}", {"cached": "val"}) == "val"
+        info = template.template_cache_info()
+        assert info.hits == 2
+        assert info.misses == 1
+        assert info.currsize == 1
+
+        # A different autoescape setting compiles separately
+        env = app.jinja_env.overlay(autoescape=False)
+        assert template.compile_template("{{ cached }}", env) is not tmpl
+        assert template.template_cache_info().misses == 2
+
+def test_render_template_json():
+    literal = {"a": ["list", "of", "strings"]}
+    json_obj = {
+        "name": "{{ var1 }}",
+        "{{ var2 }}": "value",
+        "quoted": "{{ quoted }}",
+        "nested": [1, True, None, "{{ var1 }}-{{ var2 }}", {"deep": "{# comment #}x"}],
+        "literal": literal,
+        "count": 3,
+    }
+    context = {"var1": "val1", "var2": "val2", "quoted": 'A "quoted" <value>'}
+    with app.test_request_context('/dummy'):
+        rendered = template.render_template_json(json_obj, context)
+        assert rendered == {
+            "name": "val1",
+            "val2": "value",
+            "quoted": 'A "quoted" <value>',
+            "nested": [1, True, None, "val1-val2", {"deep": "x"}],
+            "literal": {"a": ["list", "of", "strings"]},
+            "count": 3,
+        }
+        # Values without Jinja are not copied
+        assert rendered["literal"] is literal
+        # Source structure is left unmodified
+        assert json_obj["name"] == "{{ var1 }}"
+
+        # A skeleton compiled once can be rendered repeatedly
+        skeleton = template.compile_template_json(json_obj)
+        assert template.render_template_skeleton(skeleton, json_obj, context) == rendered
+        assert template.render_template_skeleton(skeleton, json_obj, {"var1": "x"})["name"] == "x"
+        assert template.compile_template_json({"static": ["value"]}) is None
+        assert template.render_template_json(literal, context) is literal
+        assert template.render_template_skeleton(None, literal, context) is literal
+
+        # Flask context processors are available
+        assert template.render_template_json(["{{ urlcomponents().path }}"], {}) == ["/dummy"]
+
+        # Structures which cannot be serialized are rendered
+        assert template.render_template_json({"set": {1}, "v": "{{ var1 }}"}, context) == \
+            {"set": {1}, "v": "val1"}
+
+        # Test raising a template error
+        with raises(TemplateError):
+            template.render_template_json({"bad": "{{ var1 }"}, context)
+
+        # Legacy rendering of the whole document
+        app.config['LEGACY_JSON_RENDERING'] = 1
+        del json_obj["quoted"]
+        rendered = template.render_template_json(json_obj, context)
+        assert rendered["nested"] == [1, True, None, "val1-val2", {"deep": "x"}]
+        assert rendered["val2"] == "value"
+        assert rendered["literal"] is not literal
+        assert template.render_template_skeleton(skeleton, json_obj, context) == rendered
+        app.config['LEGACY_JSON_RENDERING'] = 0
+
+def test_compile_when():
+    with app.test_request_context('/dummy'):
+        # A single expression evaluates directly to its value
+        assert template.evaluate_when("{{ view_args.id == 1 }}", {"view_args": {"id": 1}}) is True
+        assert template.evaluate_when(" {{- items[1:] -}} ", {"items": [1, 2]}) == [2]
+        assert template.evaluate_when("{{ record }}", {"record": {"a": 1}}) == {"a": 1}
+        assert template.evaluate_when("{{ request.path == '/dummy' }}", {}) is True
+        assert template.evaluate_when("{{ conf is none }}", {}) is False
+
+        # String results are evaluated as literals, as when rendered
+        assert template.evaluate_when("{{ value }}", {"value": "False"}) is False
+        with raises(SyntaxError):
+            template.evaluate_when("{{ missing }}", {})
+        with raises(TemplateError):
+            template.evaluate_when("{{ missing.attr }}", {})
+
+        # Plain literals are evaluated once
+        compiled = template.compile_when("[1, 2]")
+        assert compiled({}) == [1, 2]
+        assert template.compile_when("[1, 2]") is compiled
+        with raises(SyntaxError):
+            template.compile_when("NOT A TYPE")
+
+        # Other templates are rendered and then evaluated
+        assert template.evaluate_when("{{ a }}{{ b }}", {"a": 1, "b": 2}) == 12
+        assert template.evaluate_when("{% if a %}True{% else %}False{% endif %}", {"a": 1})
+        with raises(TemplateError):
+            template.compile_when("{{ test } bad curlies")
+
+def test_when_errors():
+    with app.app_context():
+        errors = template.when_errors({"data": [
+            {"name": "ok", "when": "{{ 1 == 1 }}"},
+            {"name": "none"},
+            {"name": "syntax", "when": "{{ 1 + }}"},
+            {"name": "literal", "when": "NOT A TYPE"},
+        ]})
+        assert [(name, when) for name, when, _ in errors] == \
+            [("syntax", "{{ 1 + }}"), ("literal", "NOT A TYPE")]
+        assert isinstance(errors[0][2], TemplateError)
+        assert not template.when_errors({"route": "/", "template": "home.html.j2"})
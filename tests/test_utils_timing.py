@@ -0,0 +1,74 @@
+'''
+Test the data processor timing utilities
+'''
+import json
+from unittest.mock import patch
+from pytest import raises
+from sandhill import app
+from sandhill.utils import timing
+
+def test_timed():
+    '''
+    Test recording timings for a request
+    '''
+    with app.test_request_context('/'):
+        assert not timing.request_timings()
+        with timing.timed('search', 'solr.select', 'render'):
+            assert timing.current_processor.get() is None
+        with raises(ValueError):
+            with timing.timed('search', 'solr.select', 'execute'):
+                assert timing.current_processor.get() == ('search', 'solr.select')
+                timing.record_upstream('http://solr/select', 0.25, 200)
+                raise ValueError
+        assert timing.current_processor.get() is None
+        timing.record_upstream('http://example.edu', 0.5, 'error')
+
+        timings = timing.request_timings()
+        assert [(entry['name'], entry['phase']) for entry in timings] == \
+            [('search', 'render'), ('search', 'upstream'), ('search', 'execute')]
+        assert timings[1]['ms'] == 250
+        assert timings[1]['processor'] == 'solr.select'
+
+    # Timings outside of a request are ignored
+    timing.record('search', 'solr.select', 'execute', 1)
+    assert timing.request_timings() == []
+
+def test_server_timing():
+    '''
+    Test summarizing and formatting timings
+    '''
+    timings = [
+        {"name": "my record", "processor": "solr.select", "phase": "execute", "ms": 10},
+        {"name": "page", "processor": None, "phase": "render", "ms": 1.25},
+        {"name": "my record", "processor": "solr.select", "phase": "execute", "ms": 5},
+    ]
+    summary = timing.summarize(timings)
+    assert summary[0]['ms'] == 15 and summary[0]['count'] == 2
+    assert len(summary) == 2
+    assert timing.server_timing(timings) == \
+        'my_record.execute;dur=15.0;desc="solr.select", page.render;dur=1.2'
+    assert timing.server_timing([], 20).endswith('total;dur=20.0')
+
+def test_request_timings():
+    '''
+    Test the timings are logged and added to the response
+    '''
+    with app.test_client() as client, patch.object(app.logger, 'info') as log:
+        result = client.get('/about')
+        assert result.status_code == 200
+        assert 'Server-Timing' not in result.headers
+        logged = json.loads(log.call_args.args[0].split(': ', 1)[1])
+        assert logged['route'] == '/about'
+        assert logged['status'] == 200
+        assert any(entry['phase'] == 'execute' for entry in logged['timings'])
+
+        with patch.dict(app.config, {"SERVER_TIMING": 1}):
+            result = client.get('/about')
+            assert 'execute;dur=' in result.headers['Server-Timing']
+            assert 'total;dur=' in result.headers['Server-Timing']
+
+        # No timings when no data processors run
+        log.reset_mock()
+        result = client.get('/static/test.txt')
+        result.close()
+        log.assert_not_called()
@@ -1,7 +1,10 @@
 import os
+import httpx
 from lxml.etree import _ElementTree
 from sandhill.utils import xml
 from sandhill import app
+from sandhill.utils.aio import run_coroutine
+from sandhill.utils.test import _test_async_client
 
 def test_utils_xml_load():
     source_bin = b'<main><el>one</el><el>two</el></main>'
@@ -101,3 +104,108 @@ def test_utils_xml_xpath_by_id():
 
     idmap = xml.xpath_by_id(None, xpath)
     assert idmap is None
+
+def test_utils_xml_load_async():
+    def handler(request):
+        if request.url.path == "/missing":
+            return httpx.Response(404, text="Not found")
+        return httpx.Response(200, content=b'<main><el>one</el></main>')
+
+    with app.app_context(), _test_async_client(handler):
+        result = run_coroutine(xml.load_async('https://example.edu/record.xml')).result(5)
+        assert isinstance(result, _ElementTree)
+        assert result.xpath('/main/el')[0].text == 'one'
+
+        assert run_coroutine(xml.load_async('https://example.edu/missing')).result(5) is None
+
+        # Other sources are loaded as by load()
+        result = run_coroutine(xml.load_async('<main><str>one</str></main>')).result(5)
+        assert isinstance(result, _ElementTree)
+        assert run_coroutine(xml.load_async(None)).result(5) is None
+
+def test_utils_xml_compile_xpath():
+    compiled = xml.compile_xpath('/main/str')
+    assert compiled is xml.compile_xpath('/main/str')
+    assert compiled is not xml.compile_xpath('/main/str', (('m', 'urn:m'),))
+    doc = xml.load('<main><str>one</str><str>two</str></main>')
+    assert [el.text for el in compiled(doc)] == ['one', 'two']
+
+    ns_doc = xml.load('<m:main xmlns:m="urn:m"><m:str>one</m:str></m:main>')
+    assert xml.xpath(ns_doc, '/m:main/m:str/text()') == ['one']
+    assert xml.xpath(ns_doc, '/x:main') is None
+
+def test_utils_xml_cache(tmp_path):
+    source_str = '<main><str>one</str><str>two</str></main>'
+    source_file = tmp_path / "doc.xml"
+    source_file.write_text('<items><item>one</item></items>')
+
+    # Outside of a request, documents are not cached by default
+    assert xml.load(source_str) is not xml.load(source_str)
+
+    with app.test_request_context():
+        doc = xml.load(source_str)
+        assert xml.load(source_str) is doc
+        assert xml.load(source_str.encode()) is not doc
+        root = doc.getroot()
+        assert xml.xpath(source_str, '/main')[0] is root
+
+        # Changed files are parsed again
+        file_doc = xml.load(str(source_file))
+        assert xml.load(str(source_file)) is file_doc
+        source_file.write_text('<items><item>two</item></items>')
+        os.utime(source_file, ns=(0, 0))
+        assert xml.xpath(str(source_file), '/items/item/text()') == ['two']
+
+        # Invalid sources are not cached
+        assert xml.load('<main>') is None
+        assert '<main>' not in xml.g.xml_documents["docs"]
+
+    # Documents over the size limit are not cached
+    app.config['XML_CACHE_SIZE_MB'] = 0
+    with app.test_request_context():
+        assert xml.load(source_str) is not xml.load(source_str)
+    app.config['XML_CACHE_SIZE_MB'] = 64
+
+    # Cached across requests with a TTL
+    app.config['XML_CACHE_TTL'] = 60
+    try:
+        doc = xml.load(source_str)
+        assert xml.load(source_str) is doc
+        with app.test_request_context():
+            assert xml.load(source_str) is doc
+    finally:
+        app.config['XML_CACHE_TTL'] = 0
+        xml._documents["pid"] = None
+
+def test_utils_xml_cache_eviction():
+    cache = {"docs": xml.OrderedDict(), "bytes": 0}
+    xml._cache_put(cache, "one", (None, 40, "doc1"), 100)
+    xml._cache_put(cache, "two", (None, 40, "doc2"), 100)
+    assert xml._cache_get(cache, "one", 0)[2] == "doc1"
+    xml._cache_put(cache, "three", (None, 40, "doc3"), 100)
+    assert list(cache["docs"]) == ["one", "three"]
+    assert cache["bytes"] == 80
+
+    xml._cache_put(cache, "three", (10, 50, "doc3"), 100)
+    assert cache["bytes"] == 90
+    assert xml._cache_get(cache, "three", 5)[2] == "doc3"
+    assert xml._cache_get(cache, "three", 10) is None
+    assert list(cache["docs"]) == ["one"]
+    assert cache["bytes"] == 40
+
+def test_utils_xml_load_async_cache():
+    calls = []
+    def handler(request):
+        calls.append(request.url)
+        return httpx.Response(200, content=b'<main><el>one</el></main>')
+
+    app.config['XML_CACHE_TTL'] = 60
+    try:
+        with app.app_context(), _test_async_client(handler):
+            url = 'https://example.edu/cached.xml'
+            first = run_coroutine(xml.load_async(url)).result(5)
+            assert run_coroutine(xml.load_async(url)).result(5) is first
+            assert len(calls) == 1
+    finally:
+        app.config['XML_CACHE_TTL'] = 0
+        xml._documents["pid"] = None